@@ -0,0 +1,107 @@
+"""
+bench_analytics.py
+------------------------------------
+对比参数扫描打分的两种实现：
+    - 逐列调用原 pandas 版 performance_stats（原 summarize_grid 的做法）
+    - core.analytics.batch_performance_stats 一次性批量计算（NumPy / numba）
+
+合成 (date × strategy) 日收益矩阵，各策略起点随机（NaN 参差起点）。
+逐列实现只对前 --loop-sample 列计时后按比例外推，并报告与批量结果的最大绝对误差。
+
+用法:
+    python benchmarks/bench_analytics.py --strategies 50000 --years 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from strategy_engine.core import analytics, kernels  # noqa: E402
+
+
+def performance_stats_pandas(ret_series, rf_series=None):
+    """原 demo_run_mom_trend.performance_stats（单序列 pandas 实现，作为基准）"""
+    ret = ret_series.copy().dropna()
+    n = len(ret)
+    if n == 0:
+        return {}
+    total_return = (1 + ret).prod() - 1
+    ann_return = (1 + total_return) ** (252.0 / n) - 1
+    if rf_series is not None:
+        excess = ret - rf_series.reindex(ret.index).fillna(0.0)
+    else:
+        excess = ret.copy()
+    ann_vol = excess.std() * np.sqrt(252)
+    ann_excess_ret = excess.mean() * 252
+    sharpe = ann_excess_ret / ann_vol if ann_vol > 0 else np.nan
+    equity = (1 + ret).cumprod()
+    max_dd = (equity / equity.cummax() - 1).min()
+    return {
+        "n_days": n,
+        "total_return": total_return,
+        "ann_return": ann_return,
+        "ann_vol_excess": ann_vol,
+        "ann_excess_ret": ann_excess_ret,
+        "sharpe": sharpe,
+        "max_drawdown": max_dd,
+    }
+
+
+def make_returns(n_strategies, years, seed=0):
+    rng = np.random.default_rng(seed)
+    n_dates = years * 252
+    returns = rng.normal(0.0004, 0.01, size=(n_dates, n_strategies))
+    starts = rng.integers(0, n_dates // 4, size=n_strategies)
+    returns[np.arange(n_dates)[:, None] < starts[None, :]] = np.nan
+    dates = pd.bdate_range("2000-01-03", periods=n_dates)
+    rf = pd.Series(rng.normal(0.0001, 1e-5, size=n_dates), index=dates, name="rf_daily")
+    return pd.DataFrame(returns, index=dates), rf
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark batch performance analytics")
+    parser.add_argument("--strategies", type=int, default=10000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--loop-sample", type=int, default=200)
+    args = parser.parse_args()
+
+    returns, rf = make_returns(args.strategies, args.years)
+    print(f"[INFO] 合成收益: {returns.shape[0]} dates × {returns.shape[1]} strategies，"
+          f"numba: {'yes' if kernels.HAVE_NUMBA else 'no'}")
+
+    sample = returns.iloc[:, :args.loop_sample]
+    t0 = time.perf_counter()
+    reference = pd.DataFrame([performance_stats_pandas(sample[c], rf) for c in sample.columns])
+    t_loop = (time.perf_counter() - t0) * returns.shape[1] / sample.shape[1]
+    rows = [("loop", t_loop, 0.0)]
+
+    modes = [("numpy", False)] + ([("numba", True)] if kernels.HAVE_NUMBA else [])
+    for name, use_jit in modes:
+        if use_jit:
+            # 编译耗时不计入
+            analytics.batch_performance_stats(sample.iloc[:10], rf, use_jit=True)
+        t0 = time.perf_counter()
+        stats = analytics.batch_performance_stats(returns, rf, use_jit=use_jit)
+        seconds = time.perf_counter() - t0
+        err = max(
+            np.nanmax(np.abs(stats[c].to_numpy()[:sample.shape[1]] - reference[c].to_numpy()))
+            for c in reference.columns
+        )
+        rows.append((name, seconds, err))
+
+    print(f"{'impl':<10}{'seconds':>10}{'speedup':>10}{'max abs err':>14}")
+    for name, seconds, err in rows:
+        print(f"{name:<10}{seconds:>10.2f}{t_loop / seconds:>9.1f}x{err:>14.1e}")
+    print("(loop 为按样本外推的耗时)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+bench_build_features.py
+------------------------------------
+对比 build_features.py 的宽矩阵因子实现与旧版逐 ticker 循环实现：
+    - 运行时间
+    - 峰值内存（tracemalloc）
+    - 结果一致性（最大绝对误差）
+
+数据为合成的随机游走价格面板，不依赖 data_pipeline 中的真实数据。
+
+用法:
+    python benchmarks/bench_build_features.py --assets 500 --years 20
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "data_pipeline", "scripts"))
+
+from build_features import (  # noqa: E402
+    FACTOR_COLUMNS,
+    build_basic_tech_factors,
+    build_returns_from_prices,
+)
+
+
+def make_synthetic_panel(n_assets: int, n_years: int, seed: int = 42):
+    """生成 (prices_wide, rf_daily)：几何随机游走价格 + 常数附近波动的 rf。"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2000-01-03", periods=n_years * 252, name="date")
+    log_ret = rng.normal(0.0003, 0.015, size=(len(dates), n_assets))
+    prices = 100.0 * np.exp(np.cumsum(log_ret, axis=0))
+
+    # 一部分资产晚上市，覆盖 NaN warm-up 的情况
+    late = rng.integers(0, len(dates) // 2, size=n_assets)
+    for j in range(0, n_assets, 5):
+        prices[: late[j], j] = np.nan
+
+    tickers = [f"T{j:05d}" for j in range(n_assets)]
+    prices_wide = pd.DataFrame(prices, index=dates, columns=tickers)
+    rf_daily = pd.Series(0.02 / 252 + rng.normal(0, 1e-5, len(dates)), index=dates, name="rf_daily")
+    return prices_wide, rf_daily
+
+
+def legacy_build_basic_tech_factors(prices_wide, returns_wide, rf_daily):
+    """旧版实现（逐 ticker 构建 DataFrame 再 concat + sort），仅作基准对照。"""
+    tickers = prices_wide.columns.tolist()
+    dates = prices_wide.index
+    rf_df = rf_daily.to_frame().reindex(dates)
+
+    all_rows = []
+    for ticker in tickers:
+        px = prices_wide[ticker]
+        ret = returns_wide[ticker]
+
+        df_feat = pd.DataFrame(index=dates)
+        df_feat["ret_1d"] = ret
+        df_feat["mom_20d"] = px / px.shift(20) - 1
+        df_feat["mom_60d"] = px / px.shift(60) - 1
+        df_feat["mom_120d"] = px / px.shift(120) - 1
+        df_feat["vol_20d"] = ret.rolling(window=20).std() * np.sqrt(252)
+        df_feat["ma_200d"] = px.rolling(window=200).mean()
+        df_feat["trend_200d"] = px / df_feat["ma_200d"] - 1
+        excess = ret.sub(rf_df["rf_daily"], axis=0)
+        df_feat["sharpe_60d"] = (excess.rolling(window=60).mean()
+                                 / excess.rolling(window=60).std()) * np.sqrt(252)
+
+        df_feat = df_feat.reset_index().rename(columns={"index": "date"})
+        df_feat["ticker"] = ticker
+        all_rows.append(df_feat)
+
+    features_long = pd.concat(all_rows, axis=0, ignore_index=True)
+    col_order = ["date", "ticker"] + FACTOR_COLUMNS
+    return features_long[col_order].sort_values(["ticker", "date"]).reset_index(drop=True)
+
+
+def measure(func, *args):
+    """返回 (结果, 耗时秒, 峰值内存 MB)。"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark build_basic_tech_factors")
+    parser.add_argument("--assets", type=int, default=200)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    prices_wide, rf_daily = make_synthetic_panel(args.assets, args.years)
+    returns_wide = build_returns_from_prices(prices_wide)
+    print(f"[INFO] 合成面板: {prices_wide.shape[0]} dates × {prices_wide.shape[1]} assets")
+
+    legacy, t_legacy, m_legacy = measure(legacy_build_basic_tech_factors, prices_wide, returns_wide, rf_daily)
+    wide, t_wide, m_wide = measure(build_basic_tech_factors, prices_wide, returns_wide, rf_daily)
+
+    max_err = np.nanmax(np.abs(legacy[FACTOR_COLUMNS].to_numpy() - wide[FACTOR_COLUMNS].to_numpy()))
+    same_nan = (legacy[FACTOR_COLUMNS].isna().to_numpy() == wide[FACTOR_COLUMNS].isna().to_numpy()).all()
+
+    print(f"{'impl':<12}{'seconds':>10}{'peak MB':>12}")
+    print(f"{'per-ticker':<12}{t_legacy:>10.3f}{m_legacy:>12.1f}")
+    print(f"{'wide':<12}{t_wide:>10.3f}{m_wide:>12.1f}")
+    print(f"[INFO] speedup: {t_legacy / t_wide:.1f}x, max abs diff: {max_err:.2e}, NaN 位置一致: {same_nan}")
+
+
+if __name__ == "__main__":
+    main()
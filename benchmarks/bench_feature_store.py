@@ -0,0 +1,92 @@
+"""
+bench_feature_store.py
+------------------------------------
+对比策略加载宽因子的两种方式：
+    - long 表：读 basic_tech_factors.parquet（列 + ticker 过滤下推）后逐因子 pivot 成 date × ticker
+    - 宽因子库：core.feature_store 按列映射读取，已对齐共享日历，无 pivot / reindex
+
+合成面板写在临时目录（long 表用 datalake.write_features_file，因子库用 write_feature_store），
+每种方式取 --repeat 次中的最短耗时，并检查两者结果一致。
+
+用法:
+    python benchmarks/bench_feature_store.py --assets 2000 --years 20 --tickers 50 --factors mom_120d trend_200d
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "data_pipeline", "scripts"))
+sys.path.insert(0, ROOT_DIR)
+
+import build_features  # noqa: E402
+from bench_build_features import make_synthetic_panel  # noqa: E402
+from strategy_engine.core import datalake, feature_store  # noqa: E402
+
+
+def load_from_long(path, names, tickers):
+    """旧做法：读 long 表再 pivot"""
+    df = pd.read_parquet(path, columns=["date", "ticker"] + names, filters=[("ticker", "in", tickers)])
+    df["ticker"] = df["ticker"].astype(str)
+    return {name: df.pivot(index="date", columns="ticker", values=name)[tickers] for name in names}
+
+
+def load_from_store(store_dir, names, tickers):
+    return feature_store.FeatureStore(store_dir).frames(names, tickers)
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark wide feature store reads against long-table pivots")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--tickers", type=int, default=20, help="策略读取的 ticker 数")
+    parser.add_argument("--factors", nargs="+", default=["mom_120d", "trend_200d"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prices_wide, rf_daily = make_synthetic_panel(args.assets, args.years)
+    returns_wide = build_features.build_returns_from_prices(prices_wide)
+    factors = build_features.build_basic_tech_factors_wide(prices_wide, returns_wide, rf_daily)
+    rng = np.random.default_rng(0)
+    tickers = sorted(rng.choice(prices_wide.columns, size=min(args.tickers, args.assets), replace=False))
+    print(f"[INFO] 合成面板: {len(prices_wide)} dates × {args.assets} assets，"
+          f"读取 {len(tickers)} tickers × {len(args.factors)} factors")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        long_path = os.path.join(work_dir, "basic_tech_factors.parquet")
+        store_dir = os.path.join(work_dir, "wide")
+        datalake.write_features_file(build_features.factors_wide_to_long(factors), long_path)
+        feature_store.write_feature_store(factors, store_dir=store_dir)
+
+        t_long, from_long = best_of(lambda: load_from_long(long_path, args.factors, tickers), args.repeat)
+        t_store, from_store = best_of(lambda: load_from_store(store_dir, args.factors, tickers), args.repeat)
+
+    for name in args.factors:
+        a, b = from_long[name], from_store[name]
+        if not a.index.equals(b.index) or not np.array_equal(a.to_numpy(), b.to_numpy(), equal_nan=True):
+            print(f"[ERROR] {name} 结果不一致")
+            sys.exit(1)
+
+    print(f"{'source':<10}{'seconds':>10}{'speedup':>10}")
+    print(f"{'long':<10}{t_long:>10.4f}{1.0:>9.1f}x")
+    print(f"{'store':<10}{t_store:>10.4f}{t_long / t_store:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
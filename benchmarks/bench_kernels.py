@@ -0,0 +1,98 @@
+"""
+bench_kernels.py
+------------------------------------
+对比 build_basic_tech_factors 中滚动统计的三种实现：
+    - pandas .rolling()（原实现）
+    - core.kernels NumPy 实现
+    - core.kernels numba 编译内核（已安装 numba 时；首次调用的编译耗时单独列出）
+
+每种实现计算同一组统计量：
+    价格 rolling mean (20, 63, 200)、收益 rolling std (20)、超额收益 rolling Sharpe (60)
+并报告与 pandas 结果的最大相对误差。
+
+用法:
+    python benchmarks/bench_kernels.py --assets 2000 --years 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from bench_build_features import make_synthetic_panel  # noqa: E402
+from strategy_engine.core import kernels  # noqa: E402
+
+MEAN_WINDOWS = (20, 63, 200)
+
+
+def pandas_stats(prices_wide, returns_wide, excess):
+    out = {f"mean_{w}": prices_wide.rolling(w).mean().to_numpy() for w in MEAN_WINDOWS}
+    out["std_20"] = returns_wide.rolling(20).std().to_numpy()
+    out["sharpe_60"] = (excess.rolling(60).mean() / excess.rolling(60).std()).to_numpy() * np.sqrt(252)
+    return out
+
+
+def kernel_stats(prices_wide, returns_wide, excess, use_jit):
+    means, _ = kernels.rolling_moments(prices_wide.to_numpy(), MEAN_WINDOWS, use_jit=use_jit)
+    out = {f"mean_{w}": means[w] for w in MEAN_WINDOWS}
+    out["std_20"] = kernels.rolling_std(returns_wide.to_numpy(), 20, use_jit=use_jit)
+    out["sharpe_60"] = kernels.rolling_sharpe(excess.to_numpy(), 60, use_jit=use_jit)
+    return out
+
+
+def timed(func, *args, repeat=3):
+    """返回 (结果, 最短耗时秒)。"""
+    best, result = np.inf, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return result, best
+
+
+def max_rel_err(result, reference):
+    errs = []
+    for key, ref in reference.items():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            errs.append(np.nanmax(np.abs(result[key] - ref) / np.maximum(np.abs(ref), 1e-12)))
+    return max(errs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark rolling kernels vs pandas")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    prices_wide, rf_daily = make_synthetic_panel(args.assets, args.years)
+    returns_wide = prices_wide.pct_change()
+    excess = returns_wide.sub(rf_daily, axis=0)
+    print(f"[INFO] 合成面板: {prices_wide.shape[0]} dates × {prices_wide.shape[1]} assets，"
+          f"numba: {'yes' if kernels.HAVE_NUMBA else 'no'}")
+
+    reference, t_pandas = timed(pandas_stats, prices_wide, returns_wide, excess)
+    rows = [("pandas", t_pandas, 0.0)]
+
+    result, t_numpy = timed(kernel_stats, prices_wide, returns_wide, excess, False)
+    rows.append(("numpy", t_numpy, max_rel_err(result, reference)))
+
+    if kernels.HAVE_NUMBA:
+        t0 = time.perf_counter()
+        kernel_stats(prices_wide.iloc[:300, :2], returns_wide.iloc[:300, :2], excess.iloc[:300, :2], True)
+        print(f"[INFO] numba 编译耗时: {time.perf_counter() - t0:.2f}s")
+        result, t_jit = timed(kernel_stats, prices_wide, returns_wide, excess, True)
+        rows.append(("numba", t_jit, max_rel_err(result, reference)))
+
+    print(f"{'impl':<10}{'seconds':>10}{'speedup':>10}{'max rel err':>14}")
+    for name, seconds, err in rows:
+        print(f"{name:<10}{seconds:>10.3f}{t_pandas / seconds:>9.1f}x{err:>14.1e}")
+
+
+if __name__ == "__main__":
+    main()
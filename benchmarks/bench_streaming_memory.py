@@ -0,0 +1,141 @@
+"""
+bench_streaming_memory.py
+------------------------------------
+对比 build_price_panel / build_features 的全量内存模式与流式模式：
+    - 运行时间
+    - 进程峰值常驻内存（ru_maxrss，每种模式在独立子进程中运行）
+    - 输出一致性（prices_wide 与因子表逐值比较）
+
+raw 数据为合成的随机游走价格，写在临时目录中，不会改动 data_pipeline 下的真实数据和 lake。
+
+用法:
+    python benchmarks/bench_streaming_memory.py --assets 2000 --years 20 --memory-budget-mb 64
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "data_pipeline", "scripts"))
+
+from bench_build_features import make_synthetic_panel  # noqa: E402
+
+
+def write_synthetic_raw(raw_dir, n_assets, n_years, seed=42):
+    """把合成面板拆成 raw/{ticker}.parquet（date + adj_close），返回 ticker 列表"""
+    prices_wide, _ = make_synthetic_panel(n_assets, n_years, seed)
+    os.makedirs(raw_dir, exist_ok=True)
+    for ticker in prices_wide.columns:
+        s = prices_wide[ticker].dropna()
+        pd.DataFrame({"date": s.index, "adj_close": s.to_numpy()}).to_parquet(
+            os.path.join(raw_dir, f"{ticker}.parquet"), index=False
+        )
+    return prices_wide.columns.tolist()
+
+
+def run_child(mode, work_dir, memory_budget_mb):
+    """子进程入口：在 work_dir 下构建 prices_wide 和因子表，打印耗时与峰值内存 (JSON)"""
+    import build_features
+    import build_price_panel
+
+    raw_dir = os.path.join(work_dir, "raw")
+    out_dir = os.path.join(work_dir, mode)
+    lake_dir = os.path.join(out_dir, "lake")
+    os.makedirs(out_dir, exist_ok=True)
+    prices_path = os.path.join(out_dir, "prices_wide.parquet")
+    features_path = os.path.join(out_dir, "basic_tech_factors.parquet")
+
+    build_price_panel.RAW_DIR = raw_dir
+    build_features.MACRO_DIR = work_dir  # 无 risk_free_irx.parquet → rf_daily 全 0
+    tickers = sorted(f[:-len(".parquet")] for f in os.listdir(raw_dir))
+
+    t0 = time.perf_counter()
+    if mode == "streaming":
+        build_price_panel.build_prices_wide_streaming(
+            tickers, prices_path, memory_budget_mb, raw_dir=raw_dir, lake_dir=lake_dir
+        )
+        build_features.build_features_streaming(
+            features_path, memory_budget_mb, prices_path=prices_path, lake_dir=lake_dir
+        )
+    else:
+        prices_wide = build_price_panel.build_prices_wide(tickers)
+        prices_wide.to_parquet(prices_path)
+        del prices_wide
+        prices_wide = build_features.load_prices_wide(prices_path)
+        returns_wide = build_features.build_returns_from_prices(prices_wide)
+        rf_daily = build_features.load_rf_daily(prices_wide.index)
+        features_long = build_features.build_basic_tech_factors(prices_wide, returns_wide, rf_daily)
+        features_long.to_parquet(features_path, index=False)
+    elapsed = time.perf_counter() - t0
+
+    # Linux 上 ru_maxrss 单位为 KB
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def spawn(mode, work_dir, memory_budget_mb):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", mode,
+           "--work-dir", work_dir, "--memory-budget-mb", str(memory_budget_mb)]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def compare_outputs(work_dir):
+    """返回 (prices 最大绝对误差, 因子最大绝对误差, NaN 位置是否一致)"""
+    a = pd.read_parquet(os.path.join(work_dir, "in-memory", "prices_wide.parquet"))
+    b = pd.read_parquet(os.path.join(work_dir, "streaming", "prices_wide.parquet"))
+    b = b[a.columns]
+    price_err = np.nanmax(np.abs(a.to_numpy() - b.to_numpy()))
+    same_nan = (a.isna().to_numpy() == b.isna().to_numpy()).all()
+
+    fa = pd.read_parquet(os.path.join(work_dir, "in-memory", "basic_tech_factors.parquet"))
+    fb = pd.read_parquet(os.path.join(work_dir, "streaming", "basic_tech_factors.parquet"))
+    cols = [c for c in fa.columns if c not in ("date", "ticker")]
+    # 时间戳精度（us / ns）可能不同，按 ns 比较
+    same_keys = (fa["date"].astype("datetime64[ns]").equals(fb["date"].astype("datetime64[ns]"))
+                 and fa["ticker"].equals(fb["ticker"]))
+    feat_err = np.nanmax(np.abs(fa[cols].to_numpy() - fb[cols].to_numpy()))
+    same_nan = same_nan and same_keys and (fa[cols].isna().to_numpy() == fb[cols].isna().to_numpy()).all()
+    return price_err, feat_err, same_nan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark in-memory vs streaming pipeline builds")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--memory-budget-mb", type=int, default=64)
+    parser.add_argument("--child", choices=["in-memory", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.work_dir, args.memory_budget_mb)
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        write_synthetic_raw(os.path.join(work_dir, "raw"), args.assets, args.years)
+        print(f"[INFO] 合成 raw: {args.assets} tickers × {args.years * 252} dates，"
+              f"内存预算 {args.memory_budget_mb} MB")
+
+        results = {mode: spawn(mode, work_dir, args.memory_budget_mb)
+                   for mode in ("in-memory", "streaming")}
+        price_err, feat_err, same_nan = compare_outputs(work_dir)
+
+    print(f"{'mode':<12}{'seconds':>10}{'peak MB':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['seconds']:>10.2f}{r['peak_mb']:>12.1f}")
+    print(f"[INFO] max abs diff: prices {price_err:.2e}, factors {feat_err:.2e}, NaN 位置一致: {same_nan}")
+
+
+if __name__ == "__main__":
+    main()
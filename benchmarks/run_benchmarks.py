@@ -0,0 +1,282 @@
+"""
+run_benchmarks.py
+------------------------------------
+全流程基准测试：在合成数据上对数据 → 因子 → 信号 → 回测 → 绩效的各阶段计时并测量内存。
+
+阶段:
+    prices      : build_price_panel.build_prices_wide（合成 raw/{ticker}.parquet 写在临时目录）
+    factors     : build_features.build_basic_tech_factors
+    signals     : SignalGenerator trend / momentum / volatility + combine_signals
+    backtest    : BacktestEngine.run（向量化）
+    stats       : 逐资产调用 performance_stats
+    batch_stats : analytics.batch_performance_stats（全部资产一次）
+    rolling     : analytics.rolling_performance_stats（1y / 3y 窗口）
+
+每个阶段先预热一次，再运行 --repeat 次取最短耗时；另外单独运行一次、用 tracemalloc
+记录 Python / NumPy 分配的峰值（pyarrow 内部内存不计入）。
+
+每次运行追加一行 JSON 到 benchmarks/results/history.jsonl（含 git commit、库版本、机器信息），
+并与 benchmarks/results/baseline.json（相同 assets / years 配置）比较：
+耗时或内存峰值超过阈值即标记为回归，进程以退出码 1 结束。
+--save-baseline 把本次结果写为新的 baseline。
+
+用法:
+    python benchmarks/run_benchmarks.py --assets 500 --years 20 --save-baseline
+    python benchmarks/run_benchmarks.py --assets 500 --years 20
+    python benchmarks/run_benchmarks.py --stages factors backtest --repeat 5 --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "data_pipeline", "scripts"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "strategy_engine"))
+sys.path.insert(0, ROOT_DIR)
+
+import build_features  # noqa: E402
+import build_price_panel  # noqa: E402
+from bench_build_features import make_synthetic_panel  # noqa: E402
+from bench_streaming_memory import write_synthetic_raw  # noqa: E402
+from strategy_engine.core import analytics, kernels  # noqa: E402
+from strategy_engine.core.backtest import BacktestEngine  # noqa: E402
+from strategy_engine.core.signals import SignalGenerator  # noqa: E402
+from demo_run_mom_trend import performance_stats  # noqa: E402
+
+RESULTS_DIR = os.path.join(THIS_DIR, "results")
+HISTORY_PATH = os.path.join(RESULTS_DIR, "history.jsonl")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+
+# =============== 阶段 ===============
+# 每个阶段接收共享的 ctx，在计时之外完成准备工作，返回被计时的无参函数
+
+def stage_prices(ctx):
+    raw_dir = os.path.join(ctx["work_dir"], "raw")
+    tickers = write_synthetic_raw(raw_dir, ctx["assets"], ctx["years"])
+    return lambda: build_price_panel.build_prices_wide(tickers, raw_dir=raw_dir)
+
+
+def stage_factors(ctx):
+    returns_wide = build_features.build_returns_from_prices(ctx["prices_wide"])
+    return lambda: build_features.build_basic_tech_factors(ctx["prices_wide"], returns_wide, ctx["rf_daily"])
+
+
+def stage_signals(ctx):
+    prices_wide, returns_wide = ctx["prices_wide"], ctx["returns_wide"]
+
+    def run():
+        signals = {
+            "trend": SignalGenerator.trend_signal(prices_wide),
+            "momentum": SignalGenerator.momentum_signal(prices_wide),
+            "volatility": SignalGenerator.volatility_signal(returns_wide),
+        }
+        return SignalGenerator.combine_signals(signals)
+    return run
+
+
+def stage_backtest(ctx):
+    signals = SignalGenerator.momentum_signal(ctx["prices_wide"]).clip(lower=0).fillna(0.0)
+    engine = BacktestEngine(ctx["prices_wide"], signals)
+    return engine.run
+
+
+def stage_stats(ctx):
+    returns_wide, rf_daily = ctx["returns_wide"], ctx["rf_daily"]
+    return lambda: [performance_stats(returns_wide[c], rf_daily) for c in returns_wide.columns]
+
+
+def stage_batch_stats(ctx):
+    return lambda: analytics.batch_performance_stats(ctx["returns_wide"], ctx["rf_daily"])
+
+
+def stage_rolling(ctx):
+    return lambda: analytics.rolling_performance_stats(ctx["returns_wide"], [252, 756], ctx["rf_daily"])
+
+
+STAGES = {
+    "prices": stage_prices,
+    "factors": stage_factors,
+    "signals": stage_signals,
+    "backtest": stage_backtest,
+    "stats": stage_stats,
+    "batch_stats": stage_batch_stats,
+    "rolling": stage_rolling,
+}
+
+
+# =============== 测量 ===============
+
+def measure(func, repeat):
+    """预热一次后运行 repeat 次，返回 {seconds（最短）, mean_seconds, peak_mb}。"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+
+        # 内存单独跑一次，避免 tracemalloc 的开销计入耗时
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": float(np.mean(times)), "peak_mb": peak / 1024 ** 2}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def environment():
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "numba": numba_version,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_suite(assets, years, stages, repeat):
+    prices_wide, rf_daily = make_synthetic_panel(assets, years)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        ctx = {
+            "assets": assets,
+            "years": years,
+            "work_dir": work_dir,
+            "prices_wide": prices_wide,
+            "returns_wide": build_features.build_returns_from_prices(prices_wide),
+            "rf_daily": rf_daily,
+        }
+        for name in stages:
+            func = STAGES[name](ctx)
+            results[name] = measure(func, repeat)
+            r = results[name]
+            print(f"[INFO] {name:<12} {r['seconds']:8.3f}s  peak {r['peak_mb']:8.1f} MB")
+    return results
+
+
+# =============== 基线比较 ===============
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(record, baseline, threshold, memory_threshold):
+    """打印与 baseline 的对比表，返回回归的阶段名列表。"""
+    regressions = []
+    print(f"\n{'stage':<12}{'seconds':>10}{'baseline':>10}{'change':>9}"
+          f"{'peak MB':>10}{'baseline':>10}{'change':>9}")
+    for name, cur in record["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            print(f"{name:<12}{cur['seconds']:>10.3f}{'-':>10}{'':>9}{cur['peak_mb']:>10.1f}{'-':>10}")
+            continue
+        dt = cur["seconds"] / base["seconds"] - 1 if base["seconds"] > 0 else 0.0
+        dm = cur["peak_mb"] / base["peak_mb"] - 1 if base["peak_mb"] > 0 else 0.0
+        flags = []
+        if dt > threshold:
+            flags.append("TIME")
+        if dm > memory_threshold:
+            flags.append("MEMORY")
+        if flags:
+            regressions.append(name)
+        print(f"{name:<12}{cur['seconds']:>10.3f}{base['seconds']:>10.3f}{dt:>+9.1%}"
+              f"{cur['peak_mb']:>10.1f}{base['peak_mb']:>10.1f}{dm:>+9.1%}"
+              f"  {' '.join(f'[REGRESSION:{f}]' for f in flags)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the data-to-results pipeline on synthetic data")
+    parser.add_argument("--assets", type=int, default=200)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="相对 baseline 的耗时增幅超过该比例即为回归（默认 0.2 = 20%%）")
+    parser.add_argument("--memory-threshold", type=float, default=0.2,
+                        help="相对 baseline 的内存峰值增幅超过该比例即为回归")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写为新的 baseline")
+    parser.add_argument("--no-history", action="store_true", help="不追加到 history")
+    args = parser.parse_args()
+
+    print(f"[INFO] 合成面板: {args.years * 252} dates × {args.assets} assets，"
+          f"repeat={args.repeat}，numba: {'yes' if kernels.HAVE_NUMBA else 'no'}")
+    stages = run_suite(args.assets, args.years, args.stages, args.repeat)
+
+    record = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {"assets": args.assets, "years": args.years, "repeat": args.repeat},
+        "environment": environment(),
+        "stages": stages,
+    }
+
+    if not args.no_history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"[OK] 结果已追加 → {args.history}")
+
+    regressions = []
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("[INFO] 没有 baseline，跳过回归比较")
+    elif baseline["config"]["assets"] != args.assets or baseline["config"]["years"] != args.years:
+        print(f"[WARNING] baseline 配置 {baseline['config']} 与本次不同，跳过回归比较")
+    else:
+        print(f"[INFO] baseline: commit {baseline.get('commit')} @ {baseline.get('timestamp')}")
+        regressions = compare(record, baseline, args.threshold, args.memory_threshold)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"[OK] baseline 已保存 → {args.baseline}")
+
+    if regressions:
+        print(f"[ERROR] 性能回归: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,26 @@ build_risk_free_irx.py
 从 yfinance 下载 ^IRX (13 Week T-Bill Yield)，
 转换为日度无风险收益率 rf_daily，并存到 data_pipeline/macro/risk_free_irx.parquet
 
+用法:
+    python build_macro_rf.py
+    python build_macro_rf.py --profile sampling   # 运行报告附带 profiler 结果（data_pipeline/reports/）
+
 依赖:
     pip install yfinance pandas pyarrow
 """
 
+import argparse
 import os
+import sys
 import pandas as pd
 import yfinance as yf
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core import instrumentation  # noqa: E402
+
 DEFAULT_START_DATE = "1980-01-01"
 
 def download_irx(start=DEFAULT_START_DATE, end=None):
@@ -62,20 +74,33 @@ def build_risk_free(df_irx: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
-def main():
+def main(profile=None):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     macro_dir = os.path.join(script_dir, "macro")
     os.makedirs(macro_dir, exist_ok=True)
 
-    df_irx_raw = download_irx()
-    df_rf = build_risk_free(df_irx_raw)
+    with instrumentation.run("build_macro_rf", profile=profile) as report:
+        with instrumentation.stage("download_irx") as download:
+            df_irx_raw = download_irx()
+            download.count(rows=len(df_irx_raw))
+
+        with instrumentation.stage("build_risk_free"):
+            df_rf = build_risk_free(df_irx_raw)
 
-    output_path = os.path.join(macro_dir, "risk_free_irx.parquet")
-    df_rf.to_parquet(output_path, index=False)
+        output_path = os.path.join(macro_dir, "risk_free_irx.parquet")
+        with instrumentation.stage("save_parquet") as save:
+            df_rf.to_parquet(output_path, index=False)
+            save.count(rows=len(df_rf), bytes=instrumentation.nbytes(output_path))
 
     print(f"[OK] Saved risk-free series → {output_path}")
     print(df_rf.head())
+    print(report.summary())
+    print(f"[OK] 运行报告 → {report.path}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="下载 ^IRX 并构建日度无风险收益率")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="同时运行 profiler（结果与运行报告一起写入 data_pipeline/reports/）")
+    args = parser.parse_args()
+    main(profile=args.profile)
@@ -2,7 +2,13 @@
 build_features.py
 ------------------------------------
 从 processed/prices_wide.parquet + macro/risk_free_irx.parquet
-构建基础技术因子，输出到 data_pipeline/features/basic_tech_factors.parquet
+构建基础技术因子，输出到 data_pipeline/features/basic_tech_factors.parquet，
+同时写入按年分区的 data_pipeline/lake/features/basic_tech_factors/，
+以及按因子分文件的宽因子库 data_pipeline/features/wide/（见 core/feature_store.py）
+
+存储格式：ticker 为字典编码（读回为 pandas categorical），按 (ticker, date) 排序、
+每 64k 行一个 row group 并带 min/max 统计和排序元数据，按 ticker / 日期过滤时可跳过整个 row group。
+宽因子库每个因子一个 (date × ticker) 的列优先 .npy，共用同一日历，策略按列映射读取，无需 pivot / reindex。
 
 因子包括：
 - ret_1d      : 日收益
@@ -14,13 +20,35 @@ build_features.py
 - trend_200d  : 相对200日均线的偏离度 (P/MA200 - 1)
 - sharpe_60d  : 60日滚动Sharpe（超额收益）
 
+用法:
+    python build_features.py                # 全量重算
+    python build_features.py --incremental  # 只计算已有因子表之后的新日期并追加
+        # 新日期单独写成分片：basic_tech_factors.parquet 变为同名目录，原文件改名为其中的
+        # part-00000000.parquet，新日期写成 part-YYYYMMDD.parquet（lake 中为各年份分区里的新 part 文件），
+        # 历史行不读不写；pd.read_parquet(该路径) 照常读到全部行；全量构建时重新写回单文件
+    python build_features.py --streaming --memory-budget-mb 512
+        # 按 ticker 分块读取 prices_wide 的列，逐块计算并用 ParquetWriter 追加写出，
+        # 峰值内存受预算限制，适合内存放不下的大 universe
+    python build_features.py --float32
+        # 因子以 float32 存储：因子列内存减半，basic_tech_factors.parquet 约 2.1 MB → 1.3 MB
+        # （默认的 float64 紧凑布局只有 ticker 字典编码和排序，文件大小基本不变）；
+        # 写出前逐列检查 float32 舍入后没有值越过信号阈值（见 core/datalake.py 的 float32_precision），
+        # 不通过则报错
+    python build_features.py --profile cprofile
+        # 各阶段耗时 / 行数 / 字节数 / 峰值 RSS 写入 data_pipeline/reports/build_features-*.json，
+        # 并附带 cProfile 的 .prof（sampling 则为 collapsed stacks）
+
 依赖:
     pip install pandas pyarrow
 """
 
+import argparse
 import os
+import sys
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # ------------ 路径设置 ------------
 
@@ -31,8 +59,24 @@ PROCESSED_DIR = os.path.join(ROOT_DIR, "processed")
 FEATURES_DIR = os.path.join(ROOT_DIR, "features")
 MACRO_DIR = os.path.join(ROOT_DIR, "macro")
 
+PROJECT_ROOT = os.path.abspath(os.path.join(ROOT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core import datalake, feature_store, instrumentation  # noqa: E402
+from strategy_engine.core.factors import FactorEngine  # noqa: E402
+
 os.makedirs(FEATURES_DIR, exist_ok=True)
 
+FEATURES_PATH = os.path.join(FEATURES_DIR, "basic_tech_factors.parquet")
+
+# 增量模式下，新日期之前需要保留的历史行数（最长窗口 ma_200d 需要 199 行，留 1 行余量）
+WARMUP_ROWS = 200
+
+# 流式模式下每个 ticker 每个日期的内存估算（float64 个数）：
+# 价格 + 收益 + 8 个宽因子 + long 表中的 8 个因子 + 中间结果余量
+STREAMING_FLOATS_PER_CELL = 32
+
 
 # ------------ 工具函数 ------------
 
@@ -50,15 +94,50 @@ def load_prices_wide(path=None):
     return df
 
 
+def load_prices_tail(after_date, warmup_rows=WARMUP_ROWS, path=None):
+    """
+    只读取 after_date 之后的新日期，以及其之前 warmup_rows 行的历史（滚动窗口 warm-up）。
+    日期过滤下推到 parquet 读取；若按自然日估算的范围不够 warmup_rows 行，则退回全量读取。
+    """
+    if path is None:
+        path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"prices_wide.parquet 不存在: {path}")
+
+    # 交易日约占自然日的 252/365，按 1.6 倍自然日估算并留余量
+    lookback = pd.Timedelta(days=int(warmup_rows * 1.6) + 30)
+    df = pd.read_parquet(path, filters=[("date", ">=", after_date - lookback)])
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index)
+    df = df.sort_index()
+
+    n_history = int((df.index <= after_date).sum())
+    if n_history < warmup_rows:
+        df = load_prices_wide(path)
+        n_history = int((df.index <= after_date).sum())
+
+    return df.iloc[max(0, n_history - warmup_rows):]
+
+
 def build_returns_from_prices(prices_wide: pd.DataFrame) -> pd.DataFrame:
     """从价格矩阵构建日收益矩阵（简单收益）"""
     rets = prices_wide.pct_change()
     return rets
 
 
-def load_rf_daily(prices_index: pd.DatetimeIndex) -> pd.Series:
+def feature_store_sources(prices_path=None):
+    """宽因子库记录签名的源文件（价格 + rf），源文件更新后因子库视为过期"""
+    sources = [prices_path or os.path.join(PROCESSED_DIR, "prices_wide.parquet")]
+    rf_path = os.path.join(MACRO_DIR, "risk_free_irx.parquet")
+    if os.path.exists(rf_path):
+        sources.append(rf_path)
+    return sources
+
+
+def load_rf_daily(prices_index: pd.DatetimeIndex, ffill: bool = True) -> pd.Series:
     """
     从 macro/risk_free_irx.parquet 读取 rf_daily，并对齐到 prices 的日期。
+    ffill=False 时只对齐不前向填充（缺失日期保留 NaN）。
     如果文件不存在，则返回全0的 rf_daily。
     """
     rf_path = os.path.join(MACRO_DIR, "risk_free_irx.parquet")
@@ -74,13 +153,67 @@ def load_rf_daily(prices_index: pd.DatetimeIndex) -> pd.Series:
     rf["date"] = pd.to_datetime(rf["date"])
     rf = rf.sort_values("date").set_index("date")
 
-    rf_daily = rf["rf_daily"].reindex(prices_index).ffill()
+    rf_daily = rf["rf_daily"].reindex(prices_index)
+    if ffill:
+        rf_daily = rf_daily.ffill()
     rf_daily.name = "rf_daily"
     return rf_daily
 
 
 # ------------ 主逻辑：构建因子 ------------
 
+FACTOR_COLUMNS = [
+    "ret_1d",
+    "mom_20d",
+    "mom_60d",
+    "mom_120d",
+    "vol_20d",
+    "ma_200d",
+    "trend_200d",
+    "sharpe_60d",
+]
+
+
+def build_basic_tech_factors_wide(prices_wide: pd.DataFrame,
+                                  returns_wide: pd.DataFrame,
+                                  rf_daily: pd.Series) -> dict:
+    """
+    在 date × ticker 宽矩阵上一次性计算所有因子（不再逐 ticker 循环）。
+    因子定义在 core.factors 的注册表中，由 FactorEngine 按依赖关系求值，
+    中间结果（收益、超额收益、均线）只算一次；这里写的是全量因子表，不走磁盘缓存。
+    返回 dict: {因子名: DataFrame(index=date, columns=ticker)}，键顺序同 FACTOR_COLUMNS
+    """
+    engine = FactorEngine(prices_wide, rf_daily, returns_wide=returns_wide, use_cache=False)
+    return engine.compute(FACTOR_COLUMNS)
+
+
+def factors_wide_to_long(factors: dict, float32=False, categories=None) -> pd.DataFrame:
+    """
+    把宽格式因子转成 long 表（只在写文件时调用）。
+    ticker 直接由编码构造为 categorical（不生成逐行字符串）；
+    categories 默认为本批 ticker，分块写出时传入全部 ticker，使各块共用同一字典。
+    float32=True 时因子列经精度检查后转为 float32。
+    返回 DataFrame: [date, ticker, <因子...>]，按 (ticker, date) 排序
+    """
+    first = next(iter(factors.values()))
+    tickers = sorted(first.columns)
+    categories = tickers if categories is None else sorted(categories)
+    dates = first.index
+    n_dates, n_tickers = len(dates), len(tickers)
+
+    codes = pd.Index(categories).get_indexer(tickers)
+    data = {
+        "date": np.tile(dates.to_numpy(), n_tickers),
+        "ticker": pd.Categorical.from_codes(np.repeat(codes, n_dates), categories=categories),
+    }
+    for name, wide in factors.items():
+        # 列优先展开：同一 ticker 的所有日期连续，天然是 (ticker, date) 顺序
+        values = wide[tickers].to_numpy(dtype=np.float64).ravel(order="F")
+        data[name] = datalake.to_float32(values, name) if float32 else values
+
+    return pd.DataFrame(data)
+
+
 def build_basic_tech_factors(prices_wide: pd.DataFrame,
                              returns_wide: pd.DataFrame,
                              rf_daily: pd.Series) -> pd.DataFrame:
@@ -88,90 +221,293 @@ def build_basic_tech_factors(prices_wide: pd.DataFrame,
     从价格矩阵、收益矩阵、rf_daily 构建 long 格式的因子表
     返回 DataFrame: [date, ticker, ret_1d, mom_20d, mom_60d, mom_120d, vol_20d, ma_200d, trend_200d, sharpe_60d]
     """
-    tickers = prices_wide.columns.tolist()
-    dates = prices_wide.index
-
-    # 为了方便计算，把 rf_daily 也变成 DataFrame，方便广播
-    rf_df = rf_daily.to_frame().reindex(dates)
-
-    all_rows = []
-
-    for ticker in tickers:
-        px = prices_wide[ticker]
-        ret = returns_wide[ticker]
-
-        # 基础 return
-        df_feat = pd.DataFrame(index=dates)
-        df_feat["ret_1d"] = ret
-
-        # 多周期动量
-        df_feat["mom_20d"] = px / px.shift(20) - 1
-        df_feat["mom_60d"] = px / px.shift(60) - 1
-        df_feat["mom_120d"] = px / px.shift(120) - 1
-
-        # 波动率（20日滚动，年化）
-        df_feat["vol_20d"] = (
-            ret.rolling(window=20)
-            .std()
-            * np.sqrt(252)
-        )
-
-        # 长期均线 + 趋势
-        df_feat["ma_200d"] = px.rolling(window=200).mean()
-        df_feat["trend_200d"] = px / df_feat["ma_200d"] - 1
-
-        # 60日滚动 Sharpe（超额收益）
-        # 对齐 rf_daily
-        excess = ret.sub(rf_df["rf_daily"], axis=0)
-        rolling_mean = excess.rolling(window=60).mean()
-        rolling_std = excess.rolling(window=60).std()
-        df_feat["sharpe_60d"] = (rolling_mean / rolling_std) * np.sqrt(252)
-
-        df_feat = df_feat.reset_index().rename(columns={"index": "date"})
-        df_feat["ticker"] = ticker
-
-        all_rows.append(df_feat)
-
-    # 合并所有 ticker
-    features_long = pd.concat(all_rows, axis=0, ignore_index=True)
-
-    # 排序 & 列顺序
-    col_order = [
-        "date",
-        "ticker",
-        "ret_1d",
-        "mom_20d",
-        "mom_60d",
-        "mom_120d",
-        "vol_20d",
-        "ma_200d",
-        "trend_200d",
-        "sharpe_60d",
-    ]
-    features_long = features_long[col_order].sort_values(["ticker", "date"]).reset_index(drop=True)
-    return features_long
-
-
-def main():
+    factors = build_basic_tech_factors_wide(prices_wide, returns_wide, rf_daily)
+    return factors_wide_to_long(factors)
+
+
+# ------------ 增量更新 ------------
+
+def read_last_feature_date(path=None):
+    """
+    返回已有因子表（含增量分片）的最后日期；只读 parquet footer 中 date 列的统计信息。
+    文件不存在或为空时返回 None
+    """
+    if path is None:
+        path = FEATURES_PATH
+    if not os.path.exists(path):
+        return None
+    return datalake.features_file_last_date(path)
+
+
+def build_incremental_factors_wide(prices_tail: pd.DataFrame,
+                                   rf_daily: pd.Series,
+                                   last_date: pd.Timestamp) -> dict:
+    """
+    在 warm-up 尾部价格上计算因子，只返回 last_date 之后的新日期（宽格式）。
+    prices_tail 需要在新日期之前包含至少 WARMUP_ROWS 行历史。
+    """
+    returns_tail = build_returns_from_prices(prices_tail)
+    factors = build_basic_tech_factors_wide(prices_tail, returns_tail, rf_daily)
+    return {name: wide.loc[wide.index > last_date] for name, wide in factors.items()}
+
+
+def build_incremental_factors(prices_tail: pd.DataFrame,
+                              rf_daily: pd.Series,
+                              last_date: pd.Timestamp,
+                              float32=False) -> pd.DataFrame:
+    """build_incremental_factors_wide 的 long 格式版本"""
+    new_factors = build_incremental_factors_wide(prices_tail, rf_daily, last_date)
+    return factors_wide_to_long(new_factors, float32=float32)
+
+
+def append_feature_store(new_factors, last_date):
+    """
+    把新日期追加到宽因子库。因子库与因子表的最后日期或 ticker 不一致时不追加，
+    提示全量重建（demo 检测到因子库过期会退回因子注册表计算）。
+    """
+    if not feature_store.store_exists():
+        print("[WARNING] 宽因子库不存在，跳过；全量运行 build_features.py 以生成")
+        return
+    try:
+        store = feature_store.FeatureStore()
+    except ValueError as e:
+        print(f"[WARNING] 宽因子库未更新: {e}；请全量重建")
+        return
+    if store.calendar[-1] != last_date:
+        print(f"[WARNING] 宽因子库最后日期 {store.calendar[-1].date()} 与因子表不一致，跳过；请全量重建")
+        return
+    try:
+        feature_store.append_feature_store(new_factors, sources=feature_store_sources())
+    except ValueError as e:
+        print(f"[WARNING] 宽因子库未更新: {e}")
+        return
+    print(f"[OK] Appended wide feature store → {feature_store.FEATURE_STORE_DIR}")
+
+
+def stored_as_float32(path=None):
+    """已有因子表的因子列是否以 float32 存储（只读第一个分片的 schema）"""
+    schema = pq.read_schema(datalake.feature_file_parts(path or FEATURES_PATH)[0])
+    return any(schema.field(name).type == pa.float32() for name in schema.names if name not in ("date", "ticker"))
+
+
+def update_features_incremental(float32=False):
+    """
+    增量模式：检测因子表最后日期，只加载 warm-up 尾部价格，计算新日期的因子并追加。
+    新日期单独写成一个分片（因子表目录和 lake 各年份分区中的新 part 文件，见 core/datalake.py），
+    不读取、也不重写历史行，耗时只与新数据量成正比；下次全量构建时分片被合并回单文件。
+    已有因子表是 float32 存储时新行也用 float32，保持整张表的 dtype 一致。
+    返回 True 表示已完成增量更新；返回 False 表示需要全量重算（无历史文件或 ticker 集合变化）。
+    """
+    last_date = read_last_feature_date()
+    if last_date is None:
+        print("[INFO] 未找到已有因子表，改为全量构建")
+        return False
+    print(f"[INFO] 已有因子表最后日期: {last_date.date()}")
+
+    with instrumentation.stage("load_prices_tail") as load:
+        prices_tail = load_prices_tail(last_date)
+        load.count(rows=len(prices_tail), bytes=instrumentation.nbytes(prices_tail))
+    n_new = int((prices_tail.index > last_date).sum())
+    if n_new == 0:
+        print("[OK] 没有新日期，因子表已是最新")
+        return True
+
+    with instrumentation.stage("load_tickers"):
+        tickers = datalake.features_file_tickers(FEATURES_PATH)
+    if tickers != set(prices_tail.columns):
+        print("[INFO] ticker 集合发生变化，改为全量构建")
+        return False
+
+    float32 = float32 or stored_as_float32()
+    with instrumentation.stage("factors") as compute:
+        rf_daily = load_rf_daily(prices_tail.index)
+        new_factors = build_incremental_factors_wide(prices_tail, rf_daily, last_date)
+        new_rows = factors_wide_to_long(new_factors, float32=float32, categories=tickers)
+        compute.count(rows=len(new_rows))
+    print(f"[INFO] 新增 {n_new} 个日期，{len(new_rows)} 行 (warm-up {len(prices_tail) - n_new} 行)")
+
+    with instrumentation.stage("save_parquet") as save:
+        part_path = datalake.append_features_file(new_rows, FEATURES_PATH)
+        save.count(rows=len(new_rows), bytes=instrumentation.nbytes(part_path))
+
+    # 分区数据集：新日期作为各年份分区中额外的 part 文件（lake 不存在时不生成只含新日期的残缺数据集）
+    if datalake.dataset_exists(datalake.FEATURES_DATASET):
+        with instrumentation.stage("save_lake") as save:
+            datalake.write_features_long(new_rows, part_id=int(f"{new_rows['date'].min():%Y%m%d}"))
+            save.count(rows=len(new_rows))
+
+    with instrumentation.stage("save_store"):
+        append_feature_store(new_factors, last_date)
+
+    print(f"[OK] Appended basic tech factors → {part_path}")
+    print(new_rows.tail())
+    return True
+
+
+# ------------ 流式构建 ------------
+
+def list_price_tickers(path=None):
+    """只读 parquet schema，返回 prices_wide 中的 ticker 列（排序后，与 long 表的 ticker 顺序一致）"""
+    if path is None:
+        path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+    schema = pq.read_schema(path)
+    index_cols = set()
+    if schema.pandas_metadata:
+        index_cols = {c for c in schema.pandas_metadata.get("index_columns", []) if isinstance(c, str)}
+    return sorted(c for c in schema.names if c not in index_cols and c != "date")
+
+
+def build_features_streaming(output_path=None, memory_budget_mb=512, prices_path=None, lake_dir=None,
+                             float32=False, store_dir=None):
+    """
+    流式构建因子表：每次只读 prices_wide 中一批 ticker 的列，
+    计算宽因子 → long → 追加到同一个 parquet 文件（ParquetWriter）和分区数据集，
+    宽因子同时按列写入宽因子库（预分配的 memmap，全部块写完后再替换旧库）。
+    各块的 ticker 共用全部 ticker 组成的字典，schema 一致。
+
+    ticker 按名称排序分块，所以输出与全量模式一样按 (ticker, date) 排序。
+    返回写出的总行数
+    """
+    if output_path is None:
+        output_path = FEATURES_PATH
+    if prices_path is None:
+        prices_path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+
+    tickers = list_price_tickers(prices_path)
+    n_dates = pq.read_metadata(prices_path).num_rows
+    per_ticker = n_dates * 8 * STREAMING_FLOATS_PER_CELL
+    chunk_size = max(1, min(len(tickers), (memory_budget_mb * 1024 ** 2) // per_ticker))
+    print(f"[INFO] 流式模式: {n_dates} dates × {len(tickers)} tickers，每块 {chunk_size} 个 ticker")
+
+    rf_daily = None
+    datalake.reset_dataset(datalake.FEATURES_DATASET, lake_dir)
+    datalake.reset_features_file(output_path)
+    writer = None
+    store_writer = None
+    n_rows = 0
+    try:
+        for part_id, start in enumerate(range(0, len(tickers), chunk_size)):
+            chunk = tickers[start:start + chunk_size]
+            with instrumentation.stage("read_chunk") as read:
+                prices_chunk = pd.read_parquet(prices_path, columns=chunk)
+                if not isinstance(prices_chunk.index, pd.DatetimeIndex):
+                    prices_chunk.index = pd.to_datetime(prices_chunk.index)
+                prices_chunk = prices_chunk.sort_index()
+                if rf_daily is None:
+                    rf_daily = load_rf_daily(prices_chunk.index)
+                    store_writer = feature_store.FeatureStoreWriter(
+                        prices_chunk.index, tickers, FACTOR_COLUMNS, np.float32 if float32 else np.float64,
+                        sources=feature_store_sources(prices_path), store_dir=store_dir,
+                    )
+                read.count(rows=len(prices_chunk), bytes=instrumentation.nbytes(prices_chunk))
+
+            with instrumentation.stage("factors") as compute:
+                returns_chunk = build_returns_from_prices(prices_chunk)
+                factors = build_basic_tech_factors_wide(prices_chunk, returns_chunk, rf_daily)
+                long_chunk = factors_wide_to_long(factors, float32=float32, categories=tickers)
+                compute.count(rows=len(long_chunk), bytes=instrumentation.nbytes(long_chunk))
+
+            with instrumentation.stage("write_chunk"):
+                table = pa.Table.from_pandas(long_chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema,
+                                              **datalake.feature_write_options(table.schema))
+                writer.write_table(table.cast(writer.schema), row_group_size=datalake.FEATURE_ROWS_PER_GROUP)
+                datalake.write_features_long(long_chunk, lake_dir=lake_dir, part_id=part_id)
+                store_writer.write(factors)
+                del factors, returns_chunk, prices_chunk
+            n_rows += len(long_chunk)
+            print(f"[INFO] 已写出 {start + len(chunk)}/{len(tickers)} 个 ticker")
+    except BaseException:
+        if store_writer is not None:
+            store_writer.abort()
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if store_writer is not None:
+        store_writer.close()
+    return n_rows
+
+
+def main(incremental=False, streaming=False, memory_budget_mb=512, float32=False, profile=None):
     print("========== Build Basic Tech Factors ==========")
 
-    prices_wide = load_prices_wide()
+    with instrumentation.run("build_features", profile=profile) as report:
+        build_and_save(incremental, streaming, memory_budget_mb, float32)
+
+    print("\n[INFO] 各阶段耗时:")
+    print(report.summary())
+    print(f"[OK] 运行报告 → {report.path}")
+
+
+def build_and_save(incremental, streaming, memory_budget_mb, float32):
+    """main 的主体：在 instrumentation run 内构建并保存因子表"""
+    if incremental and update_features_incremental(float32):
+        return
+
+    if streaming:
+        n_rows = build_features_streaming(memory_budget_mb=memory_budget_mb, float32=float32)
+        print(f"[OK] Saved basic tech factors ({n_rows} rows) → {FEATURES_PATH}")
+        print(f"[OK] Saved partitioned features → {datalake.dataset_path(datalake.FEATURES_DATASET)}")
+        print(f"[OK] Saved wide feature store → {feature_store.FEATURE_STORE_DIR}")
+        return
+
+    with instrumentation.stage("load_prices") as load:
+        prices_wide = load_prices_wide()
+        load.count(rows=len(prices_wide), bytes=instrumentation.nbytes(prices_wide))
     print(f"[INFO] prices_wide 形状: {prices_wide.shape}")
 
-    returns_wide = build_returns_from_prices(prices_wide)
+    with instrumentation.stage("returns"):
+        returns_wide = build_returns_from_prices(prices_wide)
     print(f"[INFO] returns_wide 形状: {returns_wide.shape}")
 
-    rf_daily = load_rf_daily(prices_wide.index)
+    with instrumentation.stage("load_rf"):
+        rf_daily = load_rf_daily(prices_wide.index)
     print(f"[INFO] rf_daily 长度: {len(rf_daily)}")
 
-    features_long = build_basic_tech_factors(prices_wide, returns_wide, rf_daily)
-
-    output_path = os.path.join(FEATURES_DIR, "basic_tech_factors.parquet")
-    features_long.to_parquet(output_path, index=False)
-
-    print(f"[OK] Saved basic tech factors → {output_path}")
+    with instrumentation.stage("factors") as compute:
+        factors = build_basic_tech_factors_wide(prices_wide, returns_wide, rf_daily)
+        compute.count(bytes=sum(instrumentation.nbytes(wide) for wide in factors.values()))
+    print(f"[INFO] 宽格式因子: {len(factors)} 个，每个形状 {prices_wide.shape}")
+
+    # long 格式只在写文件时生成
+    with instrumentation.stage("to_long") as reshape:
+        features_long = factors_wide_to_long(factors, float32=float32)
+        reshape.count(rows=len(features_long), bytes=instrumentation.nbytes(features_long))
+
+    with instrumentation.stage("save_parquet") as save:
+        datalake.write_features_file(features_long, FEATURES_PATH)
+        save.count(rows=len(features_long), bytes=instrumentation.nbytes(FEATURES_PATH))
+    with instrumentation.stage("save_lake") as save:
+        datalake.write_features_long(features_long)
+        save.count(rows=len(features_long))
+    with instrumentation.stage("save_store") as save:
+        feature_store.write_feature_store(factors, np.float32 if float32 else np.float64,
+                                          sources=feature_store_sources())
+        save.count(bytes=instrumentation.nbytes(feature_store.FEATURE_STORE_DIR))
+
+    print(f"[OK] Saved basic tech factors → {FEATURES_PATH} "
+          f"({instrumentation.nbytes(FEATURES_PATH) / 1024 ** 2:.1f} MB on disk, "
+          f"{instrumentation.nbytes(features_long) / 1024 ** 2:.1f} MB in memory)")
+    print(f"[OK] Saved partitioned features → {datalake.dataset_path(datalake.FEATURES_DATASET)}")
+    print(f"[OK] Saved wide feature store → {feature_store.FEATURE_STORE_DIR}")
     print(features_long.head())
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="构建基础技术因子")
+    parser.add_argument("--incremental", action="store_true",
+                        help="只计算已有因子表之后的新日期并追加")
+    parser.add_argument("--streaming", action="store_true",
+                        help="按 ticker 分块计算并追加写出，峰值内存受 --memory-budget-mb 限制")
+    parser.add_argument("--memory-budget-mb", type=int, default=512,
+                        help="流式模式的内存预算 (MB)")
+    parser.add_argument("--float32", action="store_true",
+                        help="因子以 float32 存储（经逐列精度检查）")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="同时运行 profiler（结果与运行报告一起写入 data_pipeline/reports/）")
+    args = parser.parse_args()
+    main(incremental=args.incremental, streaming=args.streaming,
+         memory_budget_mb=args.memory_budget_mb, float32=args.float32, profile=args.profile)
@@ -0,0 +1,62 @@
+"""
+build_panel_cache.py
+------------------------------------
+在 build_price_panel.py / build_features.py 之后运行，
+把价格、收益、rf_daily 和全部因子编译成对齐的 .npy 数组：
+
+    data_pipeline/cache/panel/
+        meta.json, dates.npy, prices.npy, returns.npy, rf.npy, factors/<因子>.npy
+
+回测端（run_mom_trend_strategy / BacktestEngine）通过 np.memmap 直接映射，
+无需再解析 parquet、pivot、reindex；多个进程共享同一份物理内存页。
+
+meta.json 记录了源文件的 mtime/size 签名，源文件更新后缓存自动视为过期。
+
+依赖:
+    pip install pandas numpy pyarrow
+"""
+
+import os
+import sys
+
+from build_features import (
+    MACRO_DIR,
+    PROCESSED_DIR,
+    PROJECT_ROOT,
+    build_basic_tech_factors_wide,
+    build_returns_from_prices,
+    load_prices_wide,
+    load_rf_daily,
+)
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core import panel_cache  # noqa: E402
+
+
+def main():
+    print("========== Build Panel Cache (.npy) ==========")
+
+    prices_path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+    rf_path = os.path.join(MACRO_DIR, "risk_free_irx.parquet")
+
+    prices_wide = load_prices_wide(prices_path)
+    returns_wide = build_returns_from_prices(prices_wide)
+    rf_daily = load_rf_daily(prices_wide.index)
+    print(f"[INFO] prices_wide 形状: {prices_wide.shape}")
+
+    factors = build_basic_tech_factors_wide(prices_wide, returns_wide, rf_daily)
+    print(f"[INFO] 因子: {list(factors)}")
+
+    # rf 只对齐不填充，ffill 由使用方在截取区间后自行决定
+    rf_raw = load_rf_daily(prices_wide.index, ffill=False)
+
+    sources = [p for p in (prices_path, rf_path) if os.path.exists(p)]
+    panel_cache.write_panel_cache(prices_wide, returns_wide, rf_raw, factors, sources=sources)
+
+    print(f"[OK] Saved panel cache → {panel_cache.CACHE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,33 @@ build_price_panel.py
 
 输出:
     data_pipeline/processed/prices_wide.parquet
+    data_pipeline/lake/processed/prices_wide/year=YYYY/  (按年分区，供按日期 / ticker 下推读取)
 
 结构:
     index: date (DatetimeIndex, 升序)
     columns: 每个 ticker 一列，值为 adj_close 或 close
+
+用法:
+    python build_price_panel.py                                   # 全量载入内存后拼接
+    python build_price_panel.py --workers 8                       # 指定并行读取 raw 的线程数
+    python build_price_panel.py --streaming --memory-budget-mb 512
+        # 流式：先扫描日期并集，每个 raw 文件读一次落到磁盘 memmap，再按日期块逐块写 parquet row group，
+        # 峰值内存约为 memory_budget_mb，适合内存放不下的大 universe
+    python build_price_panel.py --profile sampling
+        # 各阶段耗时 / 行数 / 字节数 / 峰值 RSS 写入 data_pipeline/reports/build_price_panel-*.json，
+        # 并附带采样 profiler 的 collapsed stacks（cprofile 则为 .prof）
 """
 
+import argparse
 import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # ------------ 路径设置 ------------
 
@@ -31,8 +50,17 @@ RAW_DIR = os.path.join(ROOT_DIR, "raw")
 PROCESSED_DIR = os.path.join(ROOT_DIR, "processed")
 CONFIG_DIR = os.path.join(ROOT_DIR, "config")
 
+PROJECT_ROOT = os.path.abspath(os.path.join(ROOT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core import datalake, instrumentation  # noqa: E402
+
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+# 并行读取 raw 文件的线程数
+DEFAULT_WORKERS = min(16, os.cpu_count() or 1)
+
 
 def load_tickers(config_path=None):
     """读取 config/tickers.csv，获取 ticker 列表"""
@@ -46,65 +74,186 @@ def load_tickers(config_path=None):
     return df["ticker"].tolist()
 
 
-def load_single_price_series(ticker: str) -> pd.Series:
+def resolve_price_column(path):
+    """只读 schema，返回价格列的实际列名（优先 adj_close，其次 close，忽略大小写）"""
+    names = {str(c).lower(): c for c in pq.read_schema(path).names}
+    if "date" not in names:
+        raise ValueError(f"{path} 中没有 'date' 列，当前列: {list(names)}")
+    for candidate in ("adj_close", "close"):
+        if candidate in names:
+            return names["date"], names[candidate]
+    raise ValueError(f"{path} 中既没有 'adj_close' 也没有 'close' 列，当前列: {list(names)}")
+
+
+def read_price_arrays(ticker: str, raw_dir=None):
     """
-    从 raw/{ticker}.parquet 读取该资产的价格序列（优先 adj_close，没有则用 close）。
-    返回: Series，index=date (DatetimeIndex)，name=ticker
+    从 raw/{ticker}.parquet 只读取 date 和价格两列（优先 adj_close，没有则用 close）。
+    返回: (dates: datetime64[ns] 数组, prices: float64 数组)，按日期升序
     """
-    path = os.path.join(RAW_DIR, f"{ticker}.parquet")
+    raw_dir = raw_dir or RAW_DIR
+    path = os.path.join(raw_dir, f"{ticker}.parquet")
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到原始数据文件: {path}")
 
-    df = pd.read_parquet(path)
+    date_col, price_col = resolve_price_column(path)
+    # 外层已按文件并行，单文件内部不再开线程
+    table = pq.read_table(path, columns=[date_col, price_col], use_threads=False)
+    dates = table.column(date_col)
+    if pa.types.is_timestamp(dates.type) or pa.types.is_date(dates.type):
+        # 直接在 arrow 里转 ns 时间戳，避免逐文件经 pandas 解析
+        dates = dates.cast(pa.timestamp("ns")).to_numpy()
+    else:
+        dates = pd.to_datetime(dates.to_pandas()).to_numpy("datetime64[ns]")
+    prices = np.asarray(table.column(price_col).to_numpy(), dtype=np.float64)
 
-    # 列名统一一下，保险
-    df.columns = [str(c).lower() for c in df.columns]
+    order = np.argsort(dates, kind="stable")
+    return dates[order], prices[order]
 
-    if "date" not in df.columns:
-        raise ValueError(f"{ticker} 数据中没有 'date' 列，当前列: {df.columns}")
 
-    df["date"] = pd.to_datetime(df["date"])
-    df = df.sort_values("date").reset_index(drop=True)
+def load_single_price_series(ticker: str, raw_dir=None) -> pd.Series:
+    """
+    读取单个资产的价格序列。
+    返回: Series，index=date (DatetimeIndex)，name=ticker
+    """
+    dates, prices = read_price_arrays(ticker, raw_dir)
+    return pd.Series(prices, index=pd.DatetimeIndex(dates, name="date"), name=ticker)
 
-    # 价格列优先 adj_close，其次 close
-    price_col = None
-    if "adj_close" in df.columns:
-        price_col = "adj_close"
-    elif "close" in df.columns:
-        price_col = "close"
-    else:
-        raise ValueError(f"{ticker} 数据中既没有 'adj_close' 也没有 'close' 列，当前列: {df.columns}")
 
-    s = df.set_index("date")[price_col].copy()
-    s.name = ticker
+def build_prices_wide(tickers, workers=DEFAULT_WORKERS, raw_dir=None):
+    """
+    从多只资产的 (date, price) 两列拼成宽表 DataFrame
+    index: date (全量 union)
+    columns: tickers
+
+    raw 文件用线程池并行读取（pyarrow 读 parquet 时释放 GIL），
+    再一次性分配 (日期并集 × ticker) 数组按位置填充，不做逐列 concat / 对齐。
+    """
+    with instrumentation.stage("read_raw") as read:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            arrays = list(pool.map(lambda t: read_price_arrays(t, raw_dir), tickers))
+        read.count(rows=sum(len(dates) for dates, _ in arrays),
+                   bytes=sum(dates.nbytes + prices.nbytes for dates, prices in arrays))
+
+    with instrumentation.stage("calendar") as union:
+        calendar = np.unique(np.concatenate([dates for dates, _ in arrays])) if arrays else \
+            np.array([], dtype="datetime64[ns]")
 
-    return s
+    with instrumentation.stage("fill") as fill:
+        panel = np.full((len(calendar), len(tickers)), np.nan)
+        for j, (dates, prices) in enumerate(arrays):
+            panel[np.searchsorted(calendar, dates), j] = prices
+        prices_wide = pd.DataFrame(panel, index=pd.DatetimeIndex(calendar, name="date"), columns=list(tickers))
+        fill.count(rows=len(prices_wide), bytes=panel.nbytes)
 
+    print(f"[INFO] 读取 {len(tickers)} 个 raw 文件 ({workers} 线程): {read.seconds:.2f}s，"
+          f"日期并集: {union.seconds:.2f}s，填充宽表: {fill.seconds:.2f}s")
+    return prices_wide
+
+
+# ------------ 流式构建 ------------
 
-def build_prices_wide(tickers):
+def scan_price_calendar(tickers, raw_dir=None):
     """
-    从多只资产的单独 price Series 拼成宽表 DataFrame
-    index: date (全量 union)
-    columns: tickers
+    只读每个文件的 date 列，增量求日期并集（不同时持有所有 ticker 的数据）。
+    返回: (calendar: DatetimeIndex, sources: {ticker: (path, date_col, price_col)})
     """
-    series_list = []
+    raw_dir = raw_dir or RAW_DIR
+    calendar = np.array([], dtype="datetime64[ns]")
+    sources = {}
     for ticker in tickers:
-        print(f"[INFO] 处理 {ticker} ...")
-        s = load_single_price_series(ticker)
-        series_list.append(s)
+        path = os.path.join(raw_dir, f"{ticker}.parquet")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"未找到原始数据文件: {path}")
+        date_col, price_col = resolve_price_column(path)
+        dates = pd.to_datetime(pd.read_parquet(path, columns=[date_col])[date_col]).to_numpy("datetime64[ns]")
+        calendar = np.union1d(calendar, dates)
+        sources[ticker] = (path, date_col, price_col)
+    return pd.DatetimeIndex(calendar, name="date"), sources
 
-    # 按列拼接，按日期 union，对齐
-    prices_wide = pd.concat(series_list, axis=1).sort_index()
-    return prices_wide
 
+def build_prices_wide_streaming(tickers, output_path, memory_budget_mb=512, raw_dir=None, lake_dir=None):
+    """
+    流式构建 prices_wide.parquet：
+        1. 扫描所有 raw 文件的 date 列得到日期并集
+        2. 每个 ticker 只读一次，写入磁盘上预分配的 (date × ticker) 列存 memmap
+        3. 按日期块（块大小由内存预算决定）从 memmap 切出 (block × ticker)，
+           每块作为一个 row group 追加写入 parquet，同时追加到分区数据集
+
+    峰值内存 ≈ 日期块数组 + 单个 raw 文件，与 universe 总大小无关；
+    raw 读取量与 ticker 数成正比，与日期块数无关。memmap 临时文件放在输出目录旁，写完即删。
+    返回 (行数, 列数)
+    """
+    with instrumentation.stage("scan_calendar"):
+        calendar, _ = scan_price_calendar(tickers, raw_dir)
+    n_dates, n_tickers = len(calendar), len(tickers)
+    calendar_values = calendar.to_numpy("datetime64[ns]")
+
+    # 每行 n_tickers 个 float64；再乘 3 给 pandas / arrow 转换留出余量
+    budget = memory_budget_mb * 1024 ** 2
+    rows_per_block = max(1, min(n_dates, budget // (8 * n_tickers * 3)))
+    n_blocks = -(-n_dates // rows_per_block)
+    print(f"[INFO] 流式模式: {n_dates} dates × {n_tickers} tickers，"
+          f"每块 {rows_per_block} 行，共 {n_blocks} 块")
 
-def main():
+    datalake.reset_dataset(datalake.PRICES_DATASET, lake_dir)
+    writer = None
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as spill_dir:
+        # 列存（Fortran 序）：每个 ticker 一段连续区域，逐 ticker 写入时不跨列跳读
+        panel = np.lib.format.open_memmap(os.path.join(spill_dir, "prices_wide.npy"), mode="w+",
+                                          dtype=np.float64, shape=(n_dates, n_tickers), fortran_order=True)
+        try:
+            with instrumentation.stage("read_raw") as read:
+                for j, ticker in enumerate(tickers):
+                    dates, prices = read_price_arrays(ticker, raw_dir)
+                    column = np.full(n_dates, np.nan)
+                    column[np.searchsorted(calendar_values, dates)] = prices
+                    panel[:, j] = column
+                    read.count(rows=len(dates), bytes=dates.nbytes + prices.nbytes)
+
+            for block_id, start in enumerate(range(0, n_dates, rows_per_block)):
+                with instrumentation.stage("write_block"):
+                    block_dates = calendar[start:start + rows_per_block]
+                    block = np.array(panel[start:start + rows_per_block])
+                    block_df = pd.DataFrame(block, index=block_dates, columns=tickers)
+                    table = pa.Table.from_pandas(block_df)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_path, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                    datalake.write_prices_wide(block_df, lake_dir=lake_dir, part_id=block_id)
+        finally:
+            if writer is not None:
+                writer.close()
+            del panel
+
+    return n_dates, n_tickers
+
+
+def main(streaming=False, memory_budget_mb=512, workers=DEFAULT_WORKERS, profile=None):
     print("========== Build Price Panel (prices_wide) ==========")
 
+    with instrumentation.run("build_price_panel", profile=profile) as report:
+        build_and_save(streaming, memory_budget_mb, workers, report)
+
+    print("\n[INFO] 各阶段耗时:")
+    print(report.summary())
+    print(f"[OK] 运行报告 → {report.path}")
+
+
+def build_and_save(streaming, memory_budget_mb, workers, report):
+    """main 的主体：在 instrumentation run 内构建并保存 prices_wide"""
     tickers = load_tickers()
     print(f"[INFO] 从 tickers.csv 读取到标的: {tickers}")
+    report.count(tickers=len(tickers))
 
-    prices_wide = build_prices_wide(tickers)
+    if streaming:
+        output_path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+        shape = build_prices_wide_streaming(tickers, output_path, memory_budget_mb)
+        print(f"[INFO] prices_wide 形状: {shape}")
+        print(f"\n[OK] 已保存 prices_wide → {output_path}")
+        print(f"[OK] 已保存分区 prices_wide → {datalake.dataset_path(datalake.PRICES_DATASET)}")
+        return
+
+    prices_wide = build_prices_wide(tickers, workers=workers)
     print(f"[INFO] prices_wide 形状: {prices_wide.shape}")
     print("[INFO] 列预览:", prices_wide.columns.tolist())
     print("[INFO] 日期范围:", prices_wide.index.min(), "→", prices_wide.index.max())
@@ -115,9 +264,28 @@ def main():
 
     # 保存
     output_path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
-    prices_wide.to_parquet(output_path)
-    print(f"\n[OK] 已保存 prices_wide → {output_path}")
+    with instrumentation.stage("save_parquet") as save:
+        prices_wide.to_parquet(output_path)
+        save.count(rows=len(prices_wide), bytes=instrumentation.nbytes(output_path))
+    print(f"\n[OK] 已保存 prices_wide → {output_path} ({save.seconds:.2f}s)")
+
+    lake_path = datalake.dataset_path(datalake.PRICES_DATASET)
+    with instrumentation.stage("save_lake") as save:
+        datalake.write_prices_wide(prices_wide)
+        save.count(rows=len(prices_wide), bytes=instrumentation.nbytes(lake_path))
+    print(f"[OK] 已保存分区 prices_wide → {lake_path} ({save.seconds:.2f}s)")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="拼接宽表价格矩阵 prices_wide")
+    parser.add_argument("--streaming", action="store_true",
+                        help="按日期块流式写出，峰值内存受 --memory-budget-mb 限制")
+    parser.add_argument("--memory-budget-mb", type=int, default=512,
+                        help="流式模式的内存预算 (MB)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="并行读取 raw 文件的线程数")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="同时运行 profiler（结果与运行报告一起写入 data_pipeline/reports/）")
+    args = parser.parse_args()
+    main(streaming=args.streaming, memory_budget_mb=args.memory_budget_mb, workers=args.workers,
+         profile=args.profile)
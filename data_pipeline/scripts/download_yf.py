@@ -15,12 +15,43 @@ download_yf.py
         XLK.parquet
         ...
 
+用法:
+    python download_yf.py                # 全量下载（从 DEFAULT_START_DATE 开始）
+    python download_yf.py --incremental  # 只下载每个 ticker 已存日期之后的数据并合并
 
+增量模式会重新下载最近 OVERLAP_DAYS 天与已存数据对比 adj_close，
+若发现复权价被修订（分红 / 拆股等公司行为），只对该 ticker 全量重下。
+
+数据源是任意提供 download(ticker, start=..., end=..., ...) 的对象（默认 YFTickerClient），
+yfinance 只在实际请求时才导入；离线测试用 tests/fake_yf.py 中的本地替身。
+
+并发下载:
+    python download_yf.py --workers 8 --rate 4 --retries 3
+    python download_yf.py --resume       # 跳过 manifest 中今天已成功的 ticker
+
+    - 线程池并发，--workers 控制并发数
+    - 令牌桶限速，--rate 为平均每秒请求数
+    - 暂时性错误（网络、超时、HTTP 429 / 5xx）按指数退避（带抖动）重试，--retries 为最大重试次数；
+      其他错误（无效 ticker、解析错误等）不重试，直接记为失败
+    - 每个 ticker 的状态连同运行日期写入 raw/_manifest.json；--resume 只跳过同一运行日期内
+      已成功的 ticker，前一天成功的 ticker 照常刷新
+
+运行报告:
+    python download_yf.py --profile sampling
+    每次运行把各阶段（限速等待 / 请求 / 保存 / 重试退避）的累计耗时、行数、字节数和峰值 RSS
+    写入 data_pipeline/reports/download_yf-*.json；各线程的耗时累加，可能超过总墙钟时间
 """
 
+import argparse
+import json
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
 from pathlib import Path
 
@@ -30,6 +61,32 @@ DEFAULT_START_DATE = "1980-01-01"
 # 获取项目根目录（scripts 向上两级）
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from strategy_engine.core import datalake, instrumentation  # noqa: E402
+
+try:
+    import requests
+    REQUEST_ERRORS = (requests.ConnectionError, requests.Timeout)
+except ImportError:
+    REQUEST_ERRORS = ()
+
+# 增量下载时与已存数据重叠的自然日数，用于检测 adj_close 修订
+OVERLAP_DAYS = 10
+# 重叠区间 adj_close 的相对误差超过该值即视为复权修订
+ADJ_CLOSE_RTOL = 1e-6
+
+# 并发下载默认参数
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0          # 平均每秒请求数
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 1.0          # 第 n 次重试前等待 BACKOFF_BASE * 2**(n-1) 秒（再乘随机抖动）
+BACKOFF_MAX = 30.0
+MANIFEST_NAME = "_manifest.json"
+
+# 可以重试的 HTTP 状态码（限流 / 服务端暂时不可用）
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
 def load_tickers(config_path=None):
@@ -42,12 +99,18 @@ def load_tickers(config_path=None):
     return tickers["ticker"].tolist()
 
 
-def download_single_ticker(ticker, start=DEFAULT_START_DATE, end=None):
-    """从 yfinance 下载单一 ETF 数据"""
-    print(f"[INFO] Downloading {ticker} ...")
+def download_single_ticker(ticker, start=DEFAULT_START_DATE, end=None, client=None, raise_errors=False):
+    """
+    从 yfinance 下载单一 ETF 数据。
+    client: 提供 download(...) 接口的对象，默认 YFTickerClient；离线测试时可传入本地替身
+    raise_errors: True 时下载异常直接抛出（交给调用方重试），否则打印并返回 None
+    """
+    if client is None:
+        client = YFTickerClient()
+    print(f"[INFO] Downloading {ticker} (start={start}) ...")
 
     try:
-        df = yf.download(
+        df = client.download(
             ticker,
             start=start,
             end=end,
@@ -72,35 +135,351 @@ def download_single_ticker(ticker, start=DEFAULT_START_DATE, end=None):
         return df
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"[ERROR] 下载 {ticker} 时发生错误: {e}")
         return None
 
 
-def save_raw(df, ticker, output_dir=None):
-    """保存原始 parquet 文件"""
+def save_raw(df, ticker, output_dir=None, lake_dir=None):
+    """保存原始 parquet 文件，并写入 lake/raw/ticker={ticker}/ 分区"""
     if output_dir is None:
         output_dir = PROJECT_ROOT / "data_pipeline" / "raw"
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, f"{ticker}.parquet")
-    df.to_parquet(output_path, index=False)
+    with instrumentation.stage("save_raw") as save:
+        df.to_parquet(output_path, index=False)
+        datalake.write_raw(df, ticker, lake_dir=lake_dir)
+        save.count(rows=len(df), bytes=instrumentation.nbytes(output_path))
     print(f"[OK] Saved → {output_path}")
 
 
-def main():
+def load_raw(ticker, output_dir=None):
+    """读取已存的 raw/{ticker}.parquet，不存在时返回 None"""
+    if output_dir is None:
+        output_dir = PROJECT_ROOT / "data_pipeline" / "raw"
+    path = os.path.join(output_dir, f"{ticker}.parquet")
+    if not os.path.exists(path):
+        return None
+    df = pd.read_parquet(path)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def has_adj_close_restatement(existing, fresh, rtol=ADJ_CLOSE_RTOL):
+    """对比重叠日期上的 adj_close，任一日期相对误差超过 rtol 即认为历史复权价被修订"""
+    overlap = existing[["date", "adj_close"]].merge(
+        fresh[["date", "adj_close"]], on="date", suffixes=("_old", "_new")
+    )
+    if overlap.empty:
+        return False
+    old = overlap["adj_close_old"].to_numpy()
+    new = overlap["adj_close_new"].to_numpy()
+    return not bool(((abs(new - old) <= rtol * abs(old)) | (pd.isna(old) & pd.isna(new))).all())
+
+
+def update_single_ticker(ticker, output_dir=None, client=None, overlap_days=OVERLAP_DAYS, raise_errors=False):
+    """
+    增量更新单个 ticker：
+        1. 读取已存数据的最后日期
+        2. 从 (最后日期 - overlap_days) 开始下载
+        3. 列与已存文件不同，或重叠区间 adj_close 有修订 → 该 ticker 全量重下；否则合并去重
+
+    返回: (DataFrame 或 None, status)，status ∈ {"full", "delta", "unchanged", "refetched", "failed"}
+    """
+    existing = load_raw(ticker, output_dir)
+    if existing is None or existing.empty:
+        df = download_single_ticker(ticker, client=client, raise_errors=raise_errors)
+        return df, ("full" if df is not None else "failed")
+
+    last_date = existing["date"].max()
+    start = (last_date - pd.Timedelta(days=overlap_days)).strftime("%Y-%m-%d")
+    fresh = download_single_ticker(ticker, start=start, client=client, raise_errors=raise_errors)
+    if fresh is None:
+        return None, "failed"
+    fresh["date"] = pd.to_datetime(fresh["date"])
+
+    if set(fresh.columns) != set(existing.columns):
+        # 旧文件或数据源的列有变化：拼接会缺列 / 丢列，整段重下保证单一 schema
+        print(f"[INFO] {ticker} 的列与已存文件不同 ({sorted(existing.columns)} → {sorted(fresh.columns)})，全量重新下载")
+        df = download_single_ticker(ticker, client=client, raise_errors=raise_errors)
+        return df, ("refetched" if df is not None else "failed")
+
+    if has_adj_close_restatement(existing, fresh):
+        print(f"[INFO] {ticker} 的 adj_close 在重叠区间被修订（公司行为），全量重新下载")
+        df = download_single_ticker(ticker, client=client, raise_errors=raise_errors)
+        return df, ("refetched" if df is not None else "failed")
+
+    n_new = int((fresh["date"] > last_date).sum())
+    if n_new == 0:
+        print(f"[INFO] {ticker} 没有新数据")
+        return existing, "unchanged"
+
+    merged = (
+        pd.concat([existing, fresh[existing.columns]], ignore_index=True)
+        .drop_duplicates(subset="date", keep="last")
+        .sort_values("date")
+        .reset_index(drop=True)
+    )
+    print(f"[INFO] {ticker} 新增 {n_new} 行，最新日期 {merged['date'].max().date()}")
+    return merged, "delta"
+
+
+# ------------ 并发下载 ------------
+
+class TokenBucket:
+    """线程安全的令牌桶：平均每秒 rate 个请求，最多突发 capacity 个"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不够时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """给任意 download(...) 数据源套上令牌桶：每次实际请求前先取令牌"""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def download(self, *args, **kwargs):
+        with instrumentation.stage("rate_limit_wait"):
+            self.bucket.acquire()
+        with instrumentation.stage("request"):
+            return self.client.download(*args, **kwargs)
+
+
+class YFTickerClient:
+    """
+    线程安全的 yfinance 数据源。
+    yf.download 内部使用模块级共享状态，多线程同时调用会串数据；
+    这里改用 yf.Ticker(...).history，返回与 yf.download 相同结构的 DataFrame。
+    yfinance 在第一次请求时才导入，本模块（以及注入其他数据源的调用方）不依赖它。
+    """
+
+    def download(self, ticker, start=None, end=None, auto_adjust=False, **kwargs):
+        import yfinance as yf
+
+        df = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=auto_adjust, actions=False)
+        if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = "Date"
+        return df
+
+
+class DownloadManifest:
+    """
+    每个 ticker 的下载状态，保存在 raw/_manifest.json，每次更新都落盘以便中断后续跑。
+    每条记录带 run_date：resume 只跳过同一运行日期内已成功的 ticker。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_done(self, ticker, run_date):
+        entry = self.entries.get(ticker, {})
+        return entry.get("status") == "ok" and entry.get("run_date") == run_date
+
+    def record(self, ticker, **fields):
+        with self.lock:
+            entry = self.entries.setdefault(ticker, {})
+            entry.update(fields)
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def is_transient(error):
+    """网络错误、超时、HTTP 429 / 5xx（含 yfinance 的限流异常）可以重试；其他错误重试也不会成功"""
+    if isinstance(error, (ConnectionError, TimeoutError) + REQUEST_ERRORS):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ == "YFRateLimitError"
+
+
+class RetryError(Exception):
+    """call_with_retry 放弃时抛出：error 为最后一次异常，attempts 为实际尝试次数"""
+
+    def __init__(self, error, attempts):
+        super().__init__(str(error))
+        self.error = error
+        self.attempts = attempts
+        self.transient = is_transient(error)
+
+
+def call_with_retry(func, max_retries=DEFAULT_MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                    backoff_max=BACKOFF_MAX, label=""):
+    """
+    调用 func()，暂时性错误（见 is_transient）按指数退避（带 50%~100% 随机抖动）重试。
+    返回 (结果, 尝试次数)；遇到不可重试的错误或重试耗尽时抛出 RetryError。
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return func(), attempt
+        except Exception as e:
+            if attempt > max_retries or not is_transient(e):
+                raise RetryError(e, attempt) from e
+            delay = min(backoff_max, backoff_base * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            print(f"[WARNING] {label} 第 {attempt} 次失败: {e}，{delay:.1f}s 后重试")
+            with instrumentation.stage("retry_backoff"):
+                time.sleep(delay)
+
+
+def fetch_and_save(ticker, incremental=False, client=None, output_dir=None, lake_dir=None):
+    """
+    下载（或增量更新）并保存单个 ticker，异常直接抛出。
+    返回 (status, DataFrame 或 None)
+    """
+    if incremental:
+        df, status = update_single_ticker(ticker, output_dir=output_dir, client=client, raise_errors=True)
+    else:
+        df = download_single_ticker(ticker, client=client, raise_errors=True)
+        status = "full"
+    if df is None:
+        return "empty", None
+    if status != "unchanged":
+        save_raw(df, ticker, output_dir, lake_dir)
+    return status, df
+
+
+def download_all(tickers, incremental=False, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                 max_retries=DEFAULT_MAX_RETRIES, resume=False, client=None, output_dir=None,
+                 lake_dir=None, run_date=None):
+    """
+    并发下载所有 ticker：线程池 + 令牌桶限速 + 指数退避重试 + manifest 记录。
+    resume=True 时跳过 manifest 中 run_date（默认今天）已成功的 ticker。
+    返回 {ticker: manifest entry}
+    """
+    if run_date is None:
+        run_date = datetime.now().date().isoformat()
+    if output_dir is None:
+        output_dir = PROJECT_ROOT / "data_pipeline" / "raw"
+    os.makedirs(output_dir, exist_ok=True)
+    if client is None:
+        client = YFTickerClient()
+
+    manifest = DownloadManifest(os.path.join(output_dir, MANIFEST_NAME))
+    limited = RateLimitedClient(client, TokenBucket(rate))
+
+    todo = [t for t in tickers if not (resume and manifest.is_done(t, run_date))]
+    if len(todo) < len(tickers):
+        print(f"[INFO] resume: 跳过 {len(tickers) - len(todo)} 个 {run_date} 已成功的 ticker")
+
+    def job(ticker):
+        return call_with_retry(
+            lambda: fetch_and_save(ticker, incremental, limited, output_dir, lake_dir),
+            max_retries=max_retries,
+            label=ticker,
+        )
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(job, ticker): ticker for ticker in todo}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                (status, df), attempts = future.result()
+            except RetryError as e:
+                if e.transient:
+                    print(f"[ERROR] {ticker} 重试 {e.attempts - 1} 次后仍失败: {e.error!r}")
+                else:
+                    print(f"[ERROR] {ticker} 不可重试的错误: {e.error!r}")
+                manifest.record(ticker, status="failed", run_date=run_date, attempts=e.attempts,
+                                error=repr(e.error), transient=e.transient)
+                continue
+
+            if status == "empty":
+                print(f"[SKIP] 未保存 {ticker}。")
+                manifest.record(ticker, status="empty", run_date=run_date, attempts=attempts, error=None,
+                                transient=None)
+            else:
+                manifest.record(
+                    ticker,
+                    status="ok",
+                    run_date=run_date,
+                    mode=status,
+                    attempts=attempts,
+                    rows=int(len(df)),
+                    last_date=str(pd.Timestamp(df["date"].max()).date()),
+                    error=None,
+                    transient=None,
+                )
+
+    entries = {t: manifest.entries.get(t, {}) for t in tickers}
+    n_ok = sum(1 for e in entries.values() if e.get("status") == "ok")
+    print(f"[INFO] {n_ok}/{len(tickers)} 成功，耗时 {time.perf_counter() - t0:.1f}s，"
+          f"manifest → {manifest.path}")
+    return entries
+
+
+def main(incremental=False, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+         max_retries=DEFAULT_MAX_RETRIES, resume=False, profile=None):
     print("========== YF Downloader Start ==========")
 
-    tickers = load_tickers()
-    print(f"[INFO] Loaded tickers: {tickers}")
+    with instrumentation.run("download_yf", profile=profile) as report:
+        tickers = load_tickers()
+        print(f"[INFO] Loaded tickers: {tickers}")
 
-    for ticker in tickers:
-        df = download_single_ticker(ticker)
-        if df is not None:
-            save_raw(df, ticker)
-        else:
-            print(f"[SKIP] 未保存 {ticker}。")
+        entries = download_all(
+            tickers,
+            incremental=incremental,
+            workers=workers,
+            rate=rate,
+            max_retries=max_retries,
+            resume=resume,
+        )
+        statuses = [e.get("status", "skipped") for e in entries.values()]
+        report.count(tickers=len(tickers), **{f"tickers_{s}": statuses.count(s) for s in set(statuses)})
 
+    print("\n[INFO] 各阶段耗时:")
+    print(report.summary())
+    print(f"[OK] 运行报告 → {report.path}")
     print("========== Done ==========")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="从 yfinance 下载 ETF 历史数据")
+    parser.add_argument("--incremental", action="store_true",
+                        help="只下载已存日期之后的数据并合并，检测到复权修订时对该 ticker 全量重下")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发下载线程数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="平均每秒请求数上限")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES, help="失败后的最大重试次数")
+    parser.add_argument("--resume", action="store_true", help="跳过 manifest 中今天已成功的 ticker")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="同时运行 profiler（结果与运行报告一起写入 data_pipeline/reports/）")
+    args = parser.parse_args()
+    main(
+        incremental=args.incremental,
+        workers=args.workers,
+        rate=args.rate,
+        max_retries=args.retries,
+        resume=args.resume,
+        profile=args.profile,
+    )
@@ -0,0 +1,418 @@
+"""
+run_pipeline.py
+------------------------------------
+数据管道的统一入口：按依赖关系 (DAG) 调度各阶段脚本，跳过输入没有变化的阶段，
+互不依赖的阶段并发运行，失败后重跑时从失败的阶段续跑。
+
+阶段 (依赖 → 输出):
+    download_yf        -                                   → raw/{ticker}.parquet, lake/raw/
+    build_macro_rf     -                                   → macro/risk_free_irx.parquet
+    build_price_panel  download_yf                         → processed/prices_wide.parquet, lake/processed/
+    build_features     build_price_panel, build_macro_rf   → features/basic_tech_factors.parquet, features/wide/, lake/features/
+    build_panel_cache  build_price_panel, build_macro_rf   → cache/panel/
+
+跳过规则:
+    - 每个阶段的指纹 = 脚本及其依赖的 core 模块源码 + 命令行参数 + 输入文件 / 目录的 (mtime, size) 签名
+    - download_yf / build_macro_rf 的输入是外部数据源，指纹里再加上当天日期：同一天内成功跑过即视为最新
+    - 指纹与上次成功运行一致、且输出没有被改动或删除 → 跳过
+    - 上游阶段重跑后输出变化，下游阶段的输入签名随之变化，自然重跑
+
+状态保存在 data_pipeline/cache/pipeline_state.json，每个阶段结束即落盘。
+某阶段失败时，依赖它的阶段不再运行，其余分支照常完成；修好后直接重跑，
+已成功且仍然最新的阶段都会跳过，即从失败的阶段续跑（download_yf 会带上 --resume，
+只补下载 manifest 中同一运行日期下未成功的 ticker；manifest 按运行日期记录，隔天续跑不会误用旧结果）。
+
+每个阶段在子进程中运行（yfinance 的 yf.download 不是线程安全的，子进程也能真正并行），
+输出逐行加上 [阶段名] 前缀转发到控制台。各阶段的墙钟耗时汇总到
+data_pipeline/reports/pipeline-*.json；各脚本自身的分阶段报告照常写在同一目录。
+
+用法:
+    python run_pipeline.py                         # 运行全部过期的阶段
+    python run_pipeline.py build_features          # 只运行 build_features 及其过期的上游
+    python run_pipeline.py --dry-run               # 只打印哪些阶段会运行、哪些会跳过
+    python run_pipeline.py --incremental           # download_yf / build_features 走增量模式
+    python run_pipeline.py --force build_features  # 无视指纹强制重跑
+    python run_pipeline.py --skip download_yf build_macro_rf
+        # 离线时不运行下载阶段，视为已完成，直接用本地已有数据
+    python run_pipeline.py --skip download_yf --skip build_macro_rf   # 重复给出时累加，等价于上一条
+"""
+
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# ------------ 路径设置 ------------
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+
+CONFIG_DIR = os.path.join(ROOT_DIR, "config")
+RAW_DIR = os.path.join(ROOT_DIR, "raw")
+PROCESSED_DIR = os.path.join(ROOT_DIR, "processed")
+FEATURES_DIR = os.path.join(ROOT_DIR, "features")
+MACRO_DIR = os.path.join(ROOT_DIR, "macro")
+CACHE_DIR = os.path.join(ROOT_DIR, "cache")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(ROOT_DIR, ".."))
+CORE_DIR = os.path.join(PROJECT_ROOT, "strategy_engine", "core")
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core import datalake, feature_store, instrumentation, panel_cache  # noqa: E402
+
+STATE_PATH = os.path.join(CACHE_DIR, "pipeline_state.json")
+
+TICKERS_PATH = os.path.join(CONFIG_DIR, "tickers.csv")
+PRICES_PATH = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+FEATURES_PATH = os.path.join(FEATURES_DIR, "basic_tech_factors.parquet")
+RF_PATH = os.path.join(MACRO_DIR, "risk_free_irx.parquet")
+
+# 同时运行的阶段数上限（目前 DAG 最宽处为 2）
+DEFAULT_WORKERS = 2
+
+
+# ------------ 阶段定义 ------------
+
+class PipelineStage:
+    """DAG 中的一个阶段：一个脚本，加上它的依赖、输入、输出和影响结果的源码文件"""
+
+    def __init__(self, name, script, deps=(), inputs=(), outputs=(), code=(), external=False, args=None):
+        self.name = name
+        self.script = script
+        self.deps = list(deps)
+        self.inputs = list(inputs)        # 文件或目录；签名变化即需要重跑
+        self.outputs = list(outputs)      # 成功后记录签名；被改动或删除即需要重跑
+        self.code = [script] + list(code)
+        self.external = external          # 输入来自网络：按天判断是否最新
+        self.args = args or (lambda options, resumed: [])
+
+    def command(self, options, resumed=False):
+        return [sys.executable, "-u", self.script] + self.args(options, resumed)
+
+
+def _script(name):
+    return os.path.join(THIS_DIR, name)
+
+
+def _core(name):
+    return os.path.join(CORE_DIR, f"{name}.py")
+
+
+def _lake(dataset):
+    return datalake.dataset_path(dataset)
+
+
+STAGES = [
+    PipelineStage(
+        "download_yf",
+        _script("download_yf.py"),
+        inputs=[TICKERS_PATH],
+        outputs=[RAW_DIR, _lake(datalake.RAW_DATASET)],
+        code=[_core("datalake")],
+        external=True,
+        args=lambda options, resumed: (["--incremental"] if options["incremental"] else [])
+        + (["--resume"] if resumed else []),
+    ),
+    PipelineStage(
+        "build_macro_rf",
+        os.path.join(ROOT_DIR, "build_macro_rf.py"),
+        outputs=[RF_PATH],
+        external=True,
+    ),
+    PipelineStage(
+        "build_price_panel",
+        _script("build_price_panel.py"),
+        deps=["download_yf"],
+        inputs=[TICKERS_PATH, RAW_DIR],
+        outputs=[PRICES_PATH, _lake(datalake.PRICES_DATASET)],
+        code=[_core("datalake")],
+    ),
+    PipelineStage(
+        "build_features",
+        _script("build_features.py"),
+        deps=["build_price_panel", "build_macro_rf"],
+        inputs=[PRICES_PATH, RF_PATH],
+        outputs=[FEATURES_PATH, feature_store.FEATURE_STORE_DIR,
+                 _lake(datalake.FEATURES_DATASET)],
+        code=[_core("datalake"), _core("feature_store"), _core("factors"), _core("kernels")],
+        args=lambda options, resumed: ["--incremental"] if options["incremental"] else [],
+    ),
+    PipelineStage(
+        "build_panel_cache",
+        _script("build_panel_cache.py"),
+        deps=["build_price_panel", "build_macro_rf"],
+        inputs=[PRICES_PATH, RF_PATH],
+        outputs=[panel_cache.CACHE_DIR],
+        code=[_script("build_features.py"), _core("panel_cache"), _core("factors"), _core("kernels")],
+    ),
+]
+
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def select_stages(targets=None):
+    """targets 及其全部上游阶段，按 STAGES 中的（拓扑）顺序返回"""
+    if not targets:
+        return list(STAGES)
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in STAGES_BY_NAME:
+            raise ValueError(f"未知阶段: {name}，可选: {list(STAGES_BY_NAME)}")
+        if name not in needed:
+            needed.add(name)
+            todo.extend(STAGES_BY_NAME[name].deps)
+    return [stage for stage in STAGES if stage.name in needed]
+
+
+# ------------ 指纹 ------------
+
+def path_signature(path):
+    """
+    文件 → [mtime_ns, size]；目录 → 其中所有文件 (相对路径, mtime_ns, size) 的摘要；不存在 → None。
+    目录中以 _ 开头的文件（如 raw/_manifest.json）和 .tmp 文件不计入。
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+    if not os.path.isdir(path):
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.startswith("_") or name.endswith(".tmp"):
+                continue
+            full = os.path.join(root, name)
+            stat = os.stat(full)
+            h.update(f"{os.path.relpath(full, path)}|{stat.st_mtime_ns}|{stat.st_size}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def code_digest(paths):
+    """源码文件内容的摘要（改动任一文件都会让阶段重跑）"""
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        h.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def stage_fingerprint(stage, options, as_of):
+    material = {
+        "args": stage.args(options, False),
+        "code": code_digest(stage.code),
+        "inputs": {os.path.relpath(p, ROOT_DIR): path_signature(p) for p in stage.inputs},
+        "as_of": as_of if stage.external else None,
+    }
+    return hashlib.blake2b(json.dumps(material, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def output_signatures(stage):
+    return {os.path.relpath(p, ROOT_DIR): path_signature(p) for p in stage.outputs}
+
+
+def stale_reason(stage, entry, fingerprint):
+    """阶段需要重跑的原因；已是最新时返回 None"""
+    if entry is None:
+        return "从未运行"
+    if entry.get("status") != "ok":
+        return "上次运行失败" if entry.get("status") == "failed" else "上次运行被中断"
+    if entry.get("fingerprint") != fingerprint:
+        return "输入 / 代码 / 参数已变化" if not stage.external else "输入 / 代码 / 参数已变化或已过一天"
+    current = output_signatures(stage)
+    if any(sig is None for sig in current.values()):
+        return "输出缺失"
+    if current != entry.get("outputs"):
+        return "输出已被改动"
+    return None
+
+
+# ------------ 状态 ------------
+
+class PipelineState:
+    """各阶段最近一次运行的结果，保存在 cache/pipeline_state.json，每次更新都落盘"""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stages = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.stages = json.load(f).get("stages", {})
+
+    def get(self, name):
+        return self.stages.get(name)
+
+    def record(self, name, **fields):
+        with self.lock:
+            entry = self.stages.setdefault(name, {})
+            entry.update(fields)
+            entry["updated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stages": self.stages}, f, indent=2, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+# ------------ 运行 ------------
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    """各阶段子进程的输出由多个线程同时转发，逐行加锁打印避免交错"""
+    with _print_lock:
+        print(message, flush=True)
+
+
+def run_stage(stage, options, resumed=False):
+    """在子进程中运行阶段脚本，逐行转发输出。返回 (退出码, 耗时秒数)"""
+    cmd = stage.command(options, resumed)
+    log(f"[INFO] ▶ {stage.name}: {' '.join(os.path.basename(c) for c in cmd[2:])}")
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    with instrumentation.stage(stage.name):
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=os.path.dirname(stage.script), env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace")
+        for line in proc.stdout:
+            log(f"[{stage.name}] {line.rstrip()}")
+        returncode = proc.wait()
+    return returncode, time.perf_counter() - t0
+
+
+def run_pipeline(targets=None, workers=DEFAULT_WORKERS, incremental=False, force=(), skip=(),
+                 dry_run=False, state_path=STATE_PATH):
+    """
+    按依赖顺序运行 targets 及其上游中过期的阶段，互不依赖的阶段最多 workers 个并发。
+    返回 {阶段名: "ok" | "fresh" | "skipped" | "failed" | "blocked" | "would run"}
+    """
+    stages = select_stages(targets)
+    options = {"incremental": incremental}
+    as_of = datetime.date.today().isoformat()
+    state = PipelineState(state_path)
+    force, skip = set(force), set(skip)
+
+    results = {}
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    def schedule(pool):
+        """把依赖都已结束的阶段提交运行或直接判定；有变化时返回 True"""
+        changed = False
+        for name, stage in list(pending.items()):
+            dep_results = [results.get(dep) for dep in stage.deps]
+            if any(r is None for r in dep_results):
+                continue
+            del pending[name]
+            changed = True
+
+            if any(r in ("failed", "blocked") for r in dep_results):
+                results[name] = "blocked"
+                log(f"[SKIP] {name}: 上游阶段失败，不运行")
+                continue
+            if name in skip:
+                results[name] = "skipped"
+                log(f"[SKIP] {name}: --skip，视为已完成")
+                continue
+
+            entry = state.get(name)
+            fingerprint = stage_fingerprint(stage, options, as_of)
+            if name in force:
+                reason = "--force"
+            elif dry_run and "would run" in dep_results:
+                reason = "上游阶段将重跑"
+            else:
+                reason = stale_reason(stage, entry, fingerprint)
+            if reason is None:
+                results[name] = "fresh"
+                log(f"[SKIP] {name}: 已是最新")
+                continue
+            if dry_run:
+                results[name] = "would run"
+                log(f"[PLAN] {name}: 将运行（{reason}）")
+                continue
+
+            # 上次失败或被中断：download_yf 只补下载未成功的 ticker
+            resumed = entry is not None and entry.get("status") in ("failed", "running")
+            log(f"[INFO] {name}: 需要运行（{reason}）")
+            state.record(name, status="running", started_at=datetime.datetime.now().isoformat(timespec="seconds"))
+            running[pool.submit(run_stage, stage, options, resumed)] = (stage, fingerprint)
+        return changed
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending or running:
+            while schedule(pool):
+                pass
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, fingerprint = running.pop(future)
+                try:
+                    returncode, seconds = future.result()
+                except Exception as e:
+                    returncode, seconds = None, 0.0
+                    log(f"[ERROR] {stage.name}: 无法启动: {e}")
+                if returncode == 0:
+                    results[stage.name] = "ok"
+                    state.record(stage.name, status="ok", fingerprint=fingerprint,
+                                 outputs=output_signatures(stage), seconds=round(seconds, 3), error=None)
+                    log(f"[OK] {stage.name} 完成，耗时 {seconds:.1f}s")
+                else:
+                    results[stage.name] = "failed"
+                    state.record(stage.name, status="failed", seconds=round(seconds, 3),
+                                 error=f"exit code {returncode}")
+                    log(f"[ERROR] {stage.name} 失败 (exit code {returncode})，耗时 {seconds:.1f}s")
+    return {stage.name: results[stage.name] for stage in stages if stage.name in results}
+
+
+def main(targets=None, workers=DEFAULT_WORKERS, incremental=False, force=(), skip=(), dry_run=False):
+    print("========== Run Data Pipeline ==========")
+
+    with instrumentation.run("pipeline", write=not dry_run) as report:
+        results = run_pipeline(targets, workers=workers, incremental=incremental,
+                               force=force, skip=skip, dry_run=dry_run)
+        report.count(**collections.Counter(f"stages_{status.replace(' ', '_')}" for status in results.values()))
+
+    print("\n[INFO] 阶段结果:")
+    for name, status in results.items():
+        entry = PipelineState().get(name) or {}
+        seconds = f"{entry['seconds']:.1f}s" if status == "ok" and entry.get("seconds") is not None else ""
+        print(f"    {name:<20}{status:<12}{seconds}")
+    if not dry_run:
+        print(f"[OK] 运行报告 → {report.path}")
+
+    failed = [name for name, status in results.items() if status in ("failed", "blocked")]
+    if failed:
+        print(f"[ERROR] 未完成的阶段: {', '.join(failed)}；修复后重跑即可从失败处续跑")
+        sys.exit(1)
+    print("========== Done ==========")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按依赖关系运行数据管道，跳过输入未变化的阶段")
+    parser.add_argument("targets", nargs="*", metavar="STAGE",
+                        help=f"要运行的阶段（自动包含上游），默认全部: {', '.join(STAGES_BY_NAME)}")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="最多同时运行的阶段数")
+    parser.add_argument("--incremental", action="store_true",
+                        help="download_yf / build_features 使用增量模式")
+    parser.add_argument("--force", nargs="+", action="extend", default=[], choices=list(STAGES_BY_NAME), metavar="STAGE",
+                        help="无视指纹强制重跑这些阶段")
+    parser.add_argument("--skip", nargs="+", action="extend", default=[], choices=list(STAGES_BY_NAME), metavar="STAGE",
+                        help="不运行这些阶段，视为已完成（例如离线时跳过下载）")
+    parser.add_argument("--dry-run", action="store_true", help="只打印运行计划，不执行")
+    args = parser.parse_args()
+    main(targets=args.targets, workers=args.workers, incremental=args.incremental,
+         force=args.force, skip=args.skip, dry_run=args.dry_run)
@@ -0,0 +1,323 @@
+"""
+Batch performance analytics.
+Scores every column of a (dates x strategies) daily return matrix at
+once: total / annual return, excess-return volatility, Sharpe, Sortino,
+Calmar, maximum drawdown and its duration. Moments are column
+reductions and the path-dependent metrics one walk over the dates,
+both in kernels.return_stats (a single numba-compiled pass when numba
+is installed).
+
+rolling_performance_stats and expanding_performance_stats produce the
+same metrics as time series (trailing windows / since inception) in
+O(dates) per strategy.
+
+Missing values are skipped per column, as pandas does with dropna():
+a strategy whose history starts later (NaN-ragged start) is scored over
+its own observations only, and the equity curve is flat across gaps.
+Columns are processed in chunks so the temporaries stay bounded for
+very wide sweeps.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .kernels import ANNUALIZATION
+
+
+METRICS = (
+    'n_days',
+    'total_return',
+    'ann_return',
+    'ann_vol_excess',
+    'ann_excess_ret',
+    'sharpe',
+    'max_drawdown',
+    'max_drawdown_duration',
+    'sortino',
+    'calmar',
+)
+
+# Integer-valued metrics
+COUNT_METRICS = ('n_days', 'max_drawdown_duration')
+
+# Strategies scored per chunk; bounds temporaries to ~dates x CHUNK_SIZE floats each
+CHUNK_SIZE = 4096
+
+
+def _prepare(returns, rf):
+    """
+    Normalize inputs to a float64 (dates x strategies) array and a (dates,) rf array.
+
+    Returns:
+        Tuple of (values, rf, dates or None, strategy index)
+    """
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    if isinstance(returns, pd.DataFrame):
+        dates, index = returns.index, returns.columns
+        if isinstance(rf, pd.Series):
+            rf = rf.reindex(dates)
+        values = returns.to_numpy(dtype=np.float64)
+    else:
+        values = np.asarray(returns, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        dates, index = None, pd.RangeIndex(values.shape[1])
+
+    n_dates = values.shape[0]
+    if rf is None:
+        rf = np.zeros(n_dates)
+    else:
+        rf = np.nan_to_num(np.asarray(rf, dtype=np.float64), nan=0.0)
+        if rf.shape != (n_dates,):
+            raise ValueError(f"rf has shape {rf.shape}, expected ({n_dates},)")
+    return values, rf, dates, index
+
+
+def _chunk_stats(ret, rf, annualization, use_jit):
+    """Metrics for one (dates x strategies) block; returns {metric: array}."""
+    n, total_return, mean, vol, downside_dev, max_drawdown, duration = kernels.return_stats(
+        ret, rf, use_jit=use_jit
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ann_return = (1.0 + total_return) ** (annualization / n) - 1.0
+        ann_vol = vol * np.sqrt(annualization)
+        ann_excess_ret = mean * annualization
+        downside_dev = downside_dev * np.sqrt(annualization)
+        sharpe = np.where(ann_vol > 0, ann_excess_ret / ann_vol, np.nan)
+        sortino = np.where(downside_dev > 0, ann_excess_ret / downside_dev, np.nan)
+        calmar = np.where(max_drawdown < 0, ann_return / np.abs(max_drawdown), np.nan)
+
+    stats = {
+        'n_days': n,
+        'total_return': total_return,
+        'ann_return': ann_return,
+        'ann_vol_excess': ann_vol,
+        'ann_excess_ret': ann_excess_ret,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': duration,
+        'sortino': sortino,
+        'calmar': calmar,
+    }
+    # Strategies without any observation have no metrics
+    empty = n == 0
+    if empty.any():
+        for name in METRICS:
+            if name not in COUNT_METRICS:
+                stats[name] = np.where(empty, np.nan, stats[name])
+    return stats
+
+
+def batch_performance_stats(returns, rf=None, annualization=ANNUALIZATION, chunk_size=CHUNK_SIZE,
+                            use_jit=None):
+    """
+    Performance metrics for many return series at once.
+
+    Args:
+        returns: DataFrame or array (dates x strategies) of daily simple
+            returns; NaN marks days a strategy has no return (e.g. before
+            it starts). A 1-D input is treated as one strategy.
+        rf: Optional Series / array of daily risk-free returns aligned to
+            the dates (a Series is reindexed to a DataFrame's index);
+            missing values count as 0
+        annualization: Periods per year
+        chunk_size: Strategies scored per vectorized pass
+        use_jit: Force (True) or disable (False) the compiled kernel;
+            default uses it for large inputs when numba is installed
+
+    Returns:
+        DataFrame indexed by strategy (the input's columns) with columns
+        METRICS. Volatility, Sharpe and Sortino use excess returns over
+        rf; Sortino uses the downside deviation below 0 excess return;
+        Calmar is annual return over absolute max drawdown; drawdown
+        duration is the longest stretch of observations below a prior
+        equity peak.
+    """
+    values, rf, dates, index = _prepare(returns, rf)
+    n_dates, n_strategies = values.shape
+
+    if use_jit is None:
+        use_jit = kernels.HAVE_NUMBA and values.size >= kernels.JIT_MIN_WORK
+
+    out = {
+        name: np.empty(n_strategies, dtype=np.int64 if name in COUNT_METRICS else np.float64)
+        for name in METRICS
+    }
+    block = None
+    for start in range(0, n_strategies, chunk_size):
+        sl = slice(start, min(start + chunk_size, n_strategies))
+        shape = (n_dates, sl.stop - sl.start)
+        if block is None or block.shape != shape:
+            block = np.empty(shape)
+        # C-contiguous copy, so each date's returns are adjacent for the kernel
+        np.copyto(block, values[:, sl])
+        stats = _chunk_stats(block, rf, annualization, use_jit)
+        for name in METRICS:
+            out[name][sl] = stats[name]
+
+    return pd.DataFrame(out, index=index, columns=list(METRICS))
+
+
+# =============== Rolling / expanding metrics ===============
+
+# Metric time series produced for each window (and for the expanding window)
+ROLLING_METRICS = (
+    'total_return',
+    'ann_return',
+    'ann_vol_excess',
+    'sharpe',
+    'sortino',
+    'max_drawdown',
+)
+
+
+def _log_equity(ret):
+    """Cumulative log growth with a leading zero row; NaN returns leave it flat."""
+    level = np.zeros((ret.shape[0] + 1, ret.shape[1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.cumsum(np.log1p(np.where(np.isnan(ret), 0.0, ret)), axis=0, out=level[1:])
+    return level
+
+
+def _ratios(out, sl, n, total_return, mean, std, downside_dev, annualization):
+    """Annualize and fill the return / risk ratio series of one column chunk."""
+    root = np.sqrt(annualization)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        out['total_return'][:, sl] = total_return
+        out['ann_return'][:, sl] = (1.0 + total_return) ** (annualization / n) - 1.0
+        out['ann_vol_excess'][:, sl] = std * root
+        out['sharpe'][:, sl] = np.where(std > 0, mean / std * root, np.nan)
+        out['sortino'][:, sl] = np.where(downside_dev > 0, mean / downside_dev * root, np.nan)
+
+
+def _frames(out, dates, index):
+    if dates is None:
+        return out
+    return {name: pd.DataFrame(values, index=dates, columns=index) for name, values in out.items()}
+
+
+def rolling_performance_stats(returns, windows, rf=None, annualization=ANNUALIZATION,
+                              chunk_size=CHUNK_SIZE, use_jit=None):
+    """
+    Trailing-window performance metrics as time series, for many strategies at once.
+
+    Each value equals batch_performance_stats applied to the `window`
+    returns ending on that date, but all windows are computed together:
+    moments from cumulative sums (kernels.rolling_moments), window
+    returns from differences of the log equity curve and drawdowns from
+    kernels.rolling_max_drawdown, each O(dates) per strategy.
+
+    Args:
+        returns: DataFrame or array (dates x strategies) of daily returns
+        windows: Window length, or list of lengths (e.g. [252, 756])
+        rf: Optional daily risk-free returns aligned to the dates
+        annualization: Periods per year
+        chunk_size: Strategies processed per pass
+        use_jit: Passed to kernels.rolling_moments
+
+    Returns:
+        Dict {window: {metric: DataFrame (dates x strategies)}} over
+        ROLLING_METRICS (arrays for array input); NaN until a full window
+        without missing returns is available
+    """
+    windows = [int(w) for w in np.atleast_1d(windows)]
+    values, rf, dates, index = _prepare(returns, rf)
+    n_dates, n_strategies = values.shape
+    out = {w: {name: np.full(values.shape, np.nan) for name in ROLLING_METRICS} for w in windows}
+
+    for start in range(0, n_strategies, chunk_size):
+        sl = slice(start, min(start + chunk_size, n_strategies))
+        ret = values[:, sl]
+        excess = ret - rf[:, None]
+        means, stds = kernels.rolling_moments(excess, windows, use_jit=use_jit)
+        downside = np.minimum(excess, 0.0)
+        downside *= downside
+        downside_means, _ = kernels.rolling_moments(downside, windows, use_jit=use_jit, with_std=False)
+        # Loss days counted exactly: without any, the cumulative-sum mean of
+        # squared losses is round-off rather than 0
+        losses = np.zeros((n_dates + 1, ret.shape[1]), dtype=np.int64)
+        np.cumsum(excess < 0.0, axis=0, out=losses[1:])
+        del excess, downside
+        level = _log_equity(ret)
+
+        for w in windows:
+            if w > n_dates:
+                continue
+            rows = slice(w - 1, n_dates)
+            mean = means[w][rows]
+            # Window return; NaN wherever the window has a missing return
+            total_return = np.expm1(level[w:] - level[:-w])
+            total_return[np.isnan(mean)] = np.nan
+            # Views of the rows with a full window; _ratios writes through them
+            window_out = {name: arr[rows] for name, arr in out[w].items()}
+            downside_dev = np.sqrt(np.maximum(downside_means[w][rows], 0.0))
+            downside_dev[losses[w:] == losses[:-w]] = 0.0
+            _ratios(window_out, sl, w, total_return, mean, stds[w][rows], downside_dev, annualization)
+            out[w]['max_drawdown'][:, sl] = kernels.rolling_max_drawdown(ret, w)
+
+    return {w: _frames(out[w], dates, index) for w in windows}
+
+
+def expanding_performance_stats(returns, rf=None, annualization=ANNUALIZATION, min_periods=1,
+                                chunk_size=CHUNK_SIZE):
+    """
+    Since-inception performance metrics as time series, for many strategies at once.
+
+    Each value equals batch_performance_stats over all returns up to that
+    date (missing returns skipped), computed with running sums and a
+    running peak in one pass.
+
+    Args:
+        returns: DataFrame or array (dates x strategies) of daily returns
+        rf: Optional daily risk-free returns aligned to the dates
+        annualization: Periods per year
+        min_periods: Observed returns required before metrics are reported
+        chunk_size: Strategies processed per pass
+
+    Returns:
+        Dict {metric: DataFrame (dates x strategies)} over 'n_days' and
+        ROLLING_METRICS (arrays for array input)
+    """
+    values, rf, dates, index = _prepare(returns, rf)
+    n_dates, n_strategies = values.shape
+    out = {name: np.full(values.shape, np.nan) for name in ROLLING_METRICS}
+    out = {'n_days': np.zeros(values.shape, dtype=np.int64), **out}
+
+    for start in range(0, n_strategies, chunk_size):
+        sl = slice(start, min(start + chunk_size, n_strategies))
+        ret = values[:, sl]
+        valid = ~np.isnan(ret)
+        n = np.cumsum(valid, axis=0)
+        excess = np.where(valid, ret - rf[:, None], 0.0)
+
+        # Running moments, shifted by each strategy's first excess return
+        # (known at that point, unlike the full-sample mean) for conditioning
+        first = valid.argmax(axis=0)
+        shift = np.where(valid.any(axis=0), excess[first, np.arange(ret.shape[1])], 0.0)
+        dev = np.where(valid, excess - shift, 0.0)
+        s1 = np.cumsum(dev, axis=0)
+        np.square(dev, out=dev)
+        s2 = np.cumsum(dev, axis=0)
+        del dev
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = shift + s1 / n
+            std = np.sqrt(np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1))
+            downside = np.minimum(excess, 0.0)
+            downside_dev = np.sqrt(np.cumsum(downside * downside, axis=0) / n)
+        del s1, s2, excess, downside
+
+        level = _log_equity(ret)[1:]
+        peak = np.maximum.accumulate(np.where(valid, level, -np.inf), axis=0)
+        max_drawdown = np.expm1(np.minimum.accumulate(np.where(valid, level - peak, 0.0), axis=0))
+
+        _ratios(out, sl, n, np.expm1(level), mean, std, downside_dev, annualization)
+        out['max_drawdown'][:, sl] = max_drawdown
+        out['n_days'][:, sl] = n
+
+        warmup = n < max(min_periods, 1)
+        for name in ROLLING_METRICS:
+            out[name][:, sl][warmup] = np.nan
+
+    return _frames(out, dates, index)
@@ -3,15 +3,28 @@ Backtest engine for strategy evaluation.
 Simulates strategy performance over historical data.
 """
 
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+if __package__ in (None, ''):
+    # Run as a file (python backtest.py): import through the package root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from strategy_engine.core.rebalance import TRADE_TOLERANCE, price_returns, rebalance_schedule, simulate_rebalancing
+    from strategy_engine.core.result_cache import fingerprint
+else:
+    from .rebalance import TRADE_TOLERANCE, price_returns, rebalance_schedule, simulate_rebalancing
+    from .result_cache import fingerprint
+
 
 class BacktestEngine:
     """Run backtest simulation for trading strategy."""
     
-    def __init__(self, prices, signals, initial_capital=100000, commission=0.001):
+    def __init__(self, prices, signals, initial_capital=100000, commission=0.001,
+                 rebalance_frequency='daily', no_trade_band=0.0, fixed_cost=0.0):
         """
         Initialize backtest engine.
         
@@ -20,43 +33,215 @@ class BacktestEngine:
             signals: DataFrame of trading signals (dates x assets)
             initial_capital: Starting capital
             commission: Trading commission as decimal
+            rebalance_frequency: 'daily', 'weekly' or 'monthly'
+            no_trade_band: Assets whose drifted weight is within this
+                absolute distance of target are not traded
+            fixed_cost: Fixed cost per asset traded, in currency units
         """
         self.prices = prices
         self.signals = signals
         self.initial_capital = initial_capital
         self.commission = commission
+        self.rebalance_frequency = rebalance_frequency
+        self.no_trade_band = no_trade_band
+        self.fixed_cost = fixed_cost
         self.trades = []
         self.portfolio_values = []
         self.positions = {}
+        self.dates = None
+        self.weights = None
+        self.turnover = None
+        self.commissions = None
+    
+    @classmethod
+    def from_panel_cache(cls, signals, cache=None, **kwargs):
+        """
+        Build an engine whose prices come from the memory-mapped panel cache.
+        
+        Args:
+            signals: DataFrame of trading signals (dates x assets)
+            cache: Optional open PanelCache (defaults to the pipeline cache)
+            **kwargs: Passed to the constructor (initial_capital, commission)
+        """
+        from .panel_cache import PanelCache
+        
+        cache = cache if cache is not None else PanelCache()
+        prices = cache.frame('prices', list(signals.columns))
+        return cls(prices, signals, **kwargs)
     
-    def run(self):
-        """Run the backtest."""
+    def run(self, mode='vectorized', cache=None):
+        """
+        Run the backtest.
+        
+        Each date the portfolio is marked to market. On rebalance dates it
+        is traded to the signal-based target weights (signals normalized by
+        gross exposure, all-zero rows held in cash), skipping assets inside
+        the no-trade band; between rebalances weights drift. Commission is
+        charged on turnover measured against the pre-trade portfolio value,
+        plus the fixed cost per asset traded.
+        
+        Args:
+            mode: 'vectorized' runs the NumPy array path; 'loop' runs the
+                per-date reference implementation (slow, for equivalence
+                checks only)
+            cache: Optional ResultCache; a run with identical prices,
+                signals, parameters and engine code is loaded from it
+                instead of recomputed
+        
+        Returns:
+            List of portfolio values, one per date present in both
+            prices and signals
+        """
+        if mode == 'vectorized':
+            compute = self._run_vectorized
+        elif mode == 'loop':
+            compute = self._run_loop
+        else:
+            raise ValueError(f"Unknown backtest mode: {mode}")
+        
+        if cache is None:
+            result = compute()
+        else:
+            result, _ = cache.get_or_compute(self.cache_key(mode), compute)
+        
+        dates, values, weights, positions, turnover, commissions = result
+        columns = self.prices.columns
+        self.dates = dates
+        self.weights = pd.DataFrame(weights, index=dates, columns=columns)
+        self.positions = pd.DataFrame(positions, index=dates, columns=columns)
+        self.trades = self.positions.diff().fillna(self.positions)
+        self.turnover = pd.Series(turnover, index=dates, name='turnover')
+        self.commissions = pd.Series(commissions, index=dates, name='commission')
+        self.portfolio_values = values.tolist()
+        return self.portfolio_values
+    
+    def cache_key(self, mode='vectorized'):
+        """Fingerprint of this run: input frames, parameters and engine source."""
+        params = {
+            'mode': mode,
+            'initial_capital': self.initial_capital,
+            'commission': self.commission,
+            'rebalance_frequency': self.rebalance_frequency,
+            'no_trade_band': self.no_trade_band,
+            'fixed_cost': self.fixed_cost,
+        }
+        return fingerprint(params, data=(self.prices, self.signals),
+                           code=(BacktestEngine, simulate_rebalancing))
+    
+    def _align(self):
+        """
+        Align prices and signals once onto the common dates.
+        
+        Returns:
+            Tuple of (dates, aligned price DataFrame, aligned signal DataFrame)
+        """
+        dates = self.prices.index[self.prices.index.isin(self.signals.index)]
+        prices = self.prices.loc[dates].astype(np.float64).ffill()
+        signals = (
+            self.signals.reindex(index=dates, columns=self.prices.columns)
+            .astype(np.float64)
+            .fillna(0.0)
+        )
+        # Assets without a price yet cannot be traded
+        signals = signals.where(prices.notna(), 0.0)
+        return dates, prices, signals
+    
+    @staticmethod
+    def target_weights(signals):
+        """
+        Convert a (dates x assets) signal array to target weights.
+        
+        Returns:
+            Array of weights normalized to unit gross exposure per row
+        """
+        gross = np.abs(signals).sum(axis=1, keepdims=True)
+        return np.divide(signals, gross, out=np.zeros_like(signals), where=gross > 0)
+    
+    def _run_vectorized(self):
+        """Whole-array execution on contiguous float64 matrices."""
+        dates, prices, signals = self._align()
+        price = np.ascontiguousarray(prices.to_numpy(dtype=np.float64))
+        targets = self.target_weights(np.ascontiguousarray(signals.to_numpy(dtype=np.float64)))
+        n_dates, n_assets = price.shape
+        
+        values, weights, turnover, commissions, _ = simulate_rebalancing(
+            price_returns(price),
+            targets,
+            rebalance=rebalance_schedule(dates, self.rebalance_frequency),
+            initial_capital=self.initial_capital,
+            cost_rate=self.commission,
+            fixed_cost=self.fixed_cost,
+            no_trade_band=self.no_trade_band,
+        )
+        
+        invested = (values - commissions)[:, None] * weights
+        positions = np.divide(invested, price, out=np.zeros((n_dates, n_assets)),
+                              where=np.isfinite(price) & (price != 0))
+        return dates, values, weights, positions, turnover, commissions
+    
+    def _run_loop(self):
+        """Per-date reference implementation of the vectorized path."""
+        dates, prices, signals = self._align()
+        rebalance = rebalance_schedule(dates, self.rebalance_frequency)
+        tolerance = max(self.no_trade_band, TRADE_TOLERANCE)
         cash = self.initial_capital
-        positions = {asset: 0 for asset in self.prices.columns}
+        positions = {asset: 0.0 for asset in self.prices.columns}
         portfolio_values = []
+        weights_hist, positions_hist, turnover_hist, commission_hist = [], [], [], []
         
-        for date in self.prices.index:
-            # Get signals and prices
-            if date not in self.signals.index:
-                continue
-            
-            price_row = self.prices.loc[date]
-            signal_row = self.signals.loc[date]
+        for i, date in enumerate(dates):
+            price_row = prices.loc[date]
+            signal_row = signals.loc[date]
             
             # Calculate portfolio value
-            position_values = sum(
-                positions[asset] * price_row[asset]
+            holdings = {
+                asset: positions[asset] * price_row[asset] if np.isfinite(price_row[asset]) else 0.0
                 for asset in positions.keys()
-                if asset in price_row.index
-            )
-            total_value = cash + position_values
+            }
+            total_value = cash + sum(holdings.values())
             portfolio_values.append(total_value)
             
-            # Rebalance based on signals (simplified logic)
-            # In a real implementation, this would be more sophisticated
+            turnover = 0.0
+            commission = 0.0
+            investable = total_value
+            if rebalance[i]:
+                # Rebalance assets outside the no-trade band to signal-based target weights
+                gross = signal_row.abs().sum()
+                target = signal_row / gross if gross > 0 else signal_row * 0.0
+                to_trade = []
+                for asset in positions.keys():
+                    held = holdings[asset] / total_value if total_value != 0 else 0.0
+                    if abs(target[asset] - held) > tolerance:
+                        turnover += abs(target[asset] - held)
+                        to_trade.append(asset)
+                commission = self.commission * turnover * total_value + self.fixed_cost * len(to_trade)
+                investable = total_value - commission
+                
+                cash = investable
+                for asset in positions.keys():
+                    px = price_row[asset]
+                    if asset in to_trade:
+                        holdings[asset] = target[asset] * investable
+                        positions[asset] = holdings[asset] / px if np.isfinite(px) and px != 0 else 0.0
+                    cash -= holdings[asset]
+            
+            weights_hist.append([
+                holdings[asset] / investable if investable != 0 else 0.0
+                for asset in self.prices.columns
+            ])
+            positions_hist.append([positions[asset] for asset in self.prices.columns])
+            turnover_hist.append(turnover)
+            commission_hist.append(commission)
         
-        self.portfolio_values = portfolio_values
-        return portfolio_values
+        n_assets = len(self.prices.columns)
+        return (
+            dates,
+            np.array(portfolio_values, dtype=np.float64),
+            np.array(weights_hist, dtype=np.float64).reshape(-1, n_assets),
+            np.array(positions_hist, dtype=np.float64).reshape(-1, n_assets),
+            np.array(turnover_hist, dtype=np.float64),
+            np.array(commission_hist, dtype=np.float64),
+        )
     
     def calculate_metrics(self):
         """Calculate performance metrics."""
@@ -0,0 +1,461 @@
+"""
+Partitioned columnar layout for pipeline outputs.
+Writes raw prices, the wide price panel and the long feature table as
+hive-partitioned parquet datasets and reads them back with column and
+predicate pushdown, so consumers only touch the files, row groups and
+columns they need.
+
+Layout (under data_pipeline/lake/):
+    raw/ticker=SPY/year=2020/part-0.parquet            long OHLCV per ticker
+    processed/prices_wide/year=2020/part-0.parquet     wide panel, one column per ticker
+    features/basic_tech_factors/year=2020/part-0.parquet
+                                                        long factors, sorted by (ticker, date)
+
+The long feature table (lake dataset and the single basic_tech_factors.parquet
+file) uses a compact layout: tickers are dictionary-encoded (pandas
+categorical), rows are sorted by (ticker, date) in row groups with min/max
+statistics and sorting metadata, and factors can optionally be stored as
+float32 after a per-column check that rounding moves no value across a
+signal threshold (see float32_precision). Readers return those dtypes
+unchanged. The compact layout alone barely shrinks the file; float32
+factors take it to about 60% of the float64 size.
+
+Incremental feature refreshes never rewrite history: the new dates are added
+as their own part, both in the lake (an extra part file in each touched year
+partition) and in the single feature file, so the cost of a daily refresh is
+proportional to the new rows. The first refresh after a full build turns
+basic_tech_factors.parquet into a parquet dataset directory of the same name
+(the original file is renamed into it as part-00000000.parquet, not copied)
+and each refresh adds a part-YYYYMMDD.parquet next to it. Plain readers --
+pd.read_parquet(path) or pyarrow.dataset -- read both layouts and see every
+row; only single-file APIs (pq.ParquetFile, pq.read_schema,
+pq.read_metadata) must go through feature_file_parts(). A full build
+writes a single file again.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+LAKE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "lake")
+)
+
+RAW_DATASET = "raw"
+PRICES_DATASET = os.path.join("processed", "prices_wide")
+FEATURES_DATASET = os.path.join("features", "basic_tech_factors")
+
+# Sorted feature rows let ticker predicates skip row groups via statistics
+FEATURE_ROWS_PER_GROUP = 64 * 1024
+FEATURE_SORTING = [("ticker", "ascending"), ("date", "ascending")]
+
+# First part of a feature file turned into a part directory (the former single file)
+FEATURE_BASE_PART = "part-00000000.parquet"
+
+# float32 factor storage. float32 keeps 24 mantissa bits, so a normal value
+# comes back with a relative error of at most 2**-24 (~6e-8) -- any relative
+# tolerance above that passes every normal value. What matters downstream is
+# whether a thresholded signal changes, so a column is accepted if every
+# finite value stays finite and stays on the same side of each signal
+# threshold: 0 (momentum / trend signs), the sweep grids' momentum / trend
+# thresholds and the 0.15 volatility threshold.
+FLOAT32_THRESHOLDS = (0.0, 0.01, 0.02, 0.05, 0.15)
+
+
+def dataset_path(name, lake_dir=None):
+    """Return the directory of a lake dataset."""
+    return os.path.join(lake_dir or LAKE_DIR, name)
+
+
+def dataset_exists(name, lake_dir=None):
+    """Check whether a lake dataset has been written."""
+    path = dataset_path(name, lake_dir)
+    return os.path.isdir(path) and any(os.scandir(path))
+
+
+def _with_year(df, date_col="date"):
+    """Add the int16 'year' partition key derived from the date column."""
+    out = df.copy()
+    out["year"] = pd.DatetimeIndex(out[date_col]).year.astype(np.int16)
+    return out
+
+
+def _write(table, path, partitioning, existing_data_behavior, part_id=None, **kwargs):
+    # Chunked writers pass a part_id so each chunk adds its own files
+    # alongside earlier chunks in the same partition directories
+    prefix = "part" if part_id is None else f"part-{part_id:05d}"
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=partitioning,
+        partitioning_flavor="hive",
+        existing_data_behavior=existing_data_behavior,
+        basename_template=prefix + "-{i}.parquet",
+        **kwargs,
+    )
+
+
+def float32_precision(values, thresholds=FLOAT32_THRESHOLDS):
+    """
+    Check whether a float64 column survives float32 storage.
+
+    Args:
+        values: Factor values
+        thresholds: Signal thresholds no value may cross when rounded
+
+    Returns:
+        Tuple of (ok, max_abs_err, max_rel_err, n_crossed) over the finite
+        values; n_crossed counts values that moved across (or onto) a
+        threshold
+    """
+    values = np.asarray(values, dtype=np.float64)
+    x = values[np.isfinite(values)]
+    if x.size == 0:
+        return True, 0.0, 0.0, 0
+    with np.errstate(over="ignore"):
+        y = x.astype(np.float32).astype(np.float64)
+    err = np.abs(y - x)
+    rel = err / np.where(x != 0, np.abs(x), np.inf)
+    crossed = np.zeros(x.shape, dtype=bool)
+    for t in thresholds:
+        crossed |= np.sign(x - t) != np.sign(y - t)
+    n_crossed = int(crossed.sum())
+    ok = bool(np.isfinite(y).all() and n_crossed == 0)
+    return ok, float(err.max()), float(rel.max()), n_crossed
+
+
+def to_float32(values, name="", thresholds=FLOAT32_THRESHOLDS):
+    """
+    Downcast a factor column to float32 after float32_precision().
+
+    Raises:
+        ValueError: If the column does not survive float32 storage
+    """
+    ok, max_abs, max_rel, n_crossed = float32_precision(values, thresholds)
+    if not ok:
+        raise ValueError(
+            f"Factor {name!r} does not fit float32 storage ({n_crossed} values cross a signal "
+            f"threshold, max abs err {max_abs:.3g}, max rel err {max_rel:.3g}); store it as float64"
+        )
+    return np.asarray(values, dtype=np.float32)
+
+
+def compact_features_long(features_long, float32=False, tickers=None):
+    """
+    Convert a long feature table to the compact storage dtypes.
+
+    Args:
+        features_long: Long frame [date, ticker, factors...]
+        float32: Downcast the factor columns to float32 (checked, see to_float32)
+        tickers: Ticker categories; pass the full universe when chunks are
+            written separately so that they share one dictionary (defaults
+            to the sorted tickers present)
+
+    Returns:
+        New DataFrame with a categorical 'ticker' column
+    """
+    out = features_long.copy()
+    if tickers is None:
+        tickers = sorted(out["ticker"].unique())
+    out["ticker"] = pd.Categorical(np.asarray(out["ticker"], dtype=object), categories=list(tickers))
+    if float32:
+        for name in out.columns:
+            if name not in ("date", "ticker"):
+                out[name] = to_float32(out[name].to_numpy(), name)
+    return out
+
+
+def feature_write_options(schema):
+    """Parquet writer options for the long feature table with the given arrow schema."""
+    return {
+        "write_statistics": True,
+        "sorting_columns": pq.SortingColumn.from_ordering(schema, FEATURE_SORTING),
+    }
+
+
+def write_features_file(features_long, path):
+    """
+    Write the long feature table as a single parquet file in the compact
+    layout (rows must already be sorted by (ticker, date)), replacing the
+    previous file or part directory.
+    """
+    table = pa.Table.from_pandas(features_long, preserve_index=False)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, row_group_size=FEATURE_ROWS_PER_GROUP, **feature_write_options(table.schema))
+    reset_features_file(path)
+    os.replace(tmp_path, path)
+
+
+def reset_features_file(path):
+    """Remove a feature file, or its part directory after incremental refreshes."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def feature_file_parts(path):
+    """Parquet files making up a feature file: itself, or its parts oldest first."""
+    if not os.path.isdir(path):
+        return [path]
+    # Names starting with . or _ are skipped, as pyarrow.dataset does
+    names = sorted(name for name in os.listdir(path)
+                   if name.endswith(".parquet") and not name.startswith((".", "_")))
+    return [os.path.join(path, name) for name in names]
+
+
+def append_features_file(new_rows, path):
+    """
+    Add the new dates of an incremental refresh as their own part, leaving
+    the existing rows untouched.
+
+    A single feature file is first turned into a part directory of the
+    same name by renaming it into place as FEATURE_BASE_PART.
+
+    Args:
+        new_rows: Long frame with only dates after the stored last date,
+            sorted by (ticker, date)
+        path: The feature file (single file or part directory)
+
+    Returns:
+        Path of the written part
+    """
+    if os.path.isfile(path):
+        staging = path + ".parts"
+        os.makedirs(staging, exist_ok=True)
+        os.replace(path, os.path.join(staging, FEATURE_BASE_PART))
+        os.replace(staging, path)
+    first = pd.Timestamp(new_rows["date"].min())
+    name = f"part-{first:%Y%m%d}.parquet"
+    part_path = os.path.join(path, name)
+    # Hidden until complete: readers skip dot files
+    tmp_path = os.path.join(path, f".{name}.tmp")
+    table = pa.Table.from_pandas(new_rows, preserve_index=False)
+    pq.write_table(table, tmp_path, row_group_size=FEATURE_ROWS_PER_GROUP, **feature_write_options(table.schema))
+    os.replace(tmp_path, part_path)
+    return part_path
+
+
+def features_file_last_date(path):
+    """
+    Last date of a feature file (all its parts), taken from the parquet
+    row-group statistics (only the footers are read).
+
+    Returns:
+        Timestamp, or None if there are no rows
+    """
+    last = None
+    for part in feature_file_parts(path):
+        meta = pq.ParquetFile(part).metadata
+        column = meta.schema.to_arrow_schema().get_field_index("date")
+        for i in range(meta.num_row_groups):
+            stats = meta.row_group(i).column(column).statistics
+            if stats is None or not stats.has_min_max:
+                # No statistics: fall back to reading the date column
+                value = pd.read_parquet(part, columns=["date"])["date"].max()
+            else:
+                value = stats.max
+            if not pd.isna(value):
+                last = pd.Timestamp(value) if last is None else max(last, pd.Timestamp(value))
+    return last
+
+
+def features_file_tickers(path):
+    """Ticker set of a feature file, read from the ticker column of its latest part only."""
+    column = pq.read_table(feature_file_parts(path)[-1], columns=["ticker"]).column("ticker")
+    return {str(t) for t in column.unique().to_pylist()}
+
+
+def read_features_file(path, columns=None, filters=None):
+    """
+    Read a feature file, merging its parts in (ticker, date) order.
+
+    Args:
+        columns: Columns to load (date and ticker must be included; None for all)
+        filters: pyarrow filters pushed into every part
+
+    Returns:
+        DataFrame [date, ticker, factors...] sorted by (ticker, date)
+    """
+    frames = [pd.read_parquet(part, columns=columns, filters=filters) for part in feature_file_parts(path)]
+    if len(frames) == 1:
+        return frames[0]
+    # Parts share the ticker categories, so the concatenation stays categorical
+    df = _sorted_tickers(pd.concat(frames, ignore_index=True))
+    return df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+
+
+def _sorted_tickers(df):
+    # Dictionaries unified across files may come back in file order; keep
+    # categories sorted so that sorting by ticker is lexical
+    if isinstance(df["ticker"].dtype, pd.CategoricalDtype):
+        df["ticker"] = df["ticker"].cat.reorder_categories(sorted(df["ticker"].cat.categories))
+    return df
+
+
+def reset_dataset(name, lake_dir=None):
+    """Remove a dataset before it is rewritten chunk by chunk."""
+    shutil.rmtree(dataset_path(name, lake_dir), ignore_errors=True)
+
+
+def write_raw(df, ticker, lake_dir=None):
+    """
+    Write one ticker's raw OHLCV frame, replacing that ticker's partitions.
+
+    Args:
+        df: Raw frame with a 'date' column
+        ticker: Ticker symbol (partition key)
+    """
+    path = dataset_path(RAW_DATASET, lake_dir)
+    shutil.rmtree(os.path.join(path, f"ticker={ticker}"), ignore_errors=True)
+    out = _with_year(df)
+    out["ticker"] = ticker
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    _write(table, path, ["ticker", "year"], "overwrite_or_ignore")
+
+
+def write_prices_wide(prices_wide, lake_dir=None, part_id=None):
+    """
+    Write the wide price panel (DatetimeIndex 'date'), partitioned by year.
+
+    Args:
+        prices_wide: DataFrame (dates x tickers)
+        part_id: If given, append this block of dates as an extra part
+            instead of replacing the dataset (see reset_dataset)
+    """
+    path = dataset_path(PRICES_DATASET, lake_dir)
+    if part_id is None:
+        shutil.rmtree(path, ignore_errors=True)
+    out = _with_year(prices_wide.rename_axis("date").reset_index())
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    _write(table, path, ["year"], "overwrite_or_ignore", part_id=part_id)
+
+
+def write_features_long(features_long, lake_dir=None, replace_all=True, part_id=None):
+    """
+    Write the long feature table, partitioned by year.
+
+    Args:
+        features_long: Long frame [date, ticker, factors...]
+        replace_all: If False, only the years present in features_long are
+            replaced (incremental refresh); other years are left untouched
+        part_id: If given, append this chunk as an extra part (a chunk of
+            tickers in the streaming build, see reset_dataset, or a block of
+            new dates in an incremental refresh); replace_all is ignored
+    """
+    path = dataset_path(FEATURES_DATASET, lake_dir)
+    if replace_all and part_id is None:
+        shutil.rmtree(path, ignore_errors=True)
+    out = _with_year(features_long).sort_values(["year", "ticker", "date"], kind="stable")
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    # The partition key is not stored in the files
+    file_schema = table.schema.remove(table.schema.get_field_index("year"))
+    _write(
+        table,
+        path,
+        ["year"],
+        "delete_matching" if part_id is None else "overwrite_or_ignore",
+        part_id=part_id,
+        file_options=ds.ParquetFileFormat().make_write_options(**feature_write_options(file_schema)),
+        max_rows_per_group=FEATURE_ROWS_PER_GROUP,
+        min_rows_per_group=min(FEATURE_ROWS_PER_GROUP, max(len(out), 1)),
+    )
+
+
+def date_filter(start=None, end=None, date_col="date"):
+    """
+    Build a pushdown predicate on the date range.
+
+    The derived 'year' partition key is constrained as well so that
+    whole partitions are pruned before any file is opened.
+    """
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        part = (ds.field("year") >= start.year) & (ds.field(date_col) >= start.to_datetime64())
+        expr = part if expr is None else expr & part
+    if end is not None:
+        end = pd.Timestamp(end)
+        part = (ds.field("year") <= end.year) & (ds.field(date_col) <= end.to_datetime64())
+        expr = part if expr is None else expr & part
+    return expr
+
+
+def _and(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b
+
+
+def _open(name, lake_dir=None):
+    path = dataset_path(name, lake_dir)
+    if not dataset_exists(name, lake_dir):
+        raise FileNotFoundError(f"Lake dataset not found: {path}")
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def read_prices_wide(tickers=None, start=None, end=None, lake_dir=None):
+    """
+    Read the wide price panel, loading only the requested ticker columns
+    and date range.
+
+    Returns:
+        DataFrame (index=date, columns=tickers), sorted by date
+    """
+    dataset = _open(PRICES_DATASET, lake_dir)
+    columns = ["date"] + (list(tickers) if tickers is not None else
+                          [c for c in dataset.schema.names if c not in ("date", "year")])
+    table = dataset.to_table(columns=columns, filter=date_filter(start, end))
+    df = table.to_pandas().set_index("date").sort_index()
+    return df
+
+
+def read_features_long(columns=None, tickers=None, start=None, end=None, lake_dir=None):
+    """
+    Read the long feature table with column, ticker and date pushdown.
+
+    Args:
+        columns: Factor columns to load (date and ticker are always included)
+        tickers: Tickers to keep
+        start, end: Inclusive date range
+
+    Returns:
+        DataFrame [date, ticker, factors...], sorted by (ticker, date), with
+        the stored dtypes (categorical ticker, float32 factors if written so)
+    """
+    dataset = _open(FEATURES_DATASET, lake_dir)
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in ("date", "ticker", "year")]
+    expr = date_filter(start, end)
+    if tickers is not None:
+        expr = _and(expr, ds.field("ticker").isin(list(tickers)))
+    table = dataset.to_table(columns=["date", "ticker"] + list(columns), filter=expr)
+    df = _sorted_tickers(table.to_pandas())
+    return df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+
+
+def read_raw(tickers=None, columns=None, start=None, end=None, lake_dir=None):
+    """
+    Read raw OHLCV rows; ticker predicates prune whole ticker partitions.
+
+    Returns:
+        DataFrame [date, ticker, columns...], sorted by (ticker, date)
+    """
+    dataset = _open(RAW_DATASET, lake_dir)
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c not in ("date", "ticker", "year")]
+    expr = date_filter(start, end)
+    if tickers is not None:
+        expr = _and(expr, ds.field("ticker").isin(list(tickers)))
+    table = dataset.to_table(columns=["date", "ticker"] + list(columns), filter=expr)
+    df = table.to_pandas()
+    return df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
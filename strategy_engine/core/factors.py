@@ -0,0 +1,283 @@
+"""
+Factor registry and lazy evaluator.
+Each factor declares the inputs it depends on and its window. A
+FactorEngine computes only the factors that are requested plus their
+dependencies (a DAG rooted at the price panel and the risk-free rate),
+evaluating each node once so intermediates such as returns, excess
+returns and moving averages are shared between factors.
+
+Computed factors are cached on disk as .npy files, keyed by a hash of the
+input data and of every factor definition along the dependency path --
+inputs, window and the source of the compute function and of the kernels
+it calls -- so a changed panel, window or formula never hits a stale
+entry. The directory is bounded in size: after each write the least
+recently used files are evicted (hits bump a file's modification time).
+
+Layout (under data_pipeline/cache/factors/):
+    <factor>-<key>.npy    float64 (dates x tickers)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .lru_dir import LRUDirectory
+
+
+FACTOR_CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "cache", "factors")
+)
+
+# Size bound of the cache directory
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# Root inputs supplied by the caller rather than computed
+BASE_INPUTS = ('prices', 'rf')
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _source_digest(obj):
+    try:
+        source = inspect.getsource(obj)
+    except (OSError, TypeError):
+        # No source available (e.g. defined interactively): fall back to bytecode
+        source = getattr(getattr(obj, '__code__', None), 'co_code', repr(obj))
+    return _digest(source)
+
+
+class Factor:
+    """Declaration of one node in the factor DAG."""
+
+    def __init__(self, name, inputs, compute, window=None, output=True, version=1):
+        """
+        Args:
+            name: Factor name (column name in the feature table)
+            inputs: Names of the base inputs / factors this factor reads
+            compute: Function (*input values, window=...) -> array
+            window: Lookback window, part of the cache key
+            output: False for intermediates that are not feature columns
+            version: Bump to invalidate cached results after a change the
+                key cannot see (the source of `compute` and of the kernels
+                module is hashed into the key already)
+        """
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.compute = compute
+        self.window = window
+        self.output = output
+        self.version = version
+        self.code = _digest(_source_digest(compute), _source_digest(kernels))
+
+    def spec(self):
+        return {'name': self.name, 'inputs': list(self.inputs), 'window': self.window,
+                'version': self.version, 'code': self.code}
+
+
+REGISTRY = {}
+
+
+def register(name, inputs, window=None, output=True, version=1):
+    """Decorator adding a compute function to the registry under `name`."""
+    def decorator(func):
+        if name in REGISTRY or name in BASE_INPUTS:
+            raise ValueError(f"Factor already registered: {name}")
+        REGISTRY[name] = Factor(name, inputs, func, window, output, version)
+        return func
+    return decorator
+
+
+def output_factors():
+    """Names of all registered feature columns, in registration order."""
+    return [name for name, factor in REGISTRY.items() if factor.output]
+
+
+# =============== Factor definitions ===============
+
+@register('returns', inputs=('prices',), output=False)
+def _returns(prices, window=None):
+    return kernels.pct_change(prices, 1)
+
+
+@register('excess_returns', inputs=('returns', 'rf'), output=False)
+def _excess_returns(returns, rf, window=None):
+    return returns - rf[:, None]
+
+
+@register('ret_1d', inputs=('returns',))
+def _ret_1d(returns, window=None):
+    return returns
+
+
+def _momentum(prices, window=None):
+    return kernels.pct_change(prices, window)
+
+
+for _window in (20, 60, 120):
+    register(f'mom_{_window}d', inputs=('prices',), window=_window)(_momentum)
+
+
+@register('vol_20d', inputs=('returns',), window=20)
+def _vol(returns, window=None):
+    return kernels.rolling_std(returns, window) * np.sqrt(kernels.ANNUALIZATION)
+
+
+@register('ma_200d', inputs=('prices',), window=200)
+def _moving_average(prices, window=None):
+    return kernels.rolling_mean(prices, window)
+
+
+@register('trend_200d', inputs=('prices', 'ma_200d'))
+def _trend(prices, moving_average, window=None):
+    return prices / moving_average - 1
+
+
+@register('sharpe_60d', inputs=('excess_returns',), window=60)
+def _sharpe(excess_returns, window=None):
+    return kernels.rolling_sharpe(excess_returns, window)
+
+
+# =============== Evaluation ===============
+
+class FactorEngine:
+    """Evaluate registered factors on one price panel."""
+
+    def __init__(self, prices_wide, rf_daily=None, returns_wide=None, cache_dir=None, use_cache=True,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            prices_wide: DataFrame (dates x tickers) of prices
+            rf_daily: Optional Series of daily risk-free returns (aligned to
+                the price dates; missing means 0)
+            returns_wide: Optional precomputed returns to use instead of
+                deriving them from prices
+            cache_dir: Disk cache directory (defaults to data_pipeline/cache/factors)
+            use_cache: Set False to skip the disk cache entirely
+            max_bytes: Size of the cache directory above which least
+                recently used files are evicted
+        """
+        self.dates = prices_wide.index
+        self.tickers = prices_wide.columns
+        self.cache = LRUDirectory(cache_dir or FACTOR_CACHE_DIR, '.npy', max_bytes)
+        self.use_cache = use_cache
+
+        prices = np.ascontiguousarray(prices_wide.to_numpy(dtype=np.float64))
+        if rf_daily is None:
+            rf = np.zeros(len(self.dates))
+        else:
+            rf = rf_daily.reindex(self.dates).to_numpy(dtype=np.float64)
+        frame_id = _digest(self.dates.to_numpy(dtype='datetime64[ns]').view(np.int64).tobytes(),
+                           json.dumps([str(t) for t in self.tickers]))
+        self._values = {'prices': prices, 'rf': rf}
+        self._keys = {
+            'prices': _digest('prices', frame_id, prices.tobytes()),
+            'rf': _digest('rf', frame_id, rf.tobytes()),
+        }
+        if returns_wide is not None:
+            returns = np.ascontiguousarray(
+                returns_wide.reindex(index=self.dates, columns=self.tickers).to_numpy(dtype=np.float64)
+            )
+            self._values['returns'] = returns
+            self._keys['returns'] = _digest('returns', frame_id, returns.tobytes())
+
+    def key(self, name):
+        """Cache key of a factor: hash of its definition and its inputs' keys."""
+        if name not in self._keys:
+            if name not in REGISTRY:
+                raise KeyError(f"Unknown factor: {name}")
+            factor = REGISTRY[name]
+            self._keys[name] = _digest(json.dumps(factor.spec(), sort_keys=True),
+                                       *[self.key(dep) for dep in factor.inputs])
+        return self._keys[name]
+
+    def plan(self, names):
+        """Dependencies of the requested factors in evaluation order."""
+        order, seen = [], set()
+
+        def visit(name, path):
+            if name in seen:
+                return
+            if name in path:
+                raise ValueError(f"Factor dependency cycle: {' -> '.join(path + (name,))}")
+            if name not in BASE_INPUTS and name not in self._values:
+                if name not in REGISTRY:
+                    raise KeyError(f"Unknown factor: {name}")
+                for dep in REGISTRY[name].inputs:
+                    visit(dep, path + (name,))
+            seen.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name, ())
+        return order
+
+    def _cache_path(self, name):
+        return self.cache.path(f"{name}-{self.key(name)}")
+
+    def _load_cached(self, name):
+        if not (self.use_cache and REGISTRY[name].output):
+            return None
+        path = self._cache_path(name)
+        try:
+            values = np.load(path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, EOFError):
+            # Truncated file: drop it and recompute
+            self.cache.remove(path)
+            return None
+        self.cache.touch(path)
+        return values
+
+    def _store_cached(self, name, values):
+        if not (self.use_cache and REGISTRY[name].output):
+            return
+        self.cache.write(self._cache_path(name),
+                         lambda f: np.save(f, np.ascontiguousarray(values, dtype=np.float64)))
+
+    def array(self, name):
+        """Evaluate one factor (and whatever it needs) as a (dates x tickers) array."""
+        if name in self._values:
+            return self._values[name]
+        if name not in REGISTRY:
+            raise KeyError(f"Unknown factor: {name}")
+
+        # A cache hit skips the whole upstream subtree
+        values = self._load_cached(name)
+        if values is None:
+            factor = REGISTRY[name]
+            inputs = [self.array(dep) for dep in factor.inputs]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = factor.compute(*inputs, window=factor.window)
+            self._store_cached(name, values)
+        self._values[name] = values
+        return values
+
+    def compute(self, names=None):
+        """
+        Evaluate the requested factors.
+
+        Args:
+            names: Factor names (defaults to every output factor)
+
+        Returns:
+            Dict of {factor name: DataFrame (dates x tickers)}, in request order
+        """
+        if names is None:
+            names = output_factors()
+        self.plan(names)
+        return {
+            name: pd.DataFrame(self.array(name), index=self.dates, columns=self.tickers)
+            for name in names
+        }
@@ -0,0 +1,383 @@
+"""
+Wide per-factor feature store.
+Each factor is stored as a (dates x tickers) panel split into fixed-size
+blocks of dates; every block is its own column-major .npy file, and all
+factors share one calendar and ticker list. Loading N factors for a set
+of tickers reads, per factor, one contiguous run of each ticker's column
+in every block the date range touches, already aligned to the shared
+calendar -- no long-table scan, pivot or reindex. Written by
+build_features.py next to the long feature table; the column-major
+blocks let the streaming build fill the store one ticker chunk at a time.
+
+Blocks are pre-allocated to BLOCK_DATES rows (NaN-filled), and meta.json
+records how many dates are valid. An incremental append writes the new
+rows into the last block in place and adds blocks as they fill up, then
+bumps n_dates -- history is never copied or rewritten.
+
+Layout (under data_pipeline/features/wide/):
+    meta.json                     tickers, factors, dtype, n_dates, source signatures
+    calendar/block-00000.npy      int64 nanoseconds since epoch (BLOCK_DATES,)
+    <factor>/block-00000.npy      float64 or float32 (BLOCK_DATES x tickers), column-major
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .loader import source_signature
+
+
+FEATURE_STORE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "features", "wide")
+)
+
+FORMAT_VERSION = 2
+
+# Dates per block (~one trading year); a block of 2,000 float64 tickers is ~4 MB
+BLOCK_DATES = 256
+
+CALENDAR = "calendar"
+NAT = np.iinfo(np.int64).min
+
+
+def store_exists(store_dir=None):
+    """Check whether a feature store has been written."""
+    return os.path.exists(os.path.join(store_dir or FEATURE_STORE_DIR, "meta.json"))
+
+
+def _block_path(store_dir, name, block):
+    return os.path.join(store_dir, name, f"block-{block:05d}.npy")
+
+
+def _block_spans(rows, block_dates):
+    """
+    Split a row range into per-block pieces.
+
+    Returns:
+        List of (block, rows within the block, rows within the range)
+    """
+    spans = []
+    pos = rows.start
+    while pos < rows.stop:
+        block, lo = divmod(pos, block_dates)
+        n = min(rows.stop - pos, block_dates - lo)
+        spans.append((block, slice(lo, lo + n), slice(pos - rows.start, pos - rows.start + n)))
+        pos += n
+    return spans
+
+
+def _create_block(path, shape, dtype):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arr = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape, fortran_order=True)
+    arr[:] = NAT if dtype == np.int64 else np.nan
+    return arr
+
+
+def _write_meta(store_dir, meta):
+    # meta.json is the commit point: replaced atomically after the blocks are written
+    tmp_path = os.path.join(store_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, "meta.json"))
+
+
+def _signatures(sources):
+    return {os.path.abspath(p): list(source_signature(p)) for p in sources or []}
+
+
+class _BlockWriter:
+    """Open-or-create access to the blocks of one store directory, with maps kept open until flush()."""
+
+    def __init__(self, store_dir, n_tickers, dtype, block_dates):
+        self.store_dir = store_dir
+        self.n_tickers = n_tickers
+        self.dtype = np.dtype(dtype)
+        self.block_dates = block_dates
+        self._maps = {}
+
+    def block(self, name, block):
+        key = (name, block)
+        if key not in self._maps:
+            path = _block_path(self.store_dir, name, block)
+            if os.path.exists(path):
+                self._maps[key] = np.load(path, mmap_mode="r+")
+            elif name == CALENDAR:
+                self._maps[key] = _create_block(path, (self.block_dates,), np.int64)
+            else:
+                self._maps[key] = _create_block(path, (self.block_dates, self.n_tickers), self.dtype)
+        return self._maps[key]
+
+    def write(self, name, rows, values, columns=None):
+        """Write values (rows x columns, or a 1-D calendar run) at the given store rows."""
+        for block, in_block, in_values in _block_spans(rows, self.block_dates):
+            arr = self.block(name, block)
+            if columns is None:
+                arr[in_block] = values[in_values]
+            else:
+                arr[in_block, columns] = values[in_values]
+
+    def flush(self):
+        for arr in self._maps.values():
+            arr.flush()
+        self._maps = {}
+
+
+class FeatureStoreWriter:
+    """
+    Build a feature store in a temp dir and swap it in atomically on close.
+
+    Factor blocks are pre-allocated on disk (NaN-filled) and filled piece
+    by piece with write(), so the full panel never has to be in memory.
+    Used as a context manager, the store is committed on normal exit and
+    discarded if the block raises.
+    """
+
+    def __init__(self, calendar, tickers, factor_names, dtype=np.float64, sources=None, store_dir=None,
+                 block_dates=BLOCK_DATES):
+        """
+        Args:
+            calendar: DatetimeIndex shared by every factor
+            tickers: Ticker columns, in storage order
+            factor_names: Factors to store
+            dtype: float64 or float32
+            sources: Optional list of source file paths whose signatures are
+                recorded for freshness checks
+            store_dir: Store directory (defaults to data_pipeline/features/wide)
+            block_dates: Dates per block
+        """
+        self.store_dir = store_dir or FEATURE_STORE_DIR
+        self.calendar = pd.DatetimeIndex(calendar, name="date")
+        self.tickers = [str(t) for t in tickers]
+        self.factor_names = list(factor_names)
+        self.dtype = np.dtype(dtype)
+        self.sources = list(sources or [])
+        self.block_dates = block_dates
+        self._column = {t: i for i, t in enumerate(self.tickers)}
+
+        self.tmp_dir = f"{self.store_dir}.tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self._blocks = _BlockWriter(self.tmp_dir, len(self.tickers), self.dtype, block_dates)
+        rows = slice(0, len(self.calendar))
+        self._blocks.write(CALENDAR, rows, self.calendar.to_numpy(dtype="datetime64[ns]").view(np.int64))
+        # Allocate every block up front so unwritten cells read back as NaN
+        for name in self.factor_names:
+            for block, _, _ in _block_spans(rows, block_dates):
+                self._blocks.block(name, block)
+
+    def write(self, factors):
+        """
+        Fill part of the store.
+
+        Args:
+            factors: Dict of {factor name: DataFrame}; each frame covers a
+                subset of the tickers and a contiguous run of calendar dates
+        """
+        for name, wide in factors.items():
+            if name not in self.factor_names:
+                raise KeyError(f"Factor not in feature store: {name}")
+            if len(wide.index) == 0:
+                continue
+            start = self.calendar.get_loc(wide.index[0])
+            rows = slice(start, start + len(wide.index))
+            if not self.calendar[rows].equals(pd.DatetimeIndex(wide.index)):
+                raise ValueError(f"Dates of {name!r} are not a contiguous run of the store calendar")
+            columns = [self._column[str(t)] for t in wide.columns]
+            self._blocks.write(name, rows, wide.to_numpy(dtype=self.dtype), columns)
+
+    def close(self):
+        """Flush the blocks, write meta.json and swap the new store in."""
+        self._blocks.flush()
+        _write_meta(self.tmp_dir, {
+            "format_version": FORMAT_VERSION,
+            "tickers": self.tickers,
+            "factors": self.factor_names,
+            "dtype": self.dtype.name,
+            "n_dates": len(self.calendar),
+            "block_dates": self.block_dates,
+            "sources": _signatures(self.sources),
+        })
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        os.replace(self.tmp_dir, self.store_dir)
+
+    def abort(self):
+        """Discard the partially written store."""
+        self._blocks.flush()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_feature_store(factors, dtype=np.float64, sources=None, store_dir=None):
+    """
+    Write a complete feature store from wide factor frames.
+
+    Tickers are stored in sorted order, the same layout the ticker-chunked
+    streaming build produces.
+
+    Args:
+        factors: Dict of {factor name: DataFrame (dates x tickers)}, all on
+            the same index and columns
+        dtype: Storage dtype
+        sources: Optional list of source paths recorded for freshness checks
+    """
+    first = next(iter(factors.values()))
+    with FeatureStoreWriter(first.index, sorted(first.columns), list(factors), dtype, sources, store_dir) as writer:
+        writer.write(factors)
+
+
+def append_feature_store(new_factors, sources=None, store_dir=None):
+    """
+    Extend an existing store in place with dates after its last date
+    (incremental build).
+
+    Only the new rows are written: into the free rows of the last block and,
+    when it fills up, into new blocks. meta.json is updated last, so an
+    interrupted append leaves the store at its previous length.
+
+    Args:
+        new_factors: Dict of {factor name: DataFrame (new dates x tickers)}
+            with the store's tickers and factors
+        sources: Source paths recorded for freshness checks
+
+    Raises:
+        ValueError: If tickers or factors differ from the store, or the new
+            dates do not follow the store calendar
+    """
+    store = FeatureStore(store_dir)
+    first = next(iter(new_factors.values()))
+    if sorted(map(str, first.columns)) != sorted(store.tickers) or set(new_factors) != set(store.factor_names):
+        raise ValueError("Tickers / factors differ from the feature store; rebuild it")
+    if len(first.index) and first.index[0] <= store.calendar[-1]:
+        raise ValueError("New dates must follow the feature store calendar")
+    store.close()
+
+    rows = slice(store.n_dates, store.n_dates + len(first.index))
+    blocks = _BlockWriter(store.store_dir, len(store.tickers), store.dtype, store.block_dates)
+    blocks.write(CALENDAR, rows, pd.DatetimeIndex(first.index).to_numpy(dtype="datetime64[ns]").view(np.int64))
+    for name in store.factor_names:
+        wide = new_factors[name].rename(columns=str)[store.tickers]
+        blocks.write(name, rows, wide.to_numpy(dtype=store.dtype))
+    blocks.flush()
+
+    meta = dict(store.meta, n_dates=rows.stop)
+    if sources is not None:
+        meta["sources"] = _signatures(sources)
+    _write_meta(store.store_dir, meta)
+
+
+class FeatureStore:
+    """Read-only view over a feature store; blocks are memory-mapped on first access."""
+
+    def __init__(self, store_dir=None):
+        """
+        Args:
+            store_dir: Store directory (defaults to data_pipeline/features/wide)
+        """
+        self.store_dir = store_dir or FEATURE_STORE_DIR
+        meta_path = os.path.join(self.store_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Feature store not found: {self.store_dir}")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format: {self.meta.get('format_version')}")
+
+        self.tickers = self.meta["tickers"]
+        self.factor_names = self.meta["factors"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.n_dates = self.meta["n_dates"]
+        self.block_dates = self.meta["block_dates"]
+        self._column = {t: i for i, t in enumerate(self.tickers)}
+        self._blocks = {}
+        self.calendar = pd.DatetimeIndex(
+            self._read(CALENDAR, slice(0, self.n_dates)).view("datetime64[ns]"), name="date"
+        )
+
+    def is_fresh(self):
+        """True if every recorded source still has the signature it had at build time."""
+        for path, signature in self.meta["sources"].items():
+            if not os.path.exists(path) or list(source_signature(path)) != signature:
+                return False
+        return True
+
+    def _block(self, name, block):
+        key = (name, block)
+        if key not in self._blocks:
+            self._blocks[key] = np.load(_block_path(self.store_dir, name, block), mmap_mode="r")
+        return self._blocks[key]
+
+    def _read(self, name, rows, columns=None):
+        if name != CALENDAR and name not in self.factor_names:
+            raise KeyError(f"Factor not in feature store: {name}")
+        pieces = []
+        for block, in_block, _ in _block_spans(rows, self.block_dates):
+            arr = self._block(name, block)
+            # Column-major blocks: each selected ticker is one contiguous read
+            pieces.append(arr[in_block] if columns is None or arr.ndim == 1 else arr[in_block, columns])
+        if not pieces:
+            width = () if name == CALENDAR else (len(self.tickers) if columns is None else len(columns),)
+            return np.empty((0,) + width, dtype=np.int64 if name == CALENDAR else self.dtype)
+        return np.concatenate(pieces) if len(pieces) > 1 else np.array(pieces[0])
+
+    def array(self, name):
+        """Full (dates x tickers) array of one factor."""
+        return self._read(name, slice(0, self.n_dates))
+
+    def columns(self, tickers):
+        """Column positions of the given tickers."""
+        missing = [t for t in tickers if t not in self._column]
+        if missing:
+            raise KeyError(f"Tickers not in feature store: {missing}")
+        return np.array([self._column[t] for t in tickers], dtype=np.int64)
+
+    def rows(self, start=None, end=None):
+        """Row slice of the calendar covering the inclusive date range."""
+        lo = 0 if start is None else self.calendar.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.calendar) if end is None else self.calendar.searchsorted(pd.Timestamp(end), side="right")
+        return slice(int(lo), int(hi))
+
+    def arrays(self, names, tickers=None, start=None, end=None):
+        """
+        Requested factors as aligned arrays on the shared calendar.
+
+        Args:
+            names: Factor names
+            tickers: Optional subset of tickers (in the requested order)
+            start, end: Optional inclusive date range
+
+        Returns:
+            Tuple of (dates, tickers, {name: ndarray (dates x tickers)});
+            every array has the same shape
+        """
+        rows = self.rows(start, end)
+        dates = self.calendar[rows]
+        if tickers is None:
+            return dates, list(self.tickers), {name: self._read(name, rows) for name in names}
+        columns = self.columns(tickers)
+        return dates, list(tickers), {name: self._read(name, rows, columns) for name in names}
+
+    def frames(self, names, tickers=None, start=None, end=None):
+        """
+        Requested factors as DataFrames sharing one date index and column list.
+
+        Returns:
+            Dict of {factor name: DataFrame (dates x tickers)}, in request order
+        """
+        dates, tickers, arrays = self.arrays(names, tickers, start, end)
+        return {name: pd.DataFrame(arrays[name], index=dates, columns=tickers) for name in names}
+
+    def close(self):
+        """Drop the memory maps (needed before the store directory is replaced)."""
+        self._blocks = {}
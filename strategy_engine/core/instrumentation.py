@@ -0,0 +1,438 @@
+"""
+Lightweight instrumentation for pipeline runs.
+
+A run collects named stages -- wall time, call count, row / byte
+counters and the peak resident memory seen while the stage was open --
+and writes one JSON report per run, so the stage that dominates a
+nightly job can be read off directly. Stages nest: a stage opened
+inside another is recorded as "outer/inner". Stages opened from worker
+threads are recorded at the top level and their times add up across
+threads (they can exceed the run's wall time).
+
+Library code can call stage() unconditionally: outside of a run it only
+times the block. A run opened while another run is active becomes a
+stage of the outer run, so a driver script gets a single report.
+
+Optional profiling of the main thread:
+    profile="cprofile"  deterministic profile, dumped next to the report
+                        as <report>.prof (pstats / snakeviz)
+    profile="sampling"  periodic stack samples, dumped as collapsed stacks
+                        <report>.folded (flamegraph.pl / speedscope); low
+                        overhead and unbiased towards many small calls
+The PIPELINE_PROFILE environment variable selects a profiler when the
+caller does not, and PIPELINE_REPORT_DIR overrides the report directory.
+
+Usage:
+    with instrumentation.run("build_features", profile="sampling") as report:
+        with instrumentation.stage("load_prices") as s:
+            prices = load_prices()
+            s.count(rows=len(prices), bytes=instrumentation.nbytes(prices))
+    print(report.summary())
+"""
+
+import collections
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+
+
+REPORT_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "reports")
+)
+
+PROFILERS = ("cprofile", "sampling")
+
+# Seconds between RSS (and stack) samples
+DEFAULT_SAMPLE_INTERVAL = 0.01
+
+# Number of functions listed in the report's profile section
+PROFILE_TOP = 20
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+_runs = []
+_local = threading.local()
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes.
+
+    Reads /proc/self/statm where available; elsewhere falls back to the
+    process's lifetime peak from getrusage. Returns None if neither exists.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def nbytes(obj):
+    """
+    Size in bytes of a DataFrame / Series / array (in memory) or of a file
+    or directory (on disk).
+    """
+    if isinstance(obj, (str, os.PathLike)):
+        if os.path.isdir(obj):
+            return sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(obj) for name in names
+            )
+        return os.path.getsize(obj) if os.path.exists(obj) else 0
+    if hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    return int(getattr(obj, "nbytes", 0))
+
+
+def _mb(n):
+    return None if n is None else n / 1024 ** 2
+
+
+class StageStats:
+    """Accumulated statistics of one named stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.counters = collections.Counter()
+        self.peak_rss = None
+
+    def to_dict(self, run_seconds):
+        out = {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "share": self.seconds / run_seconds if run_seconds > 0 else None,
+            "peak_rss_mb": _mb(self.peak_rss),
+        }
+        out.update(self.counters)
+        return out
+
+
+class Stage:
+    """Handle of an open stage; counters are added with count()."""
+
+    def __init__(self, name, run=None):
+        self.name = name
+        self.run = run
+        self.seconds = None
+        self.peak_rss = None
+        self.counters = collections.Counter()
+
+    def count(self, **counters):
+        """Add to this stage's counters, e.g. count(rows=len(df), bytes=nbytes(df))."""
+        for key, value in counters.items():
+            self.counters[key] += int(value)
+
+    def _sample(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_run():
+    """The innermost active Run, or None."""
+    return _runs[-1] if _runs else None
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Time a block as a stage of the active run (only timed if there is none).
+
+    Yields a Stage handle; its `seconds` is set when the block exits, so
+    callers can keep printing their own timings.
+    """
+    run_ = current_run()
+    stack = _stack()
+    full_name = "/".join(stack + [name])
+    handle = Stage(full_name, run_)
+    if run_ is not None:
+        run_._open(handle)
+    stack.append(name)
+    t0 = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        handle.seconds = time.perf_counter() - t0
+        stack.pop()
+        if run_ is not None:
+            run_._close(handle)
+
+
+class Run:
+    """
+    One instrumented run: stage statistics, RSS sampling and an optional profiler.
+
+    Normally created through run(); can also be used directly as a
+    context manager and written with write().
+    """
+
+    def __init__(self, name, profile=None, report_dir=None, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            name: Run name, used in the report file name
+            profile: None, "cprofile" or "sampling" (defaults to $PIPELINE_PROFILE)
+            report_dir: Directory for reports and profiles (defaults to
+                $PIPELINE_REPORT_DIR or data_pipeline/reports)
+            sample_interval: Seconds between RSS / stack samples
+        """
+        profile = profile if profile is not None else os.environ.get("PIPELINE_PROFILE") or None
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"profile must be one of {PROFILERS}, got {profile!r}")
+        self.name = name
+        self.profile = profile
+        self.report_dir = report_dir or os.environ.get("PIPELINE_REPORT_DIR") or REPORT_DIR
+        self.sample_interval = sample_interval
+
+        self.stages = {}
+        self.counters = collections.Counter()
+        self.started = None
+        self.seconds = None
+        self.cpu_seconds = None
+        self.peak_rss = None
+        self.status = None
+        self.error = None
+        self.path = None
+
+        self._lock = threading.Lock()
+        self._open_stages = set()
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._profiler = None
+        self._stack_samples = collections.Counter()
+        self._main_thread_id = None
+        self._t0 = None
+        self._cpu0 = None
+
+    # ---------- stages ----------
+
+    def _open(self, handle):
+        handle._sample(current_rss())
+        with self._lock:
+            self._open_stages.add(handle)
+
+    def _close(self, handle):
+        handle._sample(current_rss())
+        with self._lock:
+            self._open_stages.discard(handle)
+            stats = self.stages.get(handle.name)
+            if stats is None:
+                stats = self.stages[handle.name] = StageStats(handle.name)
+            stats.calls += 1
+            stats.seconds += handle.seconds
+            stats.counters.update(handle.counters)
+            if handle.peak_rss is not None and (stats.peak_rss is None or handle.peak_rss > stats.peak_rss):
+                stats.peak_rss = handle.peak_rss
+
+    def count(self, **counters):
+        """Add to the run-level counters."""
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] += int(value)
+
+    # ---------- sampling ----------
+
+    def _sample(self, stacks=True):
+        rss = current_rss()
+        with self._lock:
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+            for handle in self._open_stages:
+                handle._sample(rss)
+        if stacks and self.profile == "sampling":
+            frame = sys._current_frames().get(self._main_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self._stack_samples[";".join(reversed(stack))] += 1
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.sample_interval):
+            self._sample()
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        self.started = datetime.datetime.now()
+        self._main_thread_id = threading.get_ident()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._sample(stacks=False)
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"instrumentation-{self.name}", daemon=True)
+        self._sampler.start()
+        if self.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self, error=None):
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._stop_event.set()
+        self._sampler.join()
+        self._sample(stacks=False)
+        self.seconds = time.perf_counter() - self._t0
+        self.cpu_seconds = time.process_time() - self._cpu0
+        self.status = "failed" if error is not None else "ok"
+        self.error = None if error is None else f"{type(error).__name__}: {error}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop(exc)
+        return False
+
+    # ---------- report ----------
+
+    def _profile_top(self):
+        if self.profile == "cprofile" and self._profiler is not None:
+            stats = pstats.Stats(self._profiler).stats
+            rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            return [
+                {
+                    "function": f"{func} ({os.path.basename(path)}:{line})",
+                    "calls": nc,
+                    "self_seconds": tt,
+                    "cumulative_seconds": ct,
+                }
+                for (path, line, func), (_, nc, tt, ct, _) in rows
+            ]
+        if self.profile == "sampling":
+            total = sum(self._stack_samples.values())
+            self_samples = collections.Counter()
+            for stack, n in self._stack_samples.items():
+                self_samples[stack.rsplit(";", 1)[-1]] += n
+            return [
+                {"function": func, "samples": n, "share": n / total}
+                for func, n in self_samples.most_common(PROFILE_TOP)
+            ]
+        return []
+
+    def report(self):
+        """The run report as a JSON-serializable dict."""
+        seconds = self.seconds or 0.0
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds") if self.started else None,
+            "status": self.status,
+            "error": self.error,
+            "seconds": self.seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_mb": _mb(self.peak_rss),
+            "counters": dict(self.counters),
+            "stages": [s.to_dict(seconds) for s in self.stages.values()],
+            "profile": {"mode": self.profile, "top": self._profile_top()} if self.profile else None,
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "pid": os.getpid(),
+                "argv": sys.argv,
+            },
+        }
+
+    def write(self, path=None):
+        """
+        Write the JSON report (and the profile dump, if profiling).
+
+        Returns:
+            Path of the report
+        """
+        if path is None:
+            stamp = (self.started or datetime.datetime.now()).strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.report_dir, f"{self.name}-{stamp}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        report = self.report()
+        stem = os.path.splitext(path)[0]
+        if self.profile == "cprofile" and self._profiler is not None:
+            report["profile"]["path"] = f"{stem}.prof"
+            self._profiler.dump_stats(report["profile"]["path"])
+        elif self.profile == "sampling":
+            report["profile"]["path"] = f"{stem}.folded"
+            with open(report["profile"]["path"], "w", encoding="utf-8") as f:
+                for stack, n in self._stack_samples.most_common():
+                    f.write(f"{stack} {n}\n")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        self.path = path
+        return path
+
+    def summary(self):
+        """Plain-text table of stages, slowest first."""
+        seconds = self.seconds or 0.0
+        lines = [
+            f"{'stage':<36}{'calls':>7}{'seconds':>10}{'share':>8}{'rows':>12}{'MB':>10}{'peak RSS':>10}",
+        ]
+        for s in sorted(self.stages.values(), key=lambda s: s.seconds, reverse=True):
+            share = f"{s.seconds / seconds:.1%}" if seconds > 0 else "-"
+            rows = f"{s.counters['rows']}" if "rows" in s.counters else "-"
+            size = f"{_mb(s.counters['bytes']):.1f}" if "bytes" in s.counters else "-"
+            peak = f"{_mb(s.peak_rss):.0f}" if s.peak_rss is not None else "-"
+            lines.append(f"{s.name:<36}{s.calls:>7}{s.seconds:>10.3f}{share:>8}{rows:>12}{size:>10}{peak:>10}")
+        peak = f"{_mb(self.peak_rss):.0f} MB" if self.peak_rss is not None else "n/a"
+        lines.append(f"{'total':<36}{'':>7}{seconds:>10.3f}  (cpu {self.cpu_seconds or 0.0:.3f}s, peak RSS {peak})")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def run(name, profile=None, report_dir=None, write=True):
+    """
+    Instrument a run and write its report on exit (also when it fails).
+
+    Nested inside another active run, the block is recorded as a stage of
+    the outer run instead and the outer Run is yielded.
+
+    Args:
+        name: Run name
+        profile: None, "cprofile" or "sampling"
+        report_dir: Report directory (defaults to data_pipeline/reports)
+        write: Write the JSON report when the run ends
+
+    Yields:
+        Run
+    """
+    outer = current_run()
+    if outer is not None:
+        with stage(name):
+            yield outer
+        return
+
+    run_ = Run(name, profile=profile, report_dir=report_dir)
+    run_.start()
+    _runs.append(run_)
+    error = None
+    try:
+        yield run_
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _runs.remove(run_)
+        run_.stop(error)
+        if write:
+            run_.write()
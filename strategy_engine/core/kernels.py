@@ -0,0 +1,485 @@
+"""
+Rolling-window kernels for factor and signal computation.
+Computes rolling means and standard deviations for several windows in a
+single pass over each column of a (dates x assets) array.
+
+When numba is installed and the panel is large enough to amortize the
+one-off compile, the kernels are JIT-compiled and run in parallel across
+columns; otherwise an equivalent NumPy implementation is used.
+Both follow pandas rolling semantics with min_periods equal to the window:
+a result is NaN unless the full window is present and contains no NaN.
+
+rolling_max_drawdown gives the worst peak-to-trough decline within each
+trailing window in O(dates) per column (block prefix / suffix scans).
+
+return_stats reduces daily return series to the moments and path
+statistics (compounded return, maximum drawdown and its duration) that
+performance metrics are built from, with the same JIT / NumPy split.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - optional dependency
+    numba = None
+
+
+HAVE_NUMBA = numba is not None
+
+# Trading days per year, used to annualize rolling Sharpe ratios
+ANNUALIZATION = 252
+
+# Below this many (cells x windows) the NumPy path beats a cold compile;
+# compiled kernels are also cached on disk, next to this module
+JIT_MIN_WORK = 20_000_000
+
+# Below this many columns the NumPy drawdown walk uses cumulative ufuncs
+# down each column instead of one ufunc call per date across columns
+ROW_WALK_MIN_COLS = 256
+
+_compiled = {}
+
+
+def _as_panel(values):
+    """Return a float64 (dates x assets) array; 1-D input becomes one column."""
+    arr = np.asarray(values, dtype=np.float64)
+    return arr.reshape(-1, 1) if arr.ndim == 1 else arr
+
+
+def _restore_shape(arr, values):
+    return arr.reshape(-1) if np.ndim(values) == 1 else arr
+
+
+def _rolling_moments_numpy(x, windows, ddof, with_std):
+    """Cumulative-sum implementation, vectorized across columns, in place on the outputs."""
+    n_dates, n_cols = x.shape
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    # Variance is shift-invariant; centering each column keeps the
+    # cumulative sums small and avoids cancellation on price levels
+    centered = x.copy()
+    if has_missing:
+        centered[missing] = 0.0
+        counts = n_dates - missing.sum(axis=0)
+        center = np.divide(centered.sum(axis=0), counts, out=np.zeros(n_cols), where=counts > 0)
+        centered -= center
+        centered[missing] = 0.0
+    else:
+        center = x.mean(axis=0) if n_dates else np.zeros(n_cols)
+        centered -= center
+
+    s1 = np.empty((n_dates + 1, n_cols))
+    s1[0] = 0.0
+    np.cumsum(centered, axis=0, out=s1[1:])
+    if with_std:
+        s2 = np.empty((n_dates + 1, n_cols))
+        s2[0] = 0.0
+        np.square(centered, out=centered)
+        np.cumsum(centered, axis=0, out=s2[1:])
+    del centered
+
+    leading_only = False
+    if has_missing:
+        # Common case: NaN only before each asset's first price, so a window
+        # is valid once it starts at or after that row
+        first_valid = np.where(missing.all(axis=0), n_dates, (~missing).argmax(axis=0))
+        leading_only = bool((missing.sum(axis=0) == first_valid).all())
+        if not leading_only:
+            nans = np.zeros((n_dates + 1, n_cols), dtype=np.int32)
+            np.cumsum(missing, axis=0, dtype=np.int32, out=nans[1:])
+
+    shape = (len(windows), n_dates, n_cols)
+    means = np.empty(shape)
+    stds = np.empty(shape) if with_std else None
+    for k, w in enumerate(windows):
+        warmup = min(w - 1, n_dates)
+        means[k, :warmup] = np.nan
+        if with_std:
+            stds[k, :warmup] = np.nan
+        if w > n_dates:
+            continue
+
+        mean = means[k, w - 1:]
+        np.subtract(s1[w:], s1[:-w], out=mean)
+        if with_std:
+            var = stds[k, w - 1:]
+            np.subtract(s2[w:], s2[:-w], out=var)
+            if w > ddof:
+                # (sum2 - sum1^2 / w) / (w - ddof)
+                var -= mean * mean / w
+                np.maximum(var, 0.0, out=var)
+                var /= w - ddof
+                np.sqrt(var, out=var)
+            else:
+                var[:] = np.nan
+        mean /= w
+        mean += center
+
+        if leading_only:
+            for j in np.flatnonzero(first_valid):
+                mean[:first_valid[j], j] = np.nan
+                if with_std:
+                    stds[k, w - 1:w - 1 + first_valid[j], j] = np.nan
+        elif has_missing:
+            invalid = nans[w:] != nans[:-w]
+            np.copyto(mean, np.nan, where=invalid)
+            if with_std:
+                np.copyto(stds[k, w - 1:], np.nan, where=invalid)
+    return means, stds
+
+
+def _rolling_moments_kernel(xt, windows, ddof, means, stds):
+    """
+    Sliding-window Welford mean / M2 for every window in one pass per column.
+
+    xt is (assets x dates) so each column is contiguous; means and stds are
+    (windows x assets x dates) outputs.
+    """
+    n_cols, n_dates = xt.shape
+    n_win = windows.shape[0]
+    for j in numba.prange(n_cols):
+        count = np.zeros(n_win, dtype=np.int64)
+        n_nan = np.zeros(n_win, dtype=np.int64)
+        mean = np.zeros(n_win)
+        m2 = np.zeros(n_win)
+        for t in range(n_dates):
+            v = xt[j, t]
+            for k in range(n_win):
+                w = windows[k]
+                if np.isnan(v):
+                    n_nan[k] += 1
+                else:
+                    count[k] += 1
+                    d = v - mean[k]
+                    mean[k] += d / count[k]
+                    m2[k] += d * (v - mean[k])
+                if t >= w:
+                    u = xt[j, t - w]
+                    if np.isnan(u):
+                        n_nan[k] -= 1
+                    else:
+                        count[k] -= 1
+                        if count[k] == 0:
+                            mean[k] = 0.0
+                            m2[k] = 0.0
+                        else:
+                            d = u - mean[k]
+                            mean[k] -= d / count[k]
+                            m2[k] -= d * (u - mean[k])
+                if t >= w - 1 and n_nan[k] == 0:
+                    means[k, j, t] = mean[k]
+                    if w > ddof:
+                        stds[k, j, t] = np.sqrt(max(m2[k], 0.0) / (w - ddof))
+                    else:
+                        stds[k, j, t] = np.nan
+                else:
+                    means[k, j, t] = np.nan
+                    stds[k, j, t] = np.nan
+
+
+def _jit(func):
+    """Compile a kernel on first use (loaded from numba's on-disk cache when present)."""
+    if func.__name__ not in _compiled:
+        _compiled[func.__name__] = numba.njit(parallel=True, cache=True)(func)
+    return _compiled[func.__name__]
+
+
+def rolling_moments(values, windows, ddof=1, use_jit=None, with_std=True):
+    """
+    Rolling means and standard deviations for several windows at once.
+
+    Args:
+        values: (dates x assets) array, or a 1-D series of values
+        windows: Iterable of window lengths
+        ddof: Delta degrees of freedom of the standard deviation
+        use_jit: Force (True) or disable (False) the compiled kernel;
+            default uses it when numba is installed and the work is at
+            least JIT_MIN_WORK
+        with_std: If False, only means are computed (stds is None)
+
+    Returns:
+        Tuple of (means, stds), each a dict {window: array shaped like values}
+    """
+    windows = [int(w) for w in windows]
+    x = _as_panel(values)
+    if use_jit is None:
+        use_jit = HAVE_NUMBA and x.size * len(windows) >= JIT_MIN_WORK
+    if use_jit and not HAVE_NUMBA:
+        raise ImportError("numba is not installed")
+
+    if use_jit:
+        xt = np.ascontiguousarray(x.T)
+        shape = (len(windows),) + xt.shape
+        means_t, stds_t = np.empty(shape), np.empty(shape)
+        _jit(_rolling_moments_kernel)(xt, np.asarray(windows, dtype=np.int64), ddof, means_t, stds_t)
+        means = means_t.transpose(0, 2, 1)
+        stds = stds_t.transpose(0, 2, 1)
+    else:
+        means, stds = _rolling_moments_numpy(x, windows, ddof, with_std)
+
+    return (
+        {w: _restore_shape(means[k], values) for k, w in enumerate(windows)},
+        {w: _restore_shape(stds[k], values) for k, w in enumerate(windows)} if with_std else None,
+    )
+
+
+def rolling_mean(values, window, use_jit=None):
+    """Rolling mean over one window (pandas .rolling(window).mean())."""
+    return rolling_moments(values, [window], use_jit=use_jit, with_std=False)[0][window]
+
+
+def rolling_std(values, window, ddof=1, use_jit=None):
+    """Rolling sample standard deviation (pandas .rolling(window).std())."""
+    return rolling_moments(values, [window], ddof=ddof, use_jit=use_jit)[1][window]
+
+
+def rolling_sharpe(excess_returns, window, annualization=ANNUALIZATION, use_jit=None):
+    """Annualized rolling Sharpe ratio: rolling mean / rolling std * sqrt(annualization)."""
+    means, stds = rolling_moments(excess_returns, [window], use_jit=use_jit)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return means[window] / stds[window] * np.sqrt(annualization)
+
+
+def rolling_max_drawdown(returns, window):
+    """
+    Maximum drawdown of the compounded equity curve within each trailing window.
+
+    For the `window` returns ending at each date, the worst peak-to-trough
+    decline of (1 + r).cumprod() over those returns (the peak is taken
+    from the window's first point on, as performance_stats does on the
+    whole series). NaN unless the full window is present without NaN.
+
+    Runs in O(dates) per column with no per-window loop: the log equity
+    curve is split into blocks of `window` rows, forward and backward
+    scans give each block's prefix / suffix (max, min, worst drop), and
+    every window is the suffix of one block joined to the prefix of the
+    next.
+
+    Args:
+        returns: (dates x assets) array of simple returns, or a 1-D series
+        window: Number of returns per window
+
+    Returns:
+        Array shaped like returns, values <= 0
+    """
+    x = _as_panel(returns)
+    n_dates, n_cols = x.shape
+    w = int(window)
+    out = np.full(x.shape, np.nan)
+    if w < 1 or w > n_dates:
+        return _restore_shape(out, returns)
+
+    missing = np.isnan(x)
+    n_blocks = -(-n_dates // w)
+    level = np.zeros((n_blocks * w, n_cols))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.cumsum(np.log1p(np.where(missing, 0.0, x)), axis=0, out=level[:n_dates])
+    blocks = level.reshape(n_blocks, w, n_cols)
+
+    # Prefix of each block: running min and worst drop (running max - value)
+    prefix_min = np.minimum.accumulate(blocks, axis=1).reshape(-1, n_cols)
+    prefix_drop = np.maximum.accumulate(np.maximum.accumulate(blocks, axis=1) - blocks, axis=1)
+    prefix_drop = prefix_drop.reshape(-1, n_cols)
+
+    # Suffix of each block: max and worst drop (value - min of what follows)
+    rev = blocks[:, ::-1]
+    suffix_max = np.maximum.accumulate(rev, axis=1)[:, ::-1].reshape(-1, n_cols)
+    suffix_drop = np.maximum.accumulate(rev - np.minimum.accumulate(rev, axis=1), axis=1)
+    suffix_drop = suffix_drop[:, ::-1].reshape(-1, n_cols)
+
+    end = np.arange(w - 1, n_dates)
+    start = end - w + 1
+    drop = np.maximum(np.maximum(suffix_drop[start], prefix_drop[end]),
+                      suffix_max[start] - prefix_min[end])
+    # Windows that are exactly one block
+    aligned = start % w == 0
+    drop[aligned] = prefix_drop[end[aligned]]
+
+    nans = np.zeros((n_dates + 1, n_cols), dtype=np.int32)
+    np.cumsum(missing, axis=0, dtype=np.int32, out=nans[1:])
+    drawdown = np.expm1(-drop)
+    drawdown[nans[w:] != nans[:-w]] = np.nan
+    out[w - 1:] = drawdown
+    return _restore_shape(out, returns)
+
+
+def pct_change(values, periods=1):
+    """values[t] / values[t - periods] - 1, NaN for the first `periods` rows."""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if 0 < periods < len(x):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[periods:] = x[periods:] / x[:-periods] - 1.0
+    return out
+
+
+def _return_stats_numpy(x, rf):
+    """Column reductions for the moments plus a date-by-date walk with in-place row operations."""
+    n_dates, n_cols = x.shape
+    missing = np.isnan(x)
+    n = n_dates - np.count_nonzero(missing, axis=0)
+
+    # Excess-return moments (two-pass), zero where there is no return
+    excess = x - rf[:, None]
+    np.copyto(excess, 0.0, where=missing)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = excess.sum(axis=0) / n
+        downside = np.minimum(excess, 0.0)
+        downside_dev = np.sqrt(np.einsum('ij,ij->j', downside, downside) / n)
+        del downside
+        excess -= mean
+        np.copyto(excess, 0.0, where=missing)
+        std = np.sqrt(np.einsum('ij,ij->j', excess, excess) / (n - 1))
+    del excess
+
+    # Equity curve, running peak and underwater runs
+    growth = np.where(missing, 1.0, x + 1.0)
+    valid = ~missing
+    if n_cols < ROW_WALK_MIN_COLS:
+        equity, worst, longest = _drawdown_accumulate(growth, valid)
+        return n, equity, worst, longest, mean, std, downside_dev
+    equity = np.ones(n_cols)
+    peak = np.full(n_cols, -np.inf)
+    worst = np.ones(n_cols)
+    run = np.zeros(n_cols, dtype=np.int64)
+    longest = np.zeros(n_cols, dtype=np.int64)
+    ratio = np.empty(n_cols)
+    below = np.empty(n_cols, dtype=bool)
+    for t in range(n_dates):
+        v = valid[t]
+        equity *= growth[t]
+        np.maximum(peak, equity, out=peak, where=v)
+        np.divide(equity, peak, out=ratio)
+        np.minimum(worst, ratio, out=worst, where=v)
+        # Below the peak: extend the run; back at a peak: reset; gap: unchanged
+        np.less(ratio, 1.0, out=below)
+        np.add(run, 1, out=run, where=below & v)
+        np.copyto(run, 0, where=v & ~below)
+        np.maximum(longest, run, out=longest)
+    return n, equity, worst, longest, mean, std, downside_dev
+
+
+def _drawdown_accumulate(growth, valid):
+    """Drawdown statistics via cumulative ufuncs down each column (few columns)."""
+    equity = np.cumprod(growth, axis=0)
+    peak = np.maximum.accumulate(np.where(valid, equity, -np.inf), axis=0)
+    ratio = np.where(valid, equity / peak, 1.0)
+    below = valid & (ratio < 1.0)
+    # Length of the current underwater run: observations below the peak
+    # since the last observation at a peak
+    run = np.cumsum(below, axis=0)
+    run -= np.maximum.accumulate(np.where(valid & ~below, run, 0), axis=0)
+    n_cols = growth.shape[1]
+    if len(growth) == 0:
+        return np.ones(n_cols), np.ones(n_cols), np.zeros(n_cols, dtype=np.int64)
+    return equity[-1], ratio.min(axis=0), run.max(axis=0)
+
+
+def _return_stats_kernel(x, rf, block, n, equity, worst, longest, mean, std, downside_dev):
+    """
+    One pass over the dates, parallel over blocks of columns so the inner
+    loop reads each row of x contiguously. Moments use sums shifted by
+    each column's first excess return, which keeps the variance exact for
+    return-sized values.
+    """
+    n_dates, n_cols = x.shape
+    n_blocks = (n_cols + block - 1) // block
+    for b in numba.prange(n_blocks):
+        lo = b * block
+        width = min(lo + block, n_cols) - lo
+        count = np.zeros(width, dtype=np.int64)
+        shift = np.zeros(width)
+        s1 = np.zeros(width)
+        s2 = np.zeros(width)
+        down = np.zeros(width)
+        eq = np.ones(width)
+        peak = np.full(width, -np.inf)
+        low = np.ones(width)
+        run = np.zeros(width, dtype=np.int64)
+        best = np.zeros(width, dtype=np.int64)
+        for t in range(n_dates):
+            for k in range(width):
+                r = x[t, lo + k]
+                if np.isnan(r):
+                    continue
+                ex = r - rf[t]
+                if count[k] == 0:
+                    shift[k] = ex
+                count[k] += 1
+                d = ex - shift[k]
+                s1[k] += d
+                s2[k] += d * d
+                if ex < 0.0:
+                    down[k] += ex * ex
+
+                e = eq[k] * (1.0 + r)
+                eq[k] = e
+                if e >= peak[k]:
+                    peak[k] = e
+                    run[k] = 0
+                else:
+                    ratio = e / peak[k]
+                    if ratio < low[k]:
+                        low[k] = ratio
+                    run[k] += 1
+                    if run[k] > best[k]:
+                        best[k] = run[k]
+        for k in range(width):
+            j = lo + k
+            c = count[k]
+            n[j] = c
+            equity[j] = eq[k]
+            worst[j] = low[k]
+            longest[j] = best[k]
+            if c == 0:
+                mean[j] = np.nan
+                std[j] = np.nan
+                downside_dev[j] = np.nan
+                continue
+            mean[j] = shift[k] + s1[k] / c
+            downside_dev[j] = np.sqrt(down[k] / c)
+            if c > 1:
+                std[j] = np.sqrt(max(s2[k] - s1[k] * s1[k] / c, 0.0) / (c - 1))
+            else:
+                std[j] = np.nan
+
+
+def return_stats(returns, rf=None, use_jit=None):
+    """
+    Per-column statistics of daily return series, for performance metrics.
+
+    NaN returns are skipped: moments use only observed days, the equity
+    curve is flat across gaps and a drawdown is only measured from the
+    first observation on, as with pandas on the dropna()-ed series.
+
+    Args:
+        returns: (dates x series) array of simple returns, or a 1-D series
+        rf: Optional (dates,) risk-free returns subtracted for the moments
+            (NaN counts as 0)
+        use_jit: Force (True) or disable (False) the compiled kernel;
+            default as in rolling_moments
+
+    Returns:
+        Tuple of per-column arrays (n_obs, total_return, mean_excess,
+        std_excess (ddof=1), downside_dev (root mean square of negative
+        excess returns), max_drawdown, max_drawdown_duration); the
+        duration is the longest run of observations below a prior equity
+        peak. Nothing is annualized.
+    """
+    x = _as_panel(returns)
+    n_dates, n_cols = x.shape
+    rf = np.zeros(n_dates) if rf is None else np.nan_to_num(np.asarray(rf, dtype=np.float64), nan=0.0)
+    if use_jit is None:
+        use_jit = HAVE_NUMBA and x.size >= JIT_MIN_WORK
+    if use_jit and not HAVE_NUMBA:
+        raise ImportError("numba is not installed")
+
+    if use_jit:
+        n, longest = np.empty(n_cols, dtype=np.int64), np.empty(n_cols, dtype=np.int64)
+        equity, worst, mean, std, downside_dev = (np.empty(n_cols) for _ in range(5))
+        _jit(_return_stats_kernel)(np.ascontiguousarray(x), rf, 64, n, equity, worst, longest,
+                                   mean, std, downside_dev)
+    else:
+        n, equity, worst, longest, mean, std, downside_dev = _return_stats_numpy(x, rf)
+    return n, equity - 1.0, mean, std, downside_dev, worst - 1.0, longest
@@ -1,50 +1,213 @@
 """
 Data loader for processed data and features.
 Interfaces with data_pipeline outputs.
+
+Reads the parquet outputs the pipeline actually writes (preferring the
+partitioned lake when it has been built), pushes column, ticker and date
+selections into the read, and keeps an in-process LRU cache keyed by the
+source files' modification times so repeated backtests in one session do
+not go back to disk.
+
+Quick look at the price panel:
+
+    python strategy_engine/core/loader.py
+    python -m strategy_engine.core.loader
 """
 
-import pandas as pd
+import os
+import sys
+from functools import lru_cache
 from pathlib import Path
 
+import pandas as pd
+
+if __package__ in (None, ''):
+    # Run as a file (python loader.py): import through the package root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from strategy_engine.core import datalake
+else:
+    from . import datalake
+
+
+DEFAULT_BASE_DIR = Path(__file__).resolve().parents[2] / "data_pipeline"
+
+# Number of distinct (source, selection) reads kept in memory
+CACHE_SIZE = 32
+
+
+def source_signature(path):
+    """
+    Fingerprint a file or dataset directory by modification time and size.
+
+    Any rewrite of the source changes the signature, so cached reads keyed
+    on it are never served stale.
+    """
+    path = Path(path)
+    if path.is_file():
+        stat = path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    latest, count, size = 0, 0, 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            latest = max(latest, stat.st_mtime_ns)
+            count += 1
+            size += stat.st_size
+    return (latest, count, size)
+
+
+def _date_filters(start_date, end_date, column="date"):
+    filters = []
+    if start_date is not None:
+        filters.append((column, ">=", pd.Timestamp(start_date)))
+    if end_date is not None:
+        filters.append((column, "<=", pd.Timestamp(end_date)))
+    return filters
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _read_prices(path, lake_dir, signature, tickers, start_date, end_date):
+    if lake_dir is not None:
+        return datalake.read_prices_wide(
+            tickers=tickers, start=start_date, end=end_date, lake_dir=lake_dir
+        )
+    filters = _date_filters(start_date, end_date)
+    df = pd.read_parquet(
+        path,
+        columns=list(tickers) if tickers is not None else None,
+        filters=filters or None,
+    )
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index)
+    return df.sort_index()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _read_features(path, lake_dir, signature, columns, tickers, start_date, end_date):
+    if lake_dir is not None:
+        return datalake.read_features_long(
+            columns=columns, tickers=tickers, start=start_date, end=end_date,
+            lake_dir=lake_dir,
+        )
+    filters = _date_filters(start_date, end_date)
+    if tickers is not None:
+        filters.append(("ticker", "in", list(tickers)))
+    # The single file plus any incremental update parts written next to it
+    df = datalake.read_features_file(
+        path,
+        columns=["date", "ticker"] + list(columns) if columns is not None else None,
+        filters=filters or None,
+    )
+    df["date"] = pd.to_datetime(df["date"])
+    return df.sort_values(["ticker", "date"], kind="stable").reset_index(drop=True)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _read_risk_free(path, signature, start_date, end_date):
+    filters = _date_filters(start_date, end_date)
+    rf = pd.read_parquet(path, columns=["date", "rf_daily"], filters=filters or None)
+    rf["date"] = pd.to_datetime(rf["date"])
+    return rf.sort_values("date").set_index("date")["rf_daily"]
+
+
+def _key(values):
+    """Normalize list-like selections into hashable cache keys."""
+    return tuple(values) if values is not None else None
+
 
 class DataLoader:
     """Load processed prices and computed features."""
-    
-    def __init__(self, base_dir="data_pipeline"):
-        self.base_dir = Path(base_dir)
+
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir) if base_dir is not None else DEFAULT_BASE_DIR
         self.processed_dir = self.base_dir / "processed"
         self.features_dir = self.base_dir / "features"
-    
-    def load_price_panel(self):
-        """Load aligned price panel."""
-        price_path = self.processed_dir / "price_panel.csv"
-        return pd.read_csv(price_path, index_col=0, parse_dates=True)
-    
-    def load_features(self):
-        """Load computed feature matrix."""
-        feature_path = self.features_dir / "feature_matrix.csv"
-        return pd.read_csv(feature_path, index_col=0, parse_dates=True)
-    
-    def load_data_for_backtest(self, start_date=None, end_date=None):
+        self.macro_dir = self.base_dir / "macro"
+        self.lake_dir = self.base_dir / "lake"
+        self.prices_path = self.processed_dir / "prices_wide.parquet"
+        self.features_path = self.features_dir / "basic_tech_factors.parquet"
+        self.risk_free_path = self.macro_dir / "risk_free_irx.parquet"
+
+    def _source(self, dataset, fallback_path):
+        """
+        Pick the lake dataset if it exists, otherwise the single parquet file.
+
+        Returns:
+            Tuple of (path, lake_dir or None)
+        """
+        lake_dir = str(self.lake_dir)
+        if datalake.dataset_exists(dataset, lake_dir):
+            return datalake.dataset_path(dataset, lake_dir), lake_dir
+        if not fallback_path.exists():
+            raise FileNotFoundError(f"Pipeline output not found: {fallback_path}")
+        return str(fallback_path), None
+
+    def load_price_panel(self, tickers=None, start_date=None, end_date=None):
+        """
+        Load aligned price panel (dates x tickers).
+
+        Args:
+            tickers: Optional list of ticker columns to read
+            start_date, end_date: Optional inclusive date range
+
+        Returns:
+            DataFrame indexed by date
+        """
+        path, lake_dir = self._source(datalake.PRICES_DATASET, self.prices_path)
+        df = _read_prices(path, lake_dir, source_signature(path), _key(tickers),
+                          start_date, end_date)
+        return df.copy()
+
+    def load_features(self, columns=None, tickers=None, start_date=None, end_date=None):
+        """
+        Load computed features in long format [date, ticker, factors...].
+
+        Args:
+            columns: Optional list of factor columns to read
+            tickers: Optional list of tickers to keep
+            start_date, end_date: Optional inclusive date range
+
+        Returns:
+            DataFrame sorted by (ticker, date)
+        """
+        path, lake_dir = self._source(datalake.FEATURES_DATASET, self.features_path)
+        # A feature file with incremental parts is a directory; its signature covers every part
+        df = _read_features(path, lake_dir, source_signature(path), _key(columns),
+                            _key(tickers), start_date, end_date)
+        return df.copy()
+
+    def load_risk_free(self, start_date=None, end_date=None):
+        """Load daily risk-free returns (rf_daily) indexed by date."""
+        if not self.risk_free_path.exists():
+            raise FileNotFoundError(f"Pipeline output not found: {self.risk_free_path}")
+        path = str(self.risk_free_path)
+        rf = _read_risk_free(path, source_signature(path), start_date, end_date)
+        return rf.copy()
+
+    def load_data_for_backtest(self, start_date=None, end_date=None, tickers=None, columns=None):
         """
         Load price and feature data for backtest period.
-        
+
         Args:
             start_date: str, 'YYYY-MM-DD' format
             end_date: str, 'YYYY-MM-DD' format
-        
+            tickers: Optional list of tickers to load
+            columns: Optional list of feature columns to load
+
         Returns:
             Tuple of (price_panel, features)
         """
-        prices = self.load_price_panel()
-        features = self.load_features()
-        
-        if start_date and end_date:
-            prices = prices[start_date:end_date]
-            features = features[start_date:end_date]
-        
+        prices = self.load_price_panel(tickers, start_date, end_date)
+        features = self.load_features(columns, tickers, start_date, end_date)
         return prices, features
 
+    @staticmethod
+    def clear_cache():
+        """Drop all cached reads."""
+        _read_prices.cache_clear()
+        _read_features.cache_clear()
+        _read_risk_free.cache_clear()
+
 
 if __name__ == "__main__":
     loader = DataLoader()
@@ -0,0 +1,98 @@
+"""
+Size-bounded least-recently-used file directory.
+Backs the on-disk caches (factor arrays, backtest results): one file per
+entry, written atomically (temporary file + rename, so readers never see
+a partial entry), with recency tracked by modification time -- reads bump
+it through touch(). After each write the oldest entries are removed until
+the files with the directory's suffix fit in max_bytes.
+"""
+
+import os
+
+
+class LRUDirectory:
+    """Directory of cache files evicted least recently used first."""
+
+    def __init__(self, cache_dir, suffix, max_bytes):
+        """
+        Args:
+            cache_dir: Directory holding the entries (created on first write)
+            suffix: File suffix of entries, e.g. '.pkl'; other files are ignored
+            max_bytes: Total size above which least recently used entries
+                are evicted
+        """
+        self.cache_dir = cache_dir
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+
+    def path(self, name):
+        """Path of the entry called `name`."""
+        return os.path.join(self.cache_dir, f"{name}{self.suffix}")
+
+    def write(self, path, dump):
+        """
+        Write an entry atomically, then evict down to max_bytes.
+
+        Args:
+            path: Entry path from path()
+            dump: Callable writing the entry to an open binary file
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            dump(f)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    @staticmethod
+    def touch(path):
+        """Mark an entry as recently used."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def remove(path):
+        """Remove an entry, ignoring one that is already gone."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """List of (path, size, last used time) of the entries, oldest first."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda e: e[2])
+
+    def size(self):
+        """Total bytes held by the entries."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove least recently used entries (never `keep`) until the total fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self.remove(path)
+            total -= size
+
+    def clear(self):
+        """Remove every entry."""
+        for path, _, _ in self.entries():
+            self.remove(path)
@@ -0,0 +1,158 @@
+"""
+Memory-mapped binary panel cache.
+Stores prices, returns, rf and each factor as aligned .npy arrays that
+share one date/ticker index, so backtests open them with np.memmap in
+milliseconds instead of re-parsing, pivoting and reindexing parquet.
+Processes mapping the same files share the same OS pages.
+
+Layout (under data_pipeline/cache/panel/):
+    meta.json             tickers, factor names, source signatures
+    dates.npy             int64 nanoseconds since epoch
+    prices.npy            float64 (dates x tickers)
+    returns.npy           float64 (dates x tickers), simple returns
+    rf.npy                float64 (dates,), rf_daily aligned to dates (not filled)
+    factors/<name>.npy    float64 (dates x tickers)
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .loader import source_signature
+
+
+CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "cache", "panel")
+)
+
+FORMAT_VERSION = 1
+
+
+def _save(path, arr, dtype=np.float64):
+    np.save(path, np.ascontiguousarray(arr, dtype=dtype))
+
+
+def write_panel_cache(prices_wide, returns_wide, rf_daily, factors, sources=None, cache_dir=None):
+    """
+    Write the panel cache atomically (build in a temp dir, then swap in).
+
+    Args:
+        prices_wide: DataFrame (dates x tickers)
+        returns_wide: DataFrame aligned to prices_wide
+        rf_daily: Series of daily risk-free returns (aligned to prices dates)
+        factors: Dict of {factor name: DataFrame aligned to prices_wide}
+        sources: Optional list of source file paths whose signatures are
+            recorded for freshness checks
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    tmp_dir = f"{cache_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_dir, "factors"))
+
+    dates = prices_wide.index
+    tickers = [str(t) for t in prices_wide.columns]
+
+    _save(os.path.join(tmp_dir, "dates.npy"), dates.to_numpy(dtype="datetime64[ns]").view(np.int64), np.int64)
+    _save(os.path.join(tmp_dir, "prices.npy"), prices_wide.to_numpy(dtype=np.float64))
+    _save(os.path.join(tmp_dir, "returns.npy"),
+          returns_wide.reindex(index=dates, columns=prices_wide.columns).to_numpy(dtype=np.float64))
+    _save(os.path.join(tmp_dir, "rf.npy"), rf_daily.reindex(dates).to_numpy(dtype=np.float64))
+    for name, wide in factors.items():
+        _save(os.path.join(tmp_dir, "factors", f"{name}.npy"),
+              wide.reindex(index=dates, columns=prices_wide.columns).to_numpy(dtype=np.float64))
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "tickers": tickers,
+        "factors": list(factors),
+        "n_dates": len(dates),
+        "sources": {os.path.abspath(p): list(source_signature(p)) for p in (sources or [])},
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def cache_exists(cache_dir=None):
+    """Check whether a panel cache has been written."""
+    return os.path.exists(os.path.join(cache_dir or CACHE_DIR, "meta.json"))
+
+
+class PanelCache:
+    """Read-only view over a memory-mapped panel cache."""
+
+    def __init__(self, cache_dir=None):
+        """
+        Open the cache; arrays are mapped lazily on first access.
+
+        Args:
+            cache_dir: Cache directory (defaults to data_pipeline/cache/panel)
+        """
+        self.cache_dir = cache_dir or CACHE_DIR
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Panel cache not found: {self.cache_dir}")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported panel cache format: {self.meta.get('format_version')}")
+
+        self.tickers = self.meta["tickers"]
+        self.factor_names = self.meta["factors"]
+        self.dates = pd.DatetimeIndex(self._load("dates.npy").view("datetime64[ns]"), name="date")
+        self._column = {t: i for i, t in enumerate(self.tickers)}
+        self._arrays = {}
+
+    def _load(self, relpath):
+        return np.load(os.path.join(self.cache_dir, relpath), mmap_mode="r")
+
+    def is_fresh(self):
+        """True if every recorded source still has the signature it had at build time."""
+        for path, signature in self.meta["sources"].items():
+            if not os.path.exists(path) or list(source_signature(path)) != signature:
+                return False
+        return True
+
+    def array(self, name):
+        """
+        Memory-mapped array by name: 'prices', 'returns', 'rf' or a factor name.
+        """
+        if name not in self._arrays:
+            if name in ("prices", "returns", "rf"):
+                self._arrays[name] = self._load(f"{name}.npy")
+            elif name in self.factor_names:
+                self._arrays[name] = self._load(os.path.join("factors", f"{name}.npy"))
+            else:
+                raise KeyError(f"Unknown panel array: {name}")
+        return self._arrays[name]
+
+    def columns(self, tickers):
+        """Column positions of the given tickers."""
+        missing = [t for t in tickers if t not in self._column]
+        if missing:
+            raise KeyError(f"Tickers not in panel cache: {missing}")
+        return np.array([self._column[t] for t in tickers], dtype=np.int64)
+
+    def frame(self, name, tickers=None, start=0):
+        """
+        DataFrame view of a (dates x tickers) array.
+
+        Args:
+            name: Array name
+            tickers: Optional subset of tickers (in the requested order)
+            start: First row position to include
+        """
+        arr = self.array(name)
+        if tickers is None:
+            return pd.DataFrame(arr[start:], index=self.dates[start:], columns=self.tickers)
+        return pd.DataFrame(arr[start:, self.columns(tickers)], index=self.dates[start:],
+                            columns=list(tickers))
+
+    def series(self, name="rf", start=0):
+        """Series view of a per-date array such as 'rf'."""
+        return pd.Series(self.array(name)[start:], index=self.dates[start:], name=name)
@@ -0,0 +1,192 @@
+"""
+Rebalancing engine.
+Simulates holding target weights on a daily, weekly or monthly schedule,
+with weights drifting between rebalances, optional no-trade bands and
+proportional + fixed transaction costs, on whole (dates x assets) arrays.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+REBALANCE_FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+# Weight differences below this are float noise, not trades
+TRADE_TOLERANCE = 1e-12
+
+
+def rebalance_schedule(dates, frequency='daily'):
+    """
+    Mark the rebalance dates: the first trading date of each period.
+
+    Args:
+        dates: Ascending DatetimeIndex of trading dates
+        frequency: 'daily', 'weekly' or 'monthly' (as rebalance_frequency
+            in the strategy config)
+
+    Returns:
+        Boolean array, True on rebalance dates (always True on the first date)
+    """
+    dates = pd.DatetimeIndex(dates)
+    if frequency == 'daily':
+        return np.ones(len(dates), dtype=bool)
+    if frequency == 'weekly':
+        period = dates.to_period('W').asi8
+    elif frequency == 'monthly':
+        period = np.asarray(dates.year * 12 + dates.month)
+    else:
+        raise ValueError(f"Unknown rebalance frequency: {frequency}")
+
+    mask = np.ones(len(dates), dtype=bool)
+    mask[1:] = period[1:] != period[:-1]
+    return mask
+
+
+def price_returns(prices):
+    """
+    Simple returns between consecutive rows of a (dates x assets) price array.
+
+    Missing or non-positive prices give 0 (untradeable assets earn nothing).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rets = np.zeros_like(prices)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rets[1:] = prices[1:] / prices[:-1] - 1.0
+    rets[~np.isfinite(rets)] = 0.0
+    return rets
+
+
+def simulate_rebalancing(returns, target_weights, rebalance=None, initial_capital=1.0,
+                         cost_rate=0.0, fixed_cost=0.0, no_trade_band=0.0, cash_returns=None):
+    """
+    Simulate a portfolio that trades to target weights on rebalance dates.
+
+    On a rebalance date the portfolio is marked to market, every asset whose
+    drifted weight is more than no_trade_band away from its target is traded
+    back to target, and costs are charged against the pre-trade value:
+    cost_rate * turnover * value + fixed_cost * number of assets traded.
+    Assets inside the band keep their holdings. Between rebalances holdings
+    drift with asset returns; the uninvested remainder is cash.
+
+    Daily schedules without a band run as a closed-form array computation.
+    Other schedules, and daily schedules with a band (whether an asset
+    trades depends on its drift since it last traded, so the path cannot be
+    written in closed form), loop over rebalance events in Python, each
+    holding segment being computed as one array operation; a daily schedule
+    with a band is therefore a per-date loop.
+
+    Args:
+        returns: (dates x assets) simple returns; row t is the return from t-1 to t
+        target_weights: (dates x assets) target weights, read on rebalance dates
+        rebalance: Boolean array of rebalance dates (default: every date)
+        initial_capital: Starting portfolio value
+        cost_rate: Proportional cost per unit of turnover
+        fixed_cost: Cost per asset traded, in currency units
+        no_trade_band: Absolute weight tolerance before an asset is traded
+        cash_returns: Optional (dates,) returns earned on cash (default 0)
+
+    Returns:
+        Tuple of (values, weights, turnover, costs, traded):
+            values: (dates,) pre-trade portfolio values
+            weights: (dates x assets) weights held after the day's trades
+            turnover: (dates,) sum of absolute weight changes traded
+            costs: (dates,) transaction costs charged
+            traded: (dates x assets) boolean, assets traded that day
+    """
+    rets = np.ascontiguousarray(returns, dtype=np.float64)
+    targets = np.ascontiguousarray(target_weights, dtype=np.float64)
+    n_dates = rets.shape[0]
+    if rebalance is None:
+        rebalance = np.ones(n_dates, dtype=bool)
+    else:
+        rebalance = np.array(rebalance, dtype=bool)
+        if n_dates:
+            rebalance[0] = True
+    cash_rets = (np.zeros(n_dates) if cash_returns is None
+                 else np.nan_to_num(np.asarray(cash_returns, dtype=np.float64)))
+
+    if n_dates == 0:
+        return (np.zeros(0), np.zeros_like(targets), np.zeros(0), np.zeros(0),
+                np.zeros(targets.shape, dtype=bool))
+    if rebalance.all() and no_trade_band == 0:
+        return _simulate_daily(rets, targets, initial_capital, cost_rate, fixed_cost, cash_rets)
+    return _simulate_events(rets, targets, np.flatnonzero(rebalance), initial_capital,
+                            cost_rate, fixed_cost, no_trade_band, cash_rets)
+
+
+def _simulate_daily(rets, targets, initial_capital, cost_rate, fixed_cost, cash_rets):
+    """Every date trades fully to target, so drift only spans one day."""
+    # Weights drifted from the previous rebalance, before today's trade
+    prev = np.zeros_like(targets)
+    prev[1:] = targets[:-1]
+    prev_cash = 1.0 - prev.sum(axis=1)
+    growth = 1.0 + np.einsum('ij,ij->i', prev, rets) + prev_cash * cash_rets
+    drifted = prev * (1.0 + rets)
+    drifted = np.divide(drifted, growth[:, None], out=np.zeros_like(drifted),
+                        where=growth[:, None] != 0)
+
+    diff = np.abs(targets - drifted)
+    traded = diff > TRADE_TOLERANCE
+    turnover = np.where(traded, diff, 0.0).sum(axis=1)
+    fixed = fixed_cost * traded.sum(axis=1)
+
+    # V_{t+1} = (V_t * (1 - cost_rate * turnover_t) - fixed_t) * growth_{t+1}
+    # is linear in V_t: V_t = P_t * (V_0 + sum_{s<t} b_s / P_{s+1})
+    a = (1.0 - cost_rate * turnover[:-1]) * growth[1:]
+    b = -fixed[:-1] * growth[1:]
+    carried = np.ones(len(growth))
+    carried[1:] = np.cumprod(a)
+    offsets = np.zeros(len(growth))
+    if fixed_cost:
+        if not carried.all():
+            # The portfolio was wiped out (an asset lost 100%, or costs ate the
+            # whole value), so the recurrence cannot be divided through by P_t
+            return _simulate_events(rets, targets, np.arange(len(growth)), initial_capital,
+                                    cost_rate, fixed_cost, 0.0, cash_rets)
+        offsets[1:] = np.cumsum(b / carried[1:])
+    values = carried * (initial_capital + offsets)
+    costs = cost_rate * turnover * values + fixed
+    return values, targets.copy(), turnover, costs, traded
+
+
+def _simulate_events(rets, targets, starts, initial_capital, cost_rate, fixed_cost,
+                     no_trade_band, cash_rets):
+    """Loop over rebalance events; each holding segment is one array operation."""
+    n_dates, n_assets = targets.shape
+    values = np.empty(n_dates)
+    weights = np.zeros((n_dates, n_assets))
+    turnover = np.zeros(n_dates)
+    costs = np.zeros(n_dates)
+    traded = np.zeros((n_dates, n_assets), dtype=bool)
+    tolerance = max(no_trade_band, TRADE_TOLERANCE)
+
+    value = initial_capital
+    drifted = np.zeros(n_assets)
+    ends = np.append(starts[1:], n_dates)
+    for s, e in zip(starts, ends):
+        # Trade assets outside the band back to target
+        diff = targets[s] - drifted
+        trade = np.abs(diff) > tolerance
+        turnover[s] = np.abs(diff[trade]).sum()
+        costs[s] = cost_rate * turnover[s] * value + fixed_cost * trade.sum()
+        post = value - costs[s]
+        held = np.where(trade, targets[s] * post, drifted * value)
+        cash = post - held.sum()
+
+        values[s] = value
+        traded[s] = trade
+        if post != 0:
+            weights[s] = held / post
+
+        # Drift holdings and cash through the segment (and into the next event)
+        path = held * np.cumprod(1.0 + rets[s + 1:e + 1], axis=0)
+        totals = path.sum(axis=1) + cash * np.cumprod(1.0 + cash_rets[s + 1:e + 1])
+        inside = e - s - 1
+        values[s + 1:e] = totals[:inside]
+        np.divide(path[:inside], totals[:inside, None], out=weights[s + 1:e],
+                  where=totals[:inside, None] != 0)
+        if e < n_dates:
+            value = totals[inside]
+            drifted = path[inside] / value if value != 0 else np.zeros(n_assets)
+
+    return values, weights, turnover, costs, traded
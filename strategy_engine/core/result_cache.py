@@ -0,0 +1,159 @@
+"""
+Content-addressed on-disk cache for backtest results.
+Results are stored under a fingerprint of everything that determines
+them: the input data (source file signatures or a hash of in-memory
+frames), the source code of the strategy and the modules it runs
+through, and the parameters. Identical requests are served from disk
+instead of being recomputed; any change to data, code or parameters
+produces a new key, so entries never go stale and are never invalidated
+explicitly.
+
+The directory is bounded in size; when a new entry pushes it over the
+limit, the least recently used entries are evicted (reads bump an
+entry's modification time).
+
+Layout (under data_pipeline/cache/results/):
+    <key>.pkl    pickled result object
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .loader import source_signature
+from .lru_dir import LRUDirectory
+
+
+RESULT_CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data_pipeline", "cache", "results")
+)
+
+# Size bound of the cache directory
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+# Bump to invalidate every entry when the stored format changes
+CACHE_VERSION = 1
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=16)
+
+
+def code_version(*objects):
+    """
+    Hash of the source files defining the given modules, classes or functions.
+
+    Editing any of those files changes the version, and with it every
+    fingerprint that includes it.
+    """
+    h = _hasher()
+    for path in sorted({os.path.abspath(inspect.getsourcefile(obj)) for obj in objects}):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def data_digest(obj):
+    """Hash of an in-memory DataFrame, Series or array (values, index and columns)."""
+    h = _hasher()
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+        if isinstance(obj, pd.DataFrame):
+            h.update(json.dumps([str(c) for c in obj.columns]).encode("utf-8"))
+            h.update(json.dumps([str(t) for t in obj.dtypes]).encode("utf-8"))
+    else:
+        arr = np.ascontiguousarray(obj)
+        h.update(str((arr.dtype.str, arr.shape)).encode("utf-8"))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def fingerprint(params=None, sources=(), data=(), code=()):
+    """
+    Cache key for one computation.
+
+    Args:
+        params: JSON-serializable parameters (dict, list, scalars)
+        sources: Paths of input files or dataset directories, fingerprinted
+            by modification time and size (missing paths are recorded as such)
+        data: In-memory inputs (DataFrames, Series, arrays)
+        code: Modules / functions whose source files the result depends on
+
+    Returns:
+        Hex digest
+    """
+    material = {
+        "version": CACHE_VERSION,
+        "pandas": pd.__version__,
+        "params": params,
+        "sources": {
+            os.path.abspath(p): list(source_signature(p)) if os.path.exists(p) else None
+            for p in sources
+        },
+        "data": [data_digest(d) for d in data],
+        "code": code_version(*code) if code else None,
+    }
+    h = _hasher()
+    h.update(json.dumps(material, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache(LRUDirectory):
+    """Size-bounded LRU cache of pickled results, one file per key."""
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Cache directory (defaults to data_pipeline/cache/results)
+            max_bytes: Total size above which least recently used entries
+                are evicted
+        """
+        super().__init__(cache_dir or RESULT_CACHE_DIR, ".pkl", max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached result for `key` (marking it recently used), or `default`."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Truncated or written by an incompatible version: drop it
+            self.remove(path)
+            self.misses += 1
+            return default
+        self.touch(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store `value` under `key` atomically, then evict down to max_bytes."""
+        self.write(self.path(key), lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached result for `key`, computing and storing it on a miss.
+
+        Args:
+            key: Fingerprint from fingerprint()
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            Tuple of (result, hit) where hit is True if served from the cache
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
@@ -1,11 +1,63 @@
 """
 Signal generation module.
 Includes trend, volatility, and regime detection signals.
+
+All signals accept a single asset (Series) or a wide panel (DataFrame,
+dates x tickers) and return the same shape, aligned to the input, with
+NaN during each asset's warm-up period.
 """
 
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
+if __package__ in (None, ''):
+    # Run as a file (python signals.py): import through the package root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from strategy_engine.core import kernels
+else:
+    from . import kernels
+
+
+def _sign(condition, valid, like):
+    """
+    +1 where condition holds, -1 where it does not, NaN where not valid.
+
+    Args:
+        condition: Boolean array
+        valid: Boolean array, False during warm-up
+        like: Series / DataFrame / array whose index and columns the
+            result takes
+    """
+    values = np.where(np.asarray(condition), 1.0, -1.0)
+    values[~np.asarray(valid)] = np.nan
+    return _like(values, like)
+
+
+def _like(values, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(values, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index, name=like.name)
+    return values
+
+
+def _aligned(signal, like):
+    """Float64 values of signal, label-aligned onto like when both are pandas objects."""
+    if isinstance(signal, (pd.Series, pd.DataFrame)) and isinstance(like, (pd.Series, pd.DataFrame)):
+        if signal.ndim != like.ndim:
+            raise ValueError(f"Cannot combine a {type(signal).__name__} with a {type(like).__name__}")
+        if not signal.index.equals(like.index):
+            signal = signal.reindex(index=like.index)
+        if signal.ndim == 2 and not signal.columns.equals(like.columns):
+            signal = signal.reindex(columns=like.columns)
+    values = np.asarray(signal, dtype=np.float64)
+    if values.shape != np.shape(like):
+        raise ValueError(f"Signal shapes differ: {values.shape} vs {np.shape(like)}")
+    return values
+
 
 class SignalGenerator:
     """Generate trading signals from price and feature data."""
@@ -15,71 +67,94 @@ class SignalGenerator:
         """
         Simple moving average crossover signal.
         
+        Args:
+            prices: Series or DataFrame (dates x tickers) of prices
+        
         Returns:
-            1 if fast_ma > slow_ma, -1 otherwise
+            1 if fast_ma > slow_ma, -1 otherwise, NaN until both
+            averages are available
         """
-        fast = prices.rolling(fast_ma).mean()
-        slow = prices.rolling(slow_ma).mean()
-        signal = pd.Series(
-            np.where(fast > slow, 1, -1),
-            index=prices.index
-        )
-        return signal
+        means, _ = kernels.rolling_moments(prices, [fast_ma, slow_ma], with_std=False)
+        fast, slow = means[fast_ma], means[slow_ma]
+        valid = ~(np.isnan(fast) | np.isnan(slow))
+        with np.errstate(invalid='ignore'):
+            return _sign(fast > slow, valid, prices)
     
     @staticmethod
     def volatility_signal(returns, vol_window=20, vol_threshold=0.15):
         """
         Volatility regime signal.
         
+        Args:
+            returns: Series or DataFrame (dates x tickers) of returns
+        
         Returns:
-            1 if vol < threshold (low vol), -1 if vol > threshold (high vol)
+            1 if vol < threshold (low vol), -1 if vol > threshold (high vol),
+            NaN until a full window of returns is available
         """
-        vol = returns.rolling(vol_window).std()
-        signal = pd.Series(
-            np.where(vol < vol_threshold, 1, -1),
-            index=returns.index
-        )
-        return signal
+        vol = kernels.rolling_std(returns, vol_window)
+        with np.errstate(invalid='ignore'):
+            return _sign(vol < vol_threshold, ~np.isnan(vol), returns)
     
     @staticmethod
     def momentum_signal(prices, window=20):
         """
         Momentum signal based on price momentum.
         
+        Args:
+            prices: Series or DataFrame (dates x tickers) of prices
+        
         Returns:
-            1 if positive momentum, -1 if negative momentum
+            1 if positive momentum, -1 if negative momentum, NaN until
+            `window` bars of history are available
         """
-        momentum = prices.pct_change(window)
-        signal = pd.Series(
-            np.where(momentum > 0, 1, -1),
-            index=prices.index
-        )
-        return signal
+        momentum = kernels.pct_change(prices, window)
+        with np.errstate(invalid='ignore'):
+            return _sign(momentum > 0, ~np.isnan(momentum), prices)
     
     @staticmethod
     def combine_signals(signal_dict, weights=None):
         """
         Combine multiple signals with optional weights.
         
+        The weighted sum is accumulated into one preallocated output array
+        (plus a single scratch buffer), without building a stacked copy or
+        a new pandas object per term. NaN in any weighted signal (warm-up)
+        propagates to the combined signal.
+        
         Args:
-            signal_dict: Dictionary of signals
+            signal_dict: Dictionary of signals (Series, DataFrames or
+                arrays). Pandas signals are aligned by label onto the first
+                signal's index (and columns); labels missing from a signal
+                give NaN. Arrays must have the first signal's shape.
             weights: Dictionary of weights for each signal
         
         Returns:
-            Combined signal
+            Combined signal, shaped like the first signal (all zeros when
+            every weight is 0)
         """
         if weights is None:
             weights = {k: 1.0 / len(signal_dict) for k in signal_dict.keys()}
         
+        like = next(iter(signal_dict.values()))
         combined = None
+        scratch = None
         for name, signal in signal_dict.items():
             w = weights.get(name, 0)
+            if w == 0:
+                continue
+            values = _aligned(signal, like)
             if combined is None:
-                combined = signal * w
-            else:
-                combined += signal * w
+                combined = np.multiply(values, w)
+                continue
+            if scratch is None:
+                scratch = np.empty_like(combined)
+            np.multiply(values, w, out=scratch)
+            np.add(combined, scratch, out=combined)
         
-        return combined
+        if combined is None:
+            combined = np.zeros(np.shape(like))
+        return _like(combined, like)
 
 
 if __name__ == "__main__":
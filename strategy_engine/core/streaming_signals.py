@@ -0,0 +1,272 @@
+"""
+Streaming signal engine.
+Keeps O(1) rolling state per asset (ring buffers with running sums,
+sliding-window Welford variance) and updates the SignalGenerator trend,
+momentum and volatility signals as each new daily bar arrives, instead of
+recomputing full rolling windows over the whole history.
+
+The state can be checkpointed to a single .npz file after the end-of-day
+run and restored the next day.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+CHECKPOINT_VERSION = 1
+
+SIGNAL_NAMES = ('trend', 'momentum', 'volatility')
+
+
+class RollingWindow:
+    """Ring buffer of the last `size` rows per asset with a running sum."""
+
+    def __init__(self, size, n_assets):
+        self.size = size
+        self.buffer = np.full((size, n_assets), np.nan)
+        self.pos = 0
+        self.count = 0
+        self.total = np.zeros(n_assets)
+        self.n_nan = np.zeros(n_assets, dtype=np.int64)
+
+    def push(self, values):
+        """
+        Insert one row of values.
+
+        Returns:
+            The row that fell out of the window (all NaN while filling)
+        """
+        evicted = self.buffer[self.pos].copy()
+        full = self.count == self.size
+        self.buffer[self.pos] = values
+        self.pos = (self.pos + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+        new_nan = np.isnan(values)
+        self.total += np.where(new_nan, 0.0, values)
+        self.n_nan += new_nan
+        if full:
+            old_nan = np.isnan(evicted)
+            self.total -= np.where(old_nan, 0.0, evicted)
+            self.n_nan -= old_nan
+        if self.pos == 0:
+            # Once per lap, resum the buffer so rounding error cannot accumulate
+            self.total = np.nansum(self.buffer, axis=0)
+        return evicted
+
+    def valid(self):
+        """Assets with a full window and no missing values (pandas min_periods=size)."""
+        return (self.count == self.size) & (self.n_nan == 0)
+
+    def mean(self):
+        """Window mean per asset, NaN where the window is not valid."""
+        return np.where(self.valid(), self.total / self.size, np.nan)
+
+    def state(self):
+        return {
+            'buffer': self.buffer,
+            'pos': np.int64(self.pos),
+            'count': np.int64(self.count),
+            'total': self.total,
+            'n_nan': self.n_nan,
+        }
+
+    def load_state(self, state):
+        self.buffer = np.array(state['buffer'], dtype=np.float64)
+        self.pos = int(state['pos'])
+        self.count = int(state['count'])
+        self.total = np.array(state['total'], dtype=np.float64)
+        self.n_nan = np.array(state['n_nan'], dtype=np.int64)
+
+
+class RollingVariance(RollingWindow):
+    """Ring buffer with a sliding-window Welford mean / M2 over non-missing values."""
+
+    def __init__(self, size, n_assets):
+        super().__init__(size, n_assets)
+        self.n = np.zeros(n_assets, dtype=np.int64)
+        self.avg = np.zeros(n_assets)
+        self.m2 = np.zeros(n_assets)
+
+    def push(self, values):
+        evicted = super().push(values)
+
+        # Remove the value leaving the window
+        out = ~np.isnan(evicted)
+        if out.any():
+            self.n -= out
+            y = np.where(out, evicted, 0.0)
+            delta = np.where(out, y - self.avg, 0.0)
+            self.avg -= np.divide(delta, self.n, out=np.zeros_like(delta), where=out & (self.n > 0))
+            self.m2 -= delta * np.where(out, y - self.avg, 0.0)
+            empty = self.n == 0
+            self.avg[empty] = 0.0
+            self.m2[empty] = 0.0
+
+        # Add the new value
+        new = ~np.isnan(values)
+        self.n += new
+        x = np.where(new, values, 0.0)
+        delta = np.where(new, x - self.avg, 0.0)
+        self.avg += np.divide(delta, self.n, out=np.zeros_like(delta), where=new)
+        self.m2 += delta * np.where(new, x - self.avg, 0.0)
+
+        if self.pos == 0:
+            # Exact resync once per lap, as for the running sum
+            self.avg = np.divide(self.total, self.n, out=np.zeros_like(self.total), where=self.n > 0)
+            dev = np.where(np.isnan(self.buffer), 0.0, self.buffer - self.avg)
+            self.m2 = (dev ** 2).sum(axis=0)
+        return evicted
+
+    def std(self):
+        """Sample standard deviation (ddof=1) per asset, NaN where not valid."""
+        valid = self.valid() & (self.size > 1)
+        var = np.maximum(self.m2, 0.0) / max(self.size - 1, 1)
+        return np.where(valid, np.sqrt(var), np.nan)
+
+    def state(self):
+        state = super().state()
+        state.update({'n': self.n, 'avg': self.avg, 'm2': self.m2})
+        return state
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.n = np.array(state['n'], dtype=np.int64)
+        self.avg = np.array(state['avg'], dtype=np.float64)
+        self.m2 = np.array(state['m2'], dtype=np.float64)
+
+
+class StreamingSignalEngine:
+    """Incrementally maintained SignalGenerator signals for a fixed universe."""
+
+    def __init__(self, tickers, fast_ma=20, slow_ma=63, momentum_window=20,
+                 vol_window=20, vol_threshold=0.15):
+        """
+        Initialize empty rolling state.
+
+        Args:
+            tickers: Asset universe (column order of all state arrays)
+            fast_ma, slow_ma: Moving-average windows of the trend signal
+            momentum_window: Lookback of the momentum signal
+            vol_window, vol_threshold: Window and threshold of the
+                volatility signal (on daily return standard deviation)
+        """
+        self.tickers = list(tickers)
+        self.params = {
+            'fast_ma': fast_ma,
+            'slow_ma': slow_ma,
+            'momentum_window': momentum_window,
+            'vol_window': vol_window,
+            'vol_threshold': vol_threshold,
+        }
+        n_assets = len(self.tickers)
+        self.fast = RollingWindow(fast_ma, n_assets)
+        self.slow = RollingWindow(slow_ma, n_assets)
+        self.lagged = RollingWindow(momentum_window, n_assets)
+        self.vol = RollingVariance(vol_window, n_assets)
+        self.last_price = np.full(n_assets, np.nan)
+        self.last_date = None
+
+    def _row(self, prices):
+        if isinstance(prices, pd.Series):
+            return prices.reindex(self.tickers).to_numpy(dtype=np.float64)
+        row = np.asarray(prices, dtype=np.float64)
+        if row.shape != (len(self.tickers),):
+            raise ValueError(f"Expected {len(self.tickers)} prices, got shape {row.shape}")
+        return row
+
+    def update(self, date, prices):
+        """
+        Ingest one bar and return the updated signals.
+
+        Args:
+            date: Bar date; must be later than the previous bar
+            prices: Series indexed by ticker (missing tickers are NaN) or
+                an array in self.tickers order
+
+        Returns:
+            DataFrame (tickers x ['trend', 'momentum', 'volatility']) of +1 / -1,
+            NaN while an asset's window is still warming up
+        """
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Bar {date.date()} is not after last bar {self.last_date.date()}")
+        price = self._row(prices)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = price / self.last_price - 1.0
+            lagged = self.lagged.push(price)
+            mom = price / lagged - 1.0
+        self.fast.push(price)
+        self.slow.push(price)
+        self.vol.push(ret)
+        self.last_price = price
+        self.last_date = date
+
+        # NaN during warm-up, as in the batch signals
+        fast, slow, vol = self.fast.mean(), self.slow.mean(), self.vol.std()
+        with np.errstate(invalid='ignore'):
+            trend = np.where(np.isnan(fast) | np.isnan(slow), np.nan, np.where(fast > slow, 1.0, -1.0))
+            momentum = np.where(np.isnan(mom), np.nan, np.where(mom > 0, 1.0, -1.0))
+            volatility = np.where(np.isnan(vol), np.nan,
+                                  np.where(vol < self.params['vol_threshold'], 1.0, -1.0))
+        return pd.DataFrame(
+            {'trend': trend, 'momentum': momentum, 'volatility': volatility},
+            index=self.tickers,
+        )
+
+    def run(self, prices_wide):
+        """
+        Feed a (dates x tickers) price history bar by bar.
+
+        Returns:
+            Dict of {signal name: DataFrame (dates x tickers)}
+        """
+        prices = prices_wide.reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        history = {name: np.empty(prices.shape) for name in SIGNAL_NAMES}
+        for i, date in enumerate(prices_wide.index):
+            signals = self.update(date, prices[i])
+            for name in SIGNAL_NAMES:
+                history[name][i] = signals[name].to_numpy()
+        return {
+            name: pd.DataFrame(values, index=prices_wide.index, columns=self.tickers)
+            for name, values in history.items()
+        }
+
+    def save_checkpoint(self, path):
+        """Write the full rolling state to a .npz file (atomically)."""
+        arrays = {'last_price': self.last_price}
+        for name in ('fast', 'slow', 'lagged', 'vol'):
+            for key, value in getattr(self, name).state().items():
+                arrays[f'{name}.{key}'] = value
+        meta = {
+            'version': CHECKPOINT_VERSION,
+            'tickers': self.tickers,
+            'params': self.params,
+            'last_date': None if self.last_date is None else self.last_date.isoformat(),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path):
+        """Rebuild an engine from a checkpoint written by save_checkpoint."""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported signal checkpoint version: {meta.get('version')}")
+            engine = cls(meta['tickers'], **meta['params'])
+            for name in ('fast', 'slow', 'lagged', 'vol'):
+                prefix = f'{name}.'
+                getattr(engine, name).load_state(
+                    {key[len(prefix):]: data[key] for key in data.files if key.startswith(prefix)}
+                )
+            engine.last_price = np.array(data['last_price'], dtype=np.float64)
+        if meta['last_date'] is not None:
+            engine.last_date = pd.Timestamp(meta['last_date'])
+        return engine
@@ -15,9 +15,13 @@ run_mom_trend_demo.py
     - strategy_engine/results/mom_trend_equity.parquet
         列: [date, eq_mom_trend, eq_spy_bh]
     - 控制台打印基本绩效指标
+    - data_pipeline/reports/mom_trend-*.json：各阶段耗时 / 峰值 RSS 的运行报告
+      （--profile cprofile|sampling 时附带 profiler 结果）
 """
 
+import argparse
 import os
+import sys
 import numpy as np
 import pandas as pd
 
@@ -26,6 +30,12 @@ import pandas as pd
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.abspath(os.path.join(THIS_DIR, ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from strategy_engine.core import (  # noqa: E402
+    analytics, datalake, factors, feature_store, instrumentation, loader, panel_cache, result_cache,
+)
 
 DATA_PIPELINE_DIR = os.path.join(ROOT_DIR, "data_pipeline")
 PROCESSED_DIR = os.path.join(DATA_PIPELINE_DIR, "processed")
@@ -38,22 +48,35 @@ os.makedirs(RESULTS_DIR, exist_ok=True)
 
 # =============== 工具函数 ===============
 
-def load_prices_wide():
+def load_prices_wide(tickers=None):
+    """优先从分区数据集只读需要的 ticker 列；未构建 lake 时退回 prices_wide.parquet"""
+    if datalake.dataset_exists(datalake.PRICES_DATASET):
+        return datalake.read_prices_wide(tickers=tickers)
+
     path = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到 prices_wide.parquet: {path}")
-    df = pd.read_parquet(path)
+    df = pd.read_parquet(path, columns=tickers)
     if not isinstance(df.index, pd.DatetimeIndex):
         df.index = pd.to_datetime(df.index)
     df = df.sort_index()
     return df
 
 
-def load_features_long():
+def load_features_long(columns=None, tickers=None):
+    """
+    只读取需要的因子列和 ticker。
+    优先读分区数据集（列 + 谓词下推）；未构建 lake 时退回 basic_tech_factors.parquet
+    """
+    if datalake.dataset_exists(datalake.FEATURES_DATASET):
+        return datalake.read_features_long(columns=columns, tickers=tickers)
+
     path = os.path.join(FEATURES_DIR, "basic_tech_factors.parquet")
     if not os.path.exists(path):
         raise FileNotFoundError(f"未找到 basic_tech_factors.parquet: {path}")
-    df = pd.read_parquet(path)
+    read_columns = None if columns is None else ["date", "ticker"] + list(columns)
+    filters = None if tickers is None else [("ticker", "in", list(tickers))]
+    df = datalake.read_features_file(path, columns=read_columns, filters=filters)
     df["date"] = pd.to_datetime(df["date"])
     return df
 
@@ -78,65 +101,84 @@ def compute_returns_from_prices(prices_wide: pd.DataFrame) -> pd.DataFrame:
 
 def performance_stats(ret_series: pd.Series, rf_series: pd.Series = None) -> dict:
     """
-    给定日度收益序列，计算年化收益、年化波动、Sharpe、最大回撤。
+    给定日度收益序列，计算年化收益、年化波动、Sharpe、最大回撤（及回撤持续天数、Sortino、Calmar）。
     ret_series / rf_series index 都是 date。
+    单序列版本，批量打分见 core.analytics.batch_performance_stats。
     """
-    ret = ret_series.copy().dropna()
-    n = len(ret)
-    if n == 0:
+    if ret_series.count() == 0:
         return {}
+    stats = analytics.batch_performance_stats(ret_series, rf_series).iloc[0]
+    return {k: (int(v) if k in analytics.COUNT_METRICS else float(v)) for k, v in stats.items()}
 
-    # 总收益 & 年化收益
-    total_return = (1 + ret).prod() - 1
-    ann_return = (1 + total_return) ** (252.0 / n) - 1
 
-    # 无风险 & 超额收益
-    if rf_series is not None:
-        rf_align = rf_series.reindex(ret.index).fillna(0.0)
-        excess = ret - rf_align
-    else:
-        excess = ret.copy()
+# =============== 策略逻辑 ===============
 
-    ann_vol = excess.std() * np.sqrt(252)
-    ann_excess_ret = excess.mean() * 252
+RISKY_TICKERS = ["SPY", "XLK", "GLD", "TLT"]
 
-    sharpe = ann_excess_ret / ann_vol if ann_vol > 0 else np.nan
 
-    # 最大回撤
-    equity = (1 + ret).cumprod()
-    cummax = equity.cummax()
-    dd = equity / cummax - 1
-    max_dd = dd.min()
+def open_panel_cache(risky_tickers, factor_names=()):
+    """
+    打开 .npy 面板缓存（np.memmap，毫秒级）。
+    缓存不存在、源文件已更新、或缺少所需 ticker / 因子时返回 None，由调用方走 parquet 路径。
+    """
+    if not panel_cache.cache_exists():
+        return None
+    cache = panel_cache.PanelCache()
+    if not cache.is_fresh():
+        print("[INFO] 面板缓存已过期，改读 parquet")
+        return None
+    if not set(risky_tickers) <= set(cache.tickers) or not set(factor_names) <= set(cache.factor_names):
+        return None
+    return cache
 
-    return {
-        "n_days": n,
-        "total_return": total_return,
-        "ann_return": ann_return,
-        "ann_vol_excess": ann_vol,
-        "ann_excess_ret": ann_excess_ret,
-        "sharpe": sharpe,
-        "max_drawdown": max_dd,
-    }
 
+def panel_common_start(cache, risky_tickers):
+    """所有风险资产都有价格的最晚首日在缓存中的行号"""
+    prices = cache.array("prices")[:, cache.columns(risky_tickers)]
+    return int(np.isfinite(prices).argmax(axis=0).max())
 
-# =============== 策略逻辑 ===============
 
-def run_mom_trend_strategy():
-    print("========== Run Mom + Trend Demo Strategy ==========")
+def prepare_mom_trend_inputs_from_cache(cache, risky_tickers):
+    """prepare_mom_trend_inputs 的面板缓存版本，结果与 parquet 路径一致"""
+    start = panel_common_start(cache, risky_tickers)
+    prices_full = cache.frame("prices", risky_tickers)
 
-    # ------- 1. 加载数据 -------
-    prices_wide = load_prices_wide()
-    features_long = load_features_long()
-    rf_daily = load_rf_daily()
+    # 与在截断后的价格上 pct_change 一致：首行收益为 0
+    returns = np.array(cache.array("returns")[start:, cache.columns(risky_tickers)])
+    returns[0] = 0.0
+    returns[np.isnan(returns)] = 0.0
+    returns_wide = pd.DataFrame(returns, index=cache.dates[start:], columns=list(risky_tickers))
+
+    rf_daily = cache.series("rf", start).ffill().fillna(0.0).rename("rf_daily")
+    return prices_full, returns_wide, rf_daily
+
+
+def prepare_mom_trend_inputs(risky_tickers=None):
+    """
+    加载并对齐策略共用的行情数据（参数扫描等场景可复用，只加载一次）。
+    有最新的 .npy 面板缓存时直接从缓存映射，否则读 parquet。
+
+    返回: (prices_full, returns_wide, rf_daily)
+        prices_full  : 风险资产完整历史价格（计算因子用，避免在共同起点处重新 warm-up）
+        returns_wide : 共同起点之后的日收益，NaN 填 0
+        rf_daily     : 对齐到 returns_wide.index 的日度无风险收益
+    """
+    if risky_tickers is None:
+        risky_tickers = RISKY_TICKERS
 
-    risky_tickers = ["SPY", "XLK", "GLD", "TLT"]
+    cache = open_panel_cache(risky_tickers)
+    if cache is not None:
+        return prepare_mom_trend_inputs_from_cache(cache, risky_tickers)
+
+    prices_wide = load_prices_wide(risky_tickers)
+    rf_daily = load_rf_daily()
 
     # 只保留风险资产的价格
-    prices_wide = prices_wide[risky_tickers]
+    prices_full = prices_wide[risky_tickers]
     # 确定共同起点：所有风险资产都有价格的最晚首日
-    first_valid = prices_wide.apply(lambda s: s.first_valid_index())
+    first_valid = prices_full.apply(lambda s: s.first_valid_index())
     common_start = first_valid.max()
-    prices_wide = prices_wide.loc[common_start:].copy()
+    prices_wide = prices_full.loc[common_start:].copy()
 
     # 日收益
     returns_wide = compute_returns_from_prices(prices_wide).fillna(0.0)
@@ -147,20 +189,82 @@ def run_mom_trend_strategy():
     else:
         rf_daily = pd.Series(0.0, index=returns_wide.index, name="rf_daily")
 
-    # ------- 2. 准备信号 (mom_120d, trend_200d) -------
-    feat = features_long.copy()
-    feat = feat[feat["ticker"].isin(risky_tickers)]
+    return prices_full, returns_wide, rf_daily
 
-    # 只保留我们关心的列
-    feat = feat[["date", "ticker", "mom_120d", "trend_200d"]]
 
-    # pivot 成宽表：date × ticker
-    mom120 = feat.pivot(index="date", columns="ticker", values="mom_120d")
-    trend200 = feat.pivot(index="date", columns="ticker", values="trend_200d")
+def mom_trend_sources():
+    """策略实际读取的输入文件 / 数据集目录（结果缓存按它们的 mtime + 大小做指纹）"""
+    if datalake.dataset_exists(datalake.PRICES_DATASET):
+        prices_source = datalake.dataset_path(datalake.PRICES_DATASET)
+    else:
+        prices_source = os.path.join(PROCESSED_DIR, "prices_wide.parquet")
+    return [
+        prices_source,
+        os.path.join(MACRO_DIR, "risk_free_irx.parquet"),
+        # 每次写宽因子库都会重写 meta.json
+        os.path.join(feature_store.FEATURE_STORE_DIR, "meta.json"),
+    ]
 
-    # 对齐到 returns 的日期
-    mom120 = mom120.reindex(returns_wide.index)
-    trend200 = trend200.reindex(returns_wide.index)
+
+def open_feature_store(risky_tickers, factor_names):
+    """
+    打开宽因子库（build_features.py 写出的 features/wide/）。
+    不存在、源文件已更新、或缺少所需 ticker / 因子时返回 None，由调用方走因子注册表计算。
+    """
+    if not feature_store.store_exists():
+        return None
+    try:
+        store = feature_store.FeatureStore()
+    except ValueError as e:
+        print(f"[INFO] 宽因子库不可用（{e}），改用因子注册表计算")
+        return None
+    if not store.is_fresh():
+        print("[INFO] 宽因子库已过期，改用因子注册表计算")
+        return None
+    if not set(risky_tickers) <= set(store.tickers) or not set(factor_names) <= set(store.factor_names):
+        return None
+    return store
+
+
+def load_strategy_factors(factor_names, prices_full, returns_wide):
+    """
+    读取对齐到 returns_wide.index 的宽因子: {因子名: DataFrame(date × ticker)}。
+    优先从宽因子库按列映射读取：各因子共用同一日历，按日期区间切片即已对齐，无需 pivot / reindex；
+    否则由因子注册表在完整历史上计算（结果按输入数据哈希缓存在磁盘上），再对齐到 returns 的日期。
+    """
+    risky_tickers = list(returns_wide.columns)
+    store = open_feature_store(risky_tickers, factor_names)
+    if store is not None:
+        frames = store.frames(factor_names, risky_tickers, start=returns_wide.index[0], end=returns_wide.index[-1])
+        if frames[factor_names[0]].index.equals(returns_wide.index):
+            return frames
+        print("[INFO] 宽因子库日历与价格不一致，改用因子注册表计算")
+
+    engine = factors.FactorEngine(prices_full)
+    factor_wide = engine.compute(factor_names)
+    return {name: factor_wide[name].reindex(returns_wide.index) for name in factor_names}
+
+
+def compute_mom_trend_strategy(risky_tickers=None):
+    """
+    计算 Mom + Trend 策略与 SPY 买入持有的 equity curve 和绩效指标（不打印、不写文件）。
+    返回: (equity_df, stats_mom, stats_spy)
+    """
+    # ------- 1. 加载数据 -------
+    if risky_tickers is None:
+        risky_tickers = RISKY_TICKERS
+    with instrumentation.stage("load_inputs") as load:
+        prices_full, returns_wide, rf_daily = prepare_mom_trend_inputs(risky_tickers)
+        load.count(rows=len(returns_wide), bytes=instrumentation.nbytes(prices_full))
+
+    # ------- 2. 准备信号 (mom_120d, trend_200d) -------
+    # 宽因子库按列读取（已对齐 returns 的日期）；没有可用的因子库时由因子注册表
+    # 在完整历史上计算这两个因子及其依赖（ma_200d），避免在共同起点处重新 warm-up
+    with instrumentation.stage("factors") as load:
+        factor_wide = load_strategy_factors(["mom_120d", "trend_200d"], prices_full, returns_wide)
+        load.count(bytes=sum(instrumentation.nbytes(wide) for wide in factor_wide.values()))
+    mom120 = factor_wide["mom_120d"]
+    trend200 = factor_wide["trend_200d"]
 
     # 信号条件：mom_120d > 0 且 trend_200d > 0
     signals = (mom120 > 0) & (trend200 > 0)
@@ -198,8 +302,50 @@ def run_mom_trend_strategy():
     equity_df.index.name = "date"
 
     # ------- 7. 绩效指标 -------
-    stats_mom = performance_stats(port_ret, rf_daily)
-    stats_spy = performance_stats(spy_ret, rf_daily)
+    with instrumentation.stage("stats"):
+        stats_mom = performance_stats(port_ret, rf_daily)
+        stats_spy = performance_stats(spy_ret, rf_daily)
+
+    return equity_df, stats_mom, stats_spy
+
+
+def run_mom_trend_strategy(use_cache=True, cache=None, profile=None):
+    """
+    运行策略、打印绩效并保存 equity curve。
+    输入数据、策略代码和参数都没变时直接从结果缓存（data_pipeline/cache/results/）读取，
+    不重新计算，也不重写已存在的结果文件。
+    各阶段耗时写入 data_pipeline/reports/mom_trend-*.json；profile 见 core/instrumentation.py。
+    """
+    print("========== Run Mom + Trend Demo Strategy ==========")
+
+    with instrumentation.run("mom_trend", profile=profile) as report:
+        result = _run_mom_trend_strategy(use_cache, cache)
+
+    print("\n[INFO] 各阶段耗时:")
+    print(report.summary())
+    print(f"[OK] 运行报告 → {report.path}")
+    return result
+
+
+def _run_mom_trend_strategy(use_cache, cache):
+    output_path = os.path.join(RESULTS_DIR, "mom_trend_equity.parquet")
+    if use_cache:
+        cache = cache if cache is not None else result_cache.ResultCache()
+        key = result_cache.fingerprint(
+            params={"risky_tickers": RISKY_TICKERS},
+            sources=mom_trend_sources(),
+            code=(compute_mom_trend_strategy, analytics, loader, datalake, panel_cache, feature_store, factors,
+                  factors.kernels),
+        )
+        with instrumentation.stage("compute"):
+            (equity_df, stats_mom, stats_spy), hit = cache.get_or_compute(key, compute_mom_trend_strategy)
+        instrumentation.current_run().count(cache_hits=hit, cache_misses=not hit)
+        if hit:
+            print(f"[INFO] 命中结果缓存 ({key})")
+    else:
+        with instrumentation.stage("compute"):
+            equity_df, stats_mom, stats_spy = compute_mom_trend_strategy()
+        hit = False
 
     print("\n=== Mom+Trend 策略绩效 ===")
     for k, v in stats_mom.items():
@@ -210,12 +356,20 @@ def run_mom_trend_strategy():
         print(f"{k}: {v:.4f}" if isinstance(v, (float, int)) else f"{k}: {v}")
 
     # ------- 8. 保存结果 -------
-    output_path = os.path.join(RESULTS_DIR, "mom_trend_equity.parquet")
-    equity_df.to_parquet(output_path)
-    print(f"\n[OK] Equity curve 已保存 → {output_path}")
+    with instrumentation.stage("save_results") as save:
+        if hit and os.path.exists(output_path) and pd.read_parquet(output_path).equals(equity_df):
+            print(f"\n[OK] Equity curve 未变化，沿用 → {output_path}")
+        else:
+            equity_df.to_parquet(output_path)
+            save.count(rows=len(equity_df), bytes=instrumentation.nbytes(output_path))
+            print(f"\n[OK] Equity curve 已保存 → {output_path}")
 
     return equity_df, stats_mom, stats_spy
 
 
 if __name__ == "__main__":
-    run_mom_trend_strategy()
+    parser = argparse.ArgumentParser(description="运行 Mom + Trend demo 策略")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="同时运行 profiler（结果与运行报告一起写入 data_pipeline/reports/）")
+    args = parser.parse_args()
+    run_mom_trend_strategy(profile=args.profile)
@@ -0,0 +1,205 @@
+"""
+parallel_sweep.py
+------------------------------------
+多进程参数扫描：把价格面板和收益矩阵通过 multiprocessing.shared_memory
+发布一次，worker 进程直接 attach（零拷贝），不再每个任务 pickle 一份面板。
+
+两种回测路径：
+    - engine="demo"     : sweep_mom_trend 的批量数组计算（无交易成本，现金收益 rf_daily）
+    - engine="backtest" : 每个参数组合的信号交给 BacktestEngine（向量化模式，含 commission，现金收益为 0，
+                          当日收盘按信号调仓、次日起生效，因此结果与 demo 路径不同）
+
+参数网格按 chunk_size 切块提交到进程池，结果按完成顺序流式返回，
+并打印吞吐量（configs/sec），方便评估机器规模。
+
+用法:
+    from parallel_sweep import run_parallel_sweep
+    stats = run_parallel_sweep({"mom_window": range(20, 260, 5)}, n_workers=8)
+
+    # 或者边算边处理
+    for chunk in iter_parallel_sweep(grid, n_workers=8):
+        ...
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# ------------ 路径设置 ------------
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core.backtest import BacktestEngine  # noqa: E402
+from demo_run_mom_trend import prepare_mom_trend_inputs  # noqa: E402
+from sweep_mom_trend import (  # noqa: E402
+    evaluate_mom_trend_grid,
+    expand_param_grid,
+    iter_signal_chunks,
+    summarize_grid,
+)
+
+
+# =============== 共享内存 ===============
+
+def publish_arrays(arrays: dict):
+    """
+    把 {name: ndarray} 拷贝进共享内存（只拷贝这一次）。
+    返回 (segments, descriptors)：
+        segments    : SharedMemory 对象列表，调用方负责 close + unlink
+        descriptors : {name: (shm_name, shape, dtype_str)}，可廉价 pickle 给 worker
+    """
+    segments = []
+    descriptors = {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[...] = arr
+        segments.append(shm)
+        descriptors[name] = (shm.name, arr.shape, arr.dtype.str)
+    return segments, descriptors
+
+
+def attach_arrays(descriptors: dict):
+    """按 descriptors attach 共享内存，返回 (segments, {name: 只读 ndarray 视图})。"""
+    segments = []
+    arrays = {}
+    for name, (shm_name, shape, dtype) in descriptors.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        segments.append(shm)
+        arrays[name] = arr
+    return segments, arrays
+
+
+def release_arrays(segments):
+    """释放发布方创建的共享内存。"""
+    for shm in segments:
+        shm.close()
+        shm.unlink()
+
+
+# =============== worker ===============
+
+# 每个 worker 进程 attach 一次，供所有任务复用
+_WORKER = {}
+
+
+def _init_worker(descriptors, tickers):
+    segments, arrays = attach_arrays(descriptors)
+    _WORKER["segments"] = segments
+    _WORKER["arrays"] = arrays
+    _WORKER["tickers"] = tickers
+
+
+def _run_chunk(chunk_id, combos, engine, commission):
+    """在 worker 中回测一块参数组合，返回 (chunk_id, stats DataFrame)。"""
+    arrays = _WORKER["arrays"]
+    prices_full = arrays["prices_full"]
+    returns = arrays["returns"]
+    dates = pd.DatetimeIndex(arrays["dates"].view("datetime64[ns]"))
+    rf_daily = pd.Series(arrays["rf"], index=dates, name="rf_daily")
+
+    if engine == "demo":
+        port_ret = evaluate_mom_trend_grid(combos, prices_full, returns, arrays["rf"])
+    elif engine == "backtest":
+        port_ret = _backtest_engine_returns(combos, prices_full, dates, commission)
+    else:
+        raise ValueError(f"未知 engine: {engine}，可选: 'demo', 'backtest'")
+
+    return chunk_id, summarize_grid(combos, port_ret, rf_daily)
+
+
+def _backtest_engine_returns(combos, prices_full, dates, commission):
+    """逐个参数组合把信号交给 BacktestEngine，返回 (param × date) 的日收益。"""
+    n_dates = len(dates)
+    prices = pd.DataFrame(prices_full[-n_dates:], index=dates, columns=_WORKER["tickers"])
+
+    port_ret = np.empty((len(combos), n_dates))
+    for sl, signals in iter_signal_chunks(combos, prices_full, n_dates):
+        for i, sig in zip(range(sl.start, sl.start + len(signals)), signals):
+            signal_df = pd.DataFrame(sig.astype(np.float64), index=dates, columns=prices.columns)
+            engine = BacktestEngine(prices, signal_df, initial_capital=1.0, commission=commission)
+            values = np.asarray(engine.run())
+            port_ret[i, 0] = 0.0
+            port_ret[i, 1:] = values[1:] / values[:-1] - 1.0
+    return port_ret
+
+
+# =============== 调度 ===============
+
+def iter_parallel_sweep(param_grid: dict,
+                        n_workers: int = None,
+                        chunk_size: int = 64,
+                        engine: str = "demo",
+                        commission: float = 0.001,
+                        risky_tickers=None,
+                        verbose: bool = True):
+    """
+    多进程扫描参数网格，按完成顺序逐块产出 stats DataFrame（index 为 combos 的行号）。
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    combos = expand_param_grid(param_grid)
+    prices_full, returns_wide, rf_daily = prepare_mom_trend_inputs(risky_tickers)
+
+    segments, descriptors = publish_arrays({
+        "prices_full": prices_full.to_numpy(dtype=np.float64),
+        "returns": returns_wide.to_numpy(dtype=np.float64),
+        "rf": rf_daily.to_numpy(dtype=np.float64),
+        "dates": returns_wide.index.to_numpy(dtype="datetime64[ns]").view(np.int64),
+    })
+
+    n_total = len(combos)
+    n_done = 0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(descriptors, list(prices_full.columns)),
+        ) as pool:
+            futures = [
+                pool.submit(_run_chunk, chunk_id, combos.iloc[start:start + chunk_size],
+                            engine, commission)
+                for chunk_id, start in enumerate(range(0, n_total, chunk_size))
+            ]
+            for future in as_completed(futures):
+                _, stats = future.result()
+                n_done += len(stats)
+                if verbose:
+                    elapsed = time.perf_counter() - t0
+                    print(f"[INFO] {n_done}/{n_total} configs, "
+                          f"{n_done / elapsed:.1f} configs/sec")
+                yield stats
+    finally:
+        release_arrays(segments)
+
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        print(f"[OK] {n_total} configs / {elapsed:.2f}s = {n_total / elapsed:.1f} configs/sec "
+              f"({n_workers} workers, engine={engine})")
+
+
+def run_parallel_sweep(param_grid: dict, **kwargs) -> pd.DataFrame:
+    """收集 iter_parallel_sweep 的全部结果，按参数组合原顺序返回 tidy 表。"""
+    chunks = list(iter_parallel_sweep(param_grid, **kwargs))
+    return pd.concat(chunks).sort_index()
+
+
+if __name__ == "__main__":
+    result = run_parallel_sweep({
+        "mom_window": list(range(20, 260, 10)),
+        "trend_window": [50, 100, 150, 200, 250],
+        "mom_threshold": [0.0, 0.01, 0.02, 0.05],
+    })
+    print(result.sort_values("sharpe", ascending=False).head(10).to_string(index=False))
@@ -0,0 +1,214 @@
+"""
+sweep_mom_trend.py
+------------------------------------
+Mom + Trend 策略的批量参数扫描。
+
+与 demo_run_mom_trend.py 的单次回测规则完全一致：
+    - mom_{mom_window}d   > mom_threshold
+    - trend_{trend_window}d > trend_threshold
+    - 满足条件的资产等权，剩余权重为现金，收益为 rf_daily
+
+区别在于：价格 / 收益 / rf 只加载一次，所有参数组合在
+(param × date × asset) 的三维数组上一次性计算，而不是循环调用 demo。
+
+用法:
+    from sweep_mom_trend import run_mom_trend_sweep
+    stats = run_mom_trend_sweep({
+        "mom_window": [60, 120, 250],
+        "trend_window": [100, 200],
+        "mom_threshold": [0.0, 0.02],
+    })
+
+输出:
+    tidy DataFrame，每行一个参数组合：
+        [mom_window, trend_window, mom_threshold, trend_threshold,
+         n_days, total_return, ann_return, ann_vol_excess, ann_excess_ret, sharpe, max_drawdown,
+         max_drawdown_duration, sortino, calmar]
+"""
+
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ------------ 路径设置 ------------
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from strategy_engine.core.analytics import batch_performance_stats  # noqa: E402
+from demo_run_mom_trend import prepare_mom_trend_inputs  # noqa: E402
+
+
+# 未在参数网格中出现的参数取 demo 的默认值
+PARAM_DEFAULTS = {
+    "mom_window": 120,
+    "trend_window": 200,
+    "mom_threshold": 0.0,
+    "trend_threshold": 0.0,
+}
+
+
+# =============== 参数网格 ===============
+
+def expand_param_grid(param_grid: dict) -> pd.DataFrame:
+    """
+    把 {参数名: 取值列表} 展开成所有组合的笛卡尔积。
+    返回 DataFrame，每行一个组合，列为 PARAM_DEFAULTS 中的全部参数。
+    """
+    unknown = set(param_grid) - set(PARAM_DEFAULTS)
+    if unknown:
+        raise ValueError(f"未知参数: {sorted(unknown)}，可选: {list(PARAM_DEFAULTS)}")
+
+    grid = {k: list(np.atleast_1d(param_grid.get(k, v))) for k, v in PARAM_DEFAULTS.items()}
+    combos = pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid.keys()))
+    combos["mom_window"] = combos["mom_window"].astype(int)
+    combos["trend_window"] = combos["trend_window"].astype(int)
+    return combos
+
+
+# =============== 因子数组 ===============
+
+def momentum_stack(prices: np.ndarray, windows) -> np.ndarray:
+    """
+    多个回看窗口的动量 P/P.shift(w) - 1。
+    prices: (date × asset)；返回 (window × date × asset)，warm-up 期为 NaN。
+    """
+    out = np.full((len(windows),) + prices.shape, np.nan)
+    for i, w in enumerate(windows):
+        out[i, w:] = prices[w:] / prices[:-w] - 1.0
+    return out
+
+
+def rolling_mean(prices: np.ndarray, window: int) -> np.ndarray:
+    """
+    按列滚动均值（前缀和实现），窗口内任一值为 NaN 时结果为 NaN，
+    与 pandas rolling(window).mean() 的默认行为一致。
+    """
+    valid = np.isfinite(prices)
+    csum = np.zeros((prices.shape[0] + 1, prices.shape[1]))
+    np.cumsum(np.where(valid, prices, 0.0), axis=0, out=csum[1:])
+    ccount = np.zeros(csum.shape, dtype=np.int64)
+    np.cumsum(valid, axis=0, out=ccount[1:])
+
+    out = np.full(prices.shape, np.nan)
+    window_sum = csum[window:] - csum[:-window]
+    window_count = ccount[window:] - ccount[:-window]
+    out[window - 1:] = np.where(window_count == window, window_sum / window, np.nan)
+    return out
+
+
+def trend_stack(prices: np.ndarray, windows) -> np.ndarray:
+    """多个均线窗口的趋势偏离度 P/MA - 1，返回 (window × date × asset)。"""
+    out = np.empty((len(windows),) + prices.shape)
+    for i, w in enumerate(windows):
+        out[i] = prices / rolling_mean(prices, w) - 1.0
+    return out
+
+
+# =============== 批量回测 ===============
+
+def evaluate_mom_trend_grid(combos: pd.DataFrame,
+                            prices_full: np.ndarray,
+                            returns: np.ndarray,
+                            rf: np.ndarray,
+                            chunk_size: int = 256) -> np.ndarray:
+    """
+    对所有参数组合批量计算组合日收益。
+
+    参数:
+        combos      : expand_param_grid 的输出
+        prices_full : 完整历史价格 (date_full × asset)，用于计算因子
+        returns     : 回测区间日收益 (date × asset)，对应 prices_full 的最后 date 行
+        rf          : 回测区间 rf_daily (date,)
+        chunk_size  : 每批同时展开的参数组合数，控制三维数组的内存
+
+    返回:
+        (param × date) 的组合日收益矩阵，行顺序与 combos 一致
+    """
+    n_dates = returns.shape[0]
+    port_ret = np.empty((len(combos), n_dates))
+    for sl, signals in iter_signal_chunks(combos, prices_full, n_dates, chunk_size):
+        # 信号为 True 的资产等权；没有任何信号时全部为现金
+        n_active = signals.sum(axis=2)
+        risky_sum = np.einsum("pda,da->pd", signals.astype(np.float64), returns)
+        port_ret[sl] = np.where(
+            n_active > 0,
+            risky_sum / np.maximum(n_active, 1),
+            rf[None, :],
+        )
+
+    return port_ret
+
+
+def iter_signal_chunks(combos: pd.DataFrame,
+                       prices_full: np.ndarray,
+                       n_dates: int,
+                       chunk_size: int = 256):
+    """
+    按 chunk_size 分批生成 (param × date × asset) 的布尔信号数组。
+    每个唯一窗口的因子只计算一次，并截取到最后 n_dates 行（回测区间）。
+
+    产出: (slice, signals)，slice 为该批在 combos 中的行位置
+    """
+    offset = prices_full.shape[0] - n_dates
+
+    mom_windows = np.unique(combos["mom_window"].to_numpy())
+    trend_windows = np.unique(combos["trend_window"].to_numpy())
+
+    mom = momentum_stack(prices_full, mom_windows)[:, offset:]
+    trend = trend_stack(prices_full, trend_windows)[:, offset:]
+
+    mom_idx = np.searchsorted(mom_windows, combos["mom_window"].to_numpy())
+    trend_idx = np.searchsorted(trend_windows, combos["trend_window"].to_numpy())
+    mom_thr = combos["mom_threshold"].to_numpy(dtype=np.float64)
+    trend_thr = combos["trend_threshold"].to_numpy(dtype=np.float64)
+
+    for start in range(0, len(combos), chunk_size):
+        sl = slice(start, start + chunk_size)
+        # NaN 比较结果为 False
+        signals = (
+            (mom[mom_idx[sl]] > mom_thr[sl, None, None])
+            & (trend[trend_idx[sl]] > trend_thr[sl, None, None])
+        )
+        yield sl, signals
+
+
+def run_mom_trend_sweep(param_grid: dict, risky_tickers=None, chunk_size: int = 256) -> pd.DataFrame:
+    """
+    对参数网格做批量回测，返回每个组合的 performance_stats 汇总表。
+    """
+    combos = expand_param_grid(param_grid)
+    prices_full, returns_wide, rf_daily = prepare_mom_trend_inputs(risky_tickers)
+
+    port_ret = evaluate_mom_trend_grid(
+        combos,
+        prices_full.to_numpy(dtype=np.float64),
+        returns_wide.to_numpy(dtype=np.float64),
+        rf_daily.to_numpy(dtype=np.float64),
+        chunk_size=chunk_size,
+    )
+
+    return summarize_grid(combos, port_ret, rf_daily)
+
+
+def summarize_grid(combos: pd.DataFrame, port_ret: np.ndarray, rf_daily: pd.Series) -> pd.DataFrame:
+    """
+    对 (param × date) 的组合收益一次性批量计算绩效指标（与 performance_stats 口径一致），
+    与参数列拼成 tidy 表。rf_daily.index 即回测日期。
+    """
+    stats = batch_performance_stats(port_ret.T, rf_daily.to_numpy(dtype=np.float64))
+    stats.index = combos.index
+    return pd.concat([combos, stats], axis=1)
+
+
+if __name__ == "__main__":
+    result = run_mom_trend_sweep({
+        "mom_window": [20, 60, 120, 250],
+        "trend_window": [50, 100, 200],
+        "mom_threshold": [0.0, 0.02],
+    })
+    print(result.sort_values("sharpe", ascending=False).to_string(index=False))
@@ -0,0 +1,41 @@
+"""
+pytest 配置：把仓库根目录（core 模块统一以 strategy_engine.core 导入）以及
+data_pipeline/scripts、strategy_engine（脚本模块）加入 sys.path，
+并提供各测试共用的合成价格面板 fixture。
+
+运行:
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(TESTS_DIR, ".."))
+for path in (TESTS_DIR, os.path.join(ROOT_DIR, "data_pipeline", "scripts"),
+             os.path.join(ROOT_DIR, "strategy_engine"), ROOT_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def make_prices():
+    """
+    合成价格面板工厂（几何随机游走，index 名为 date 的工作日日历）。
+
+    参数: n_dates, n_tickers, seed, start, tickers（覆盖默认的 T0..Tn 列名），
+    late_start（最后一只资产前 late_start 行为 NaN，模拟晚上市 / 预热期）
+    """
+    def make(n_dates=400, n_tickers=5, seed=0, start="2019-01-02", tickers=None, late_start=0):
+        tickers = list(tickers) if tickers is not None else [f"T{j}" for j in range(n_tickers)]
+        rng = np.random.default_rng(seed)
+        dates = pd.bdate_range(start, periods=n_dates, name="date")
+        values = 100.0 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, (n_dates, len(tickers))), axis=0))
+        values[:late_start, -1] = np.nan
+        return pd.DataFrame(values, index=dates, columns=tickers)
+
+    return make
@@ -0,0 +1,86 @@
+"""
+离线测试用的 yfinance 替身。
+
+FakeYF 持有每个 ticker 的完整历史，download(...) 按 start / end 截取并返回与
+yf.download(group_by="column") 相同结构的 DataFrame（index 为 Date，列为
+Open / High / Low / Close / Adj Close / Volume），并记录每次请求的参数。
+FlakySource 在任意数据源外注入延迟和失败，用于测试并发下载的重试与 manifest。
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def make_history(start="2020-01-01", periods=60, seed=0):
+    """几何随机游走的日线历史（工作日）"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=periods, name="Date")
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, periods)))
+    return pd.DataFrame({
+        "Open": close,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Adj Close": close,
+        "Volume": rng.integers(1_000, 10_000, periods).astype(float),
+    }, index=dates)
+
+
+class FakeYF:
+    """内存中的数据源：histories 为 {ticker: DataFrame}，可在测试中修改以模拟新数据或复权修订"""
+
+    def __init__(self, histories):
+        self.histories = dict(histories)
+        self.calls = []
+
+    def download(self, ticker, start=None, end=None, **kwargs):
+        self.calls.append({"ticker": ticker, "start": start, "end": end})
+        df = self.histories.get(ticker)
+        if df is None:
+            return pd.DataFrame(columns=COLUMNS)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+        return df.copy()
+
+    def starts(self, ticker):
+        """某个 ticker 各次请求的 start 参数"""
+        return [c["start"] for c in self.calls if c["ticker"] == ticker]
+
+
+class HTTPError(Exception):
+    """带 response.status_code 的 HTTP 异常（结构同 requests.HTTPError）"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+class FlakySource:
+    """
+    给数据源加上延迟和按脚本注入的失败。
+    failures: {ticker: [异常, ...]}，该 ticker 的前几次请求依次抛出这些异常，之后正常返回
+    """
+
+    def __init__(self, source, latency=0.0, failures=None):
+        self.source = source
+        self.latency = latency
+        self.failures = {t: list(errors) for t, errors in (failures or {}).items()}
+        self.lock = threading.Lock()
+        self.attempts = {}
+
+    def download(self, ticker, **kwargs):
+        with self.lock:
+            self.attempts[ticker] = self.attempts.get(ticker, 0) + 1
+            pending = self.failures.get(ticker)
+            error = pending.pop(0) if pending else None
+        time.sleep(self.latency)
+        if error is not None:
+            raise error
+        return self.source.download(ticker, **kwargs)
@@ -0,0 +1,145 @@
+"""analytics：批量 / 滚动 / 累计指标与逐列 pandas 参考一致（参差起点、缺失值、预热期 NaN、短窗口）"""
+
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core import analytics, kernels
+
+
+def pandas_stats(ret, rf):
+    """单序列 pandas 参考实现（原 demo performance_stats，加上 Sortino / Calmar / 回撤持续天数）"""
+    ret = ret.dropna()
+    n = len(ret)
+    if n == 0:
+        return None
+    excess = ret - rf.reindex(ret.index).fillna(0.0)
+    total_return = (1 + ret).prod() - 1
+    ann_return = (1 + total_return) ** (252.0 / n) - 1
+    ann_vol = excess.std() * np.sqrt(252)
+    ann_excess_ret = excess.mean() * 252
+    downside_dev = np.sqrt((excess.clip(upper=0.0) ** 2).mean()) * np.sqrt(252)
+    equity = (1 + ret).cumprod()
+    ratio = equity / equity.cummax()
+    max_dd = (ratio - 1).min()
+    under = ratio < 1
+    duration = int(under.groupby((~under).cumsum()).sum().max())
+    return {
+        "n_days": n,
+        "total_return": total_return,
+        "ann_return": ann_return,
+        "ann_vol_excess": ann_vol,
+        "ann_excess_ret": ann_excess_ret,
+        "sharpe": ann_excess_ret / ann_vol if ann_vol > 0 else np.nan,
+        "max_drawdown": max_dd,
+        "max_drawdown_duration": duration,
+        "sortino": ann_excess_ret / downside_dev if downside_dev > 0 else np.nan,
+        "calmar": ann_return / abs(max_dd) if max_dd < 0 else np.nan,
+    }
+
+
+@pytest.fixture
+def returns(make_prices):
+    """日收益：参差起点、中间缺失、一列全缺失"""
+    rets = make_prices(n_dates=120, n_tickers=5, late_start=30).pct_change()
+    rets.iloc[60:63, 0] = np.nan
+    rets["EMPTY"] = np.nan
+    rf = pd.Series(np.random.default_rng(1).normal(1e-4, 1e-5, len(rets)), index=rets.index)
+    return rets, rf
+
+
+def assert_matches(result, expected):
+    for name, value in expected.items():
+        assert result[name] == pytest.approx(value, rel=1e-9, abs=1e-12, nan_ok=True), name
+
+
+@pytest.mark.parametrize("chunk_size", [2, analytics.CHUNK_SIZE])
+@pytest.mark.parametrize("row_walk", [False, True])
+def test_batch_matches_pandas(returns, monkeypatch, chunk_size, row_walk):
+    rets, rf = returns
+    if row_walk:
+        # 宽面板的逐日遍历分支
+        monkeypatch.setattr(kernels, "ROW_WALK_MIN_COLS", 1)
+
+    stats = analytics.batch_performance_stats(rets, rf, chunk_size=chunk_size)
+
+    assert list(stats.columns) == list(analytics.METRICS)
+    assert list(stats.index) == list(rets.columns)
+    for column in rets.columns[:-1]:
+        assert_matches(stats.loc[column], pandas_stats(rets[column], rf))
+    # 没有任何观测的策略：n_days 为 0，其余指标为 NaN
+    assert stats.loc["EMPTY", "n_days"] == 0
+    assert stats.loc["EMPTY"].drop(list(analytics.COUNT_METRICS)).isna().all()
+
+
+def test_batch_jit_kernel_matches_numpy(returns, monkeypatch):
+    rets, rf = returns
+    expected = analytics.batch_performance_stats(rets, rf, use_jit=False)
+    # 没有 numba 时用 Python 解释执行 JIT 内核
+    monkeypatch.setattr(kernels, "numba", types.SimpleNamespace(njit=lambda **_: (lambda f: f), prange=range))
+    monkeypatch.setattr(kernels, "HAVE_NUMBA", True)
+    monkeypatch.setattr(kernels, "_compiled", {})
+
+    result = analytics.batch_performance_stats(rets, rf, use_jit=True)
+
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-9)
+
+
+def test_rolling_matches_batch_on_each_window(returns):
+    rets, rf = returns
+    windows = [1, 20, 63, 150]
+    rolling = analytics.rolling_performance_stats(rets, windows, rf)
+
+    for w in windows:
+        out = rolling[w]
+        assert set(out) == set(analytics.ROLLING_METRICS)
+        for column in rets.columns:
+            values = rets[column].to_numpy()
+            # 隔一天抽查一次，够覆盖预热期与缺失值边界
+            for end in range(0, len(rets), 2):
+                window = rets[column].iloc[max(end - w + 1, 0):end + 1]
+                got = {name: out[name][column].iloc[end] for name in analytics.ROLLING_METRICS}
+                if end < w - 1 or np.isnan(values[end - w + 1:end + 1]).any():
+                    # 预热期、窗口内有缺失值：NaN
+                    assert all(np.isnan(v) for v in got.values()), (w, column, end)
+                    continue
+                expected = pandas_stats(window, rf)
+                assert_matches(got, {name: expected[name] for name in analytics.ROLLING_METRICS})
+
+
+def test_expanding_matches_batch_on_each_prefix(returns):
+    rets, rf = returns
+    expanding = analytics.expanding_performance_stats(rets, rf, min_periods=5)
+
+    for column in rets.columns[:-1]:
+        first = rets[column].first_valid_index()
+        for end in range(len(rets)):
+            prefix = rets[column].iloc[:end + 1]
+            n = int(prefix.count())
+            assert expanding["n_days"][column].iloc[end] == n
+            got = {name: expanding[name][column].iloc[end] for name in analytics.ROLLING_METRICS}
+            if n < 5:
+                assert all(np.isnan(v) for v in got.values()), (column, end)
+                continue
+            assert prefix.index[end] >= first
+            expected = pandas_stats(prefix, rf)
+            assert_matches(got, {name: expected[name] for name in analytics.ROLLING_METRICS})
+    assert expanding["n_days"]["EMPTY"].eq(0).all()
+    assert expanding["sharpe"]["EMPTY"].isna().all()
+
+
+def test_array_input_and_short_history():
+    r = np.array([0.01, -0.02, np.nan, 0.015])
+    stats = analytics.batch_performance_stats(r)
+    assert stats.loc[0, "n_days"] == 3
+    assert stats.loc[0, "total_return"] == pytest.approx(1.01 * 0.98 * 1.015 - 1)
+
+    # 窗口长于历史：全部 NaN；数组输入返回数组
+    rolling = analytics.rolling_performance_stats(r, [10])
+    assert all(np.isnan(v).all() for v in rolling[10].values())
+    assert isinstance(rolling[10]["sharpe"], np.ndarray)
+
+    with pytest.raises(ValueError):
+        analytics.batch_performance_stats(r, rf=np.zeros(3))
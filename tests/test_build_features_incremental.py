@@ -0,0 +1,117 @@
+"""build_features 增量模式：新日期单独成分片，历史文件不重写，结果与全量构建一致"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import build_features
+
+
+@pytest.fixture
+def pipeline_dirs(tmp_path, monkeypatch):
+    """把 build_features 的输入输出目录都指向临时目录"""
+    for name in ("processed", "features", "macro", "lake"):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(build_features, "PROCESSED_DIR", str(tmp_path / "processed"))
+    monkeypatch.setattr(build_features, "MACRO_DIR", str(tmp_path / "macro"))
+    monkeypatch.setattr(build_features, "FEATURES_PATH", str(tmp_path / "features" / "basic_tech_factors.parquet"))
+    monkeypatch.setattr(build_features.datalake, "LAKE_DIR", str(tmp_path / "lake"))
+    monkeypatch.setattr(build_features.feature_store, "FEATURE_STORE_DIR", str(tmp_path / "features" / "wide"))
+    return tmp_path
+
+
+def write_prices(tmp_path, prices):
+    prices.to_parquet(tmp_path / "processed" / "prices_wide.parquet")
+
+
+def build_full(float32=False):
+    build_features.build_and_save(incremental=False, streaming=False, memory_budget_mb=512, float32=float32)
+
+
+def read_all():
+    datalake = build_features.datalake
+    return {
+        "file": datalake.read_features_file(build_features.FEATURES_PATH),
+        "lake": datalake.read_features_long(),
+        "store": build_features.feature_store.FeatureStore().frames(build_features.FACTOR_COLUMNS),
+    }
+
+
+def assert_same(a, b):
+    pd.testing.assert_series_equal(a["date"], b["date"])
+    assert list(a["ticker"].astype(str)) == list(b["ticker"].astype(str))
+    for name in build_features.FACTOR_COLUMNS:
+        np.testing.assert_allclose(a[name].to_numpy(np.float64), b[name].to_numpy(np.float64),
+                                   rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("float32", [False, True])
+def test_incremental_appends_only_new_dates(pipeline_dirs, make_prices, float32):
+    prices = make_prices(n_tickers=6)
+    write_prices(pipeline_dirs, prices.iloc[:-15])
+    build_full(float32)
+    base = pipeline_dirs / "features" / "basic_tech_factors.parquet"
+    base_stat = base.stat()
+    lake_files = {p: p.stat().st_mtime_ns for p in (pipeline_dirs / "lake").rglob("*.parquet")}
+
+    write_prices(pipeline_dirs, prices)
+    assert build_features.update_features_incremental(float32=False)
+
+    # 历史文件只是改名进同名目录（同一 inode、未重写），新日期只在新分片中
+    assert base.is_dir()
+    parts = build_features.datalake.feature_file_parts(str(base))
+    assert len(parts) == 2
+    moved = os.stat(parts[0])
+    assert (moved.st_ino, moved.st_mtime_ns) == (base_stat.st_ino, base_stat.st_mtime_ns)
+    assert all(p.stat().st_mtime_ns == m for p, m in lake_files.items())
+    new_part = pd.read_parquet(parts[1])
+    assert new_part["date"].nunique() == 15 and new_part["date"].min() > prices.index[-16]
+    assert build_features.stored_as_float32() == float32
+    assert (new_part["mom_20d"].dtype == np.float32) == float32
+    assert build_features.read_last_feature_date() == prices.index[-1]
+
+    # 不经 datalake 的普通读者（pd.read_parquet 读同一路径）也能看到新日期
+    plain = pd.read_parquet(base)
+    assert plain["date"].max() == prices.index[-1] and len(plain) == len(prices) * prices.shape[1]
+
+    incremental = read_all()
+    build_full(float32)
+    assert base.is_file() and build_features.datalake.feature_file_parts(str(base)) == [str(base)]
+    full = read_all()
+    pd.testing.assert_frame_equal(
+        plain.sort_values(["ticker", "date"], ignore_index=True).astype({"ticker": str}),
+        pd.read_parquet(base).astype({"ticker": str}),
+        check_exact=False, rtol=1e-9, atol=1e-12,
+    )
+
+    assert_same(incremental["file"], full["file"])
+    assert_same(incremental["lake"], full["lake"])
+    for name in build_features.FACTOR_COLUMNS:
+        pd.testing.assert_frame_equal(incremental["store"][name], full["store"][name], rtol=1e-9, atol=1e-12)
+
+
+def test_no_new_dates_is_noop(pipeline_dirs, make_prices):
+    write_prices(pipeline_dirs, make_prices(n_tickers=6))
+    build_full()
+    assert build_features.update_features_incremental()
+    assert build_features.datalake.feature_file_parts(build_features.FEATURES_PATH) == [build_features.FEATURES_PATH]
+
+
+def test_repeated_refreshes_add_parts(pipeline_dirs, make_prices):
+    prices = make_prices(n_tickers=6)
+    write_prices(pipeline_dirs, prices.iloc[:-10])
+    build_full()
+    write_prices(pipeline_dirs, prices.iloc[:-5])
+    assert build_features.update_features_incremental()
+    base = build_features.FEATURES_PATH
+    first_parts = {p: os.stat(p).st_mtime_ns for p in build_features.datalake.feature_file_parts(base)}
+
+    write_prices(pipeline_dirs, prices)
+    assert build_features.update_features_incremental()
+    parts = build_features.datalake.feature_file_parts(base)
+    assert len(parts) == 3 and parts[:2] == sorted(first_parts)
+    assert all(os.stat(p).st_mtime_ns == m for p, m in first_parts.items())
+    assert pd.read_parquet(base)["date"].max() == prices.index[-1]
+    assert build_features.read_last_feature_date() == prices.index[-1]
@@ -0,0 +1,49 @@
+"""build_price_panel 流式模式：每个 raw 文件只读一次，多块输出与全量构建一致"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import build_price_panel
+
+
+def write_raw(raw_dir, prices):
+    """各 ticker 起止日期不同，检验日期并集与缺失填充"""
+    n_dates = len(prices)
+    for j, ticker in enumerate(prices.columns):
+        sub = prices[ticker].iloc[j * 10:n_dates - j * 5]
+        pd.DataFrame({"date": sub.index, "adj_close": sub.to_numpy()}).to_parquet(
+            os.path.join(raw_dir, f"{ticker}.parquet"), index=False
+        )
+    return prices.columns.tolist()
+
+
+def test_streaming_reads_each_file_once(tmp_path, monkeypatch, make_prices):
+    raw_dir = str(tmp_path / "raw")
+    os.makedirs(raw_dir)
+    tickers = write_raw(raw_dir, make_prices(n_dates=300))
+
+    reads = []
+    read_price_arrays = build_price_panel.read_price_arrays
+
+    def counting_read(ticker, raw_dir=None):
+        reads.append(ticker)
+        return read_price_arrays(ticker, raw_dir)
+
+    monkeypatch.setattr(build_price_panel, "read_price_arrays", counting_read)
+    # 预算为 0 → 每块 1 行，块数 = 日期数
+    output_path = str(tmp_path / "prices_wide.parquet")
+    shape = build_price_panel.build_prices_wide_streaming(
+        tickers, output_path, memory_budget_mb=0, raw_dir=raw_dir, lake_dir=str(tmp_path / "lake")
+    )
+    assert sorted(reads) == sorted(tickers)
+
+    expected = build_price_panel.build_prices_wide(tickers, workers=1, raw_dir=raw_dir)
+    streamed = pd.read_parquet(output_path)
+    assert shape == expected.shape
+    assert streamed.shape == expected.shape
+    np.testing.assert_array_equal(streamed.to_numpy(), expected.to_numpy())
+    assert streamed.index.equals(expected.index)
+    # memmap 临时文件已清理
+    assert sorted(os.listdir(tmp_path)) == ["lake", "prices_wide.parquet", "raw"]
@@ -0,0 +1,88 @@
+"""download_yf 并发下载：只重试暂时性错误、manifest 按运行日期 resume、并发确实重叠请求"""
+
+import json
+import time
+
+import pytest
+
+import download_yf
+from fake_yf import FakeYF, FlakySource, HTTPError, make_history
+
+TICKERS = [f"T{i}" for i in range(8)]
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    return {"output_dir": tmp_path / "raw", "lake_dir": tmp_path / "lake"}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # 退避时间乘以随机抖动；置 0 让测试不必真的等待
+    monkeypatch.setattr(download_yf.random, "uniform", lambda a, b: 0.0)
+
+
+def fake_source():
+    return FakeYF({t: make_history(periods=30, seed=i) for i, t in enumerate(TICKERS)})
+
+
+def read_manifest(dirs):
+    with open(dirs["output_dir"] / download_yf.MANIFEST_NAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_retries_only_transient_errors(dirs):
+    source = FlakySource(fake_source(), latency=0.01, failures={
+        "T0": [TimeoutError("read timed out"), ConnectionError("reset")],
+        "T1": [HTTPError(429)],
+        "T2": [ValueError("No timezone found, symbol may be delisted")],
+        "T3": [HTTPError(404)],
+        "T4": [TimeoutError("1"), TimeoutError("2"), TimeoutError("3")],
+    })
+    entries = download_yf.download_all(TICKERS, workers=4, rate=1000, max_retries=2, client=source,
+                                       run_date="2026-01-02", **dirs)
+
+    assert entries["T0"]["status"] == "ok" and entries["T0"]["attempts"] == 3
+    assert entries["T1"]["status"] == "ok" and entries["T1"]["attempts"] == 2
+    # 永久性错误不重试
+    for ticker in ("T2", "T3"):
+        assert entries[ticker]["status"] == "failed"
+        assert entries[ticker]["transient"] is False
+        assert source.attempts[ticker] == 1
+    # 暂时性错误重试耗尽
+    assert entries["T4"]["status"] == "failed" and entries["T4"]["transient"] is True
+    assert source.attempts["T4"] == 3
+    assert all(entries[t]["status"] == "ok" for t in TICKERS[5:])
+    assert read_manifest(dirs)["T0"]["run_date"] == "2026-01-02"
+
+
+def test_resume_skips_only_same_day_successes(dirs):
+    source = FlakySource(fake_source(), failures={"T0": [ValueError("bad payload")]})
+    download_yf.download_all(TICKERS, rate=1000, client=source, run_date="2026-01-02", **dirs)
+    assert read_manifest(dirs)["T0"]["status"] == "failed"
+
+    # 同一天续跑：只重下失败的 ticker
+    source.attempts.clear()
+    entries = download_yf.download_all(TICKERS, rate=1000, resume=True, client=source,
+                                       run_date="2026-01-02", **dirs)
+    assert set(source.attempts) == {"T0"}
+    assert all(e["status"] == "ok" for e in entries.values())
+
+    # 第二天 resume：前一天成功的 ticker 也要刷新
+    source.attempts.clear()
+    entries = download_yf.download_all(TICKERS, rate=1000, resume=True, incremental=True, client=source,
+                                       run_date="2026-01-03", **dirs)
+    assert set(source.attempts) == set(TICKERS)
+    assert all(e["run_date"] == "2026-01-03" for e in entries.values())
+
+
+def test_requests_run_concurrently(dirs):
+    latency = 0.2
+    source = FlakySource(fake_source(), latency=latency)
+    t0 = time.perf_counter()
+    entries = download_yf.download_all(TICKERS, workers=8, rate=1000, client=source,
+                                       run_date="2026-01-02", **dirs)
+    elapsed = time.perf_counter() - t0
+
+    assert all(e["status"] == "ok" for e in entries.values())
+    assert elapsed < latency * len(TICKERS) / 2
@@ -0,0 +1,96 @@
+"""download_yf 增量下载：追加新日期、复权修订触发全量重下、没有新数据"""
+
+import pandas as pd
+import pytest
+
+import download_yf
+from fake_yf import FakeYF, make_history
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    return {"output_dir": tmp_path / "raw", "lake_dir": tmp_path / "lake"}
+
+
+def seed_raw(source, ticker, dirs):
+    status, df = download_yf.fetch_and_save(ticker, incremental=True, client=source, **dirs)
+    assert status == "full"
+    return df
+
+
+def test_delta_appends_only_new_dates(dirs):
+    full = make_history(periods=60)
+    source = FakeYF({"SPY": full.iloc[:50]})
+    seed_raw(source, "SPY", dirs)
+
+    source.histories["SPY"] = full
+    status, df = download_yf.fetch_and_save("SPY", incremental=True, client=source, **dirs)
+
+    assert status == "delta"
+    # 只请求最后日期前 OVERLAP_DAYS 天之后的数据
+    start = pd.Timestamp(source.starts("SPY")[-1])
+    assert start == full.index[49] - pd.Timedelta(days=download_yf.OVERLAP_DAYS)
+    stored = download_yf.load_raw("SPY", dirs["output_dir"])
+    assert len(stored) == 60
+    assert stored["date"].is_unique and stored["date"].is_monotonic_increasing
+    pd.testing.assert_series_equal(
+        stored["adj_close"], pd.Series(full["Adj Close"].to_numpy(), name="adj_close"), check_index=False
+    )
+
+
+def test_restatement_refetches_full_history(dirs):
+    full = make_history(periods=60)
+    source = FakeYF({"SPY": full.iloc[:50], "GLD": make_history(periods=50, seed=1)})
+    seed_raw(source, "SPY", dirs)
+    seed_raw(source, "GLD", dirs)
+
+    # 分红后整段历史的复权价下调
+    restated = full.copy()
+    restated["Adj Close"] *= 0.98
+    source.histories["SPY"] = restated
+    status, df = download_yf.fetch_and_save("SPY", incremental=True, client=source, **dirs)
+
+    assert status == "refetched"
+    assert source.starts("SPY")[-1] == download_yf.DEFAULT_START_DATE
+    stored = download_yf.load_raw("SPY", dirs["output_dir"])
+    assert len(stored) == 60
+    assert stored["adj_close"].to_numpy() == pytest.approx(restated["Adj Close"].to_numpy())
+
+    # 其他 ticker 不受影响，仍走增量
+    status, _ = download_yf.fetch_and_save("GLD", incremental=True, client=source, **dirs)
+    assert status == "unchanged"
+    assert source.starts("GLD")[-1] != download_yf.DEFAULT_START_DATE
+
+
+def test_no_new_data_leaves_file_untouched(dirs):
+    source = FakeYF({"SPY": make_history(periods=50)})
+    seed_raw(source, "SPY", dirs)
+    path = dirs["output_dir"] / "SPY.parquet"
+    mtime = path.stat().st_mtime_ns
+
+    status, df = download_yf.fetch_and_save("SPY", incremental=True, client=source, **dirs)
+
+    assert status == "unchanged"
+    assert len(df) == 50
+    assert path.stat().st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize("change", ["dropped", "added"])
+def test_schema_change_refetches_full_history(dirs, change):
+    """数据源少了 / 多了一列（旧文件或 yfinance 改版）：不报 KeyError，整段重下为新 schema"""
+    full = make_history(periods=60)
+    source = FakeYF({"SPY": full.iloc[:50]})
+    seed_raw(source, "SPY", dirs)
+
+    if change == "dropped":
+        source.histories["SPY"] = full.drop(columns=["Volume"])
+    else:
+        source.histories["SPY"] = full.assign(Dividends=0.0)
+    status, df = download_yf.fetch_and_save("SPY", incremental=True, client=source, **dirs)
+
+    assert status == "refetched"
+    assert source.starts("SPY")[-1] == download_yf.DEFAULT_START_DATE
+    stored = download_yf.load_raw("SPY", dirs["output_dir"])
+    assert len(stored) == 60
+    assert ("volume" in stored.columns) == (change == "added")
+    assert ("dividends" in stored.columns) == (change == "added")
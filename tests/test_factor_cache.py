@@ -0,0 +1,50 @@
+"""FactorEngine 磁盘缓存：按 LRU 限制大小，因子函数源码变化时不命中旧结果"""
+
+import os
+
+import numpy as np
+
+from strategy_engine.core import factors
+
+
+def test_cache_is_bounded_lru(tmp_path, make_prices):
+    cache_dir = str(tmp_path)
+    entry_bytes = make_prices(n_dates=300, n_tickers=4).size * 8 + 128
+    paths = []
+    for seed in range(4):
+        engine = factors.FactorEngine(make_prices(n_dates=300, n_tickers=4, seed=seed), cache_dir=cache_dir, max_bytes=2 * entry_bytes)
+        engine.compute(["mom_20d"])
+        path = engine._cache_path("mom_20d")
+        # 固定 mtime 顺序，避免文件系统时间精度导致的并列
+        os.utime(path, (seed, seed))
+        paths.append(path)
+        if seed == 1:
+            # 命中刷新最近使用时间：第一个 panel 变成最新
+            hit = factors.FactorEngine(make_prices(n_dates=300, n_tickers=4, seed=0), cache_dir=cache_dir, max_bytes=2 * entry_bytes)
+            assert hit._load_cached("mom_20d") is not None
+            os.utime(paths[0], (seed + 0.5, seed + 0.5))
+        if seed == 2:
+            # 淘汰的是最久未使用的 seed=1，而不是最早写入的 seed=0
+            assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
+
+    entries = factors.LRUDirectory(cache_dir, ".npy", 2 * entry_bytes).entries()
+    assert sum(size for _, size, _ in entries) <= 2 * entry_bytes
+    assert sorted(path for path, _, _ in entries) == sorted(paths[2:])
+
+
+def test_key_changes_with_compute_source(tmp_path, monkeypatch, make_prices):
+    prices = make_prices(n_dates=300, n_tickers=4)
+    engine = factors.FactorEngine(prices, cache_dir=str(tmp_path))
+    original = engine.compute(["mom_20d"])["mom_20d"]
+    old_key = engine.key("mom_20d")
+
+    def edited(prices, window=None):
+        return prices / np.roll(prices, window, axis=0) - 1.0 + 1.0
+
+    factor = factors.REGISTRY["mom_20d"]
+    monkeypatch.setitem(factors.REGISTRY, "mom_20d",
+                        factors.Factor("mom_20d", factor.inputs, edited, factor.window, factor.output, factor.version))
+    engine = factors.FactorEngine(prices, cache_dir=str(tmp_path))
+    assert engine.key("mom_20d") != old_key
+    recomputed = engine.compute(["mom_20d"])["mom_20d"]
+    assert not np.allclose(recomputed.to_numpy()[25:], original.to_numpy()[25:])
@@ -0,0 +1,76 @@
+"""宽因子库：按日期分块的读写，增量追加只写新行"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core import feature_store
+
+FACTORS = ["mom_120d", "trend_200d"]
+
+
+@pytest.fixture
+def make_factors(make_prices):
+    """每个因子一张合成宽表（首列前 5 行缺失），列名与真实 universe 一致"""
+    def make(n_dates=40, tickers=("TLT", "GLD", "SPY")):
+        return {name: make_prices(n_dates=n_dates, start="2020-01-01", tickers=tickers, seed=seed, late_start=5)
+                for seed, name in enumerate(FACTORS)}
+
+    return make
+
+
+def head(factors, n):
+    return {name: wide.iloc[:n] for name, wide in factors.items()}
+
+
+def tail(factors, n):
+    return {name: wide.iloc[n:] for name, wide in factors.items()}
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_roundtrip_and_slices(tmp_path, make_factors, dtype):
+    factors = make_factors()
+    store_dir = str(tmp_path / "wide")
+    feature_store.write_feature_store(factors, dtype=dtype, store_dir=store_dir)
+    store = feature_store.FeatureStore(store_dir)
+
+    assert store.calendar.equals(factors["mom_120d"].index)
+    assert store.tickers == ["GLD", "SPY", "TLT"]
+    frames = store.frames(FACTORS, ["TLT", "SPY"], start="2020-01-10", end="2020-02-14")
+    for name in FACTORS:
+        expected = factors[name].loc["2020-01-10":"2020-02-14", ["TLT", "SPY"]].astype(dtype)
+        pd.testing.assert_frame_equal(frames[name], expected, check_names=False, check_freq=False,
+                                      check_index_type=False)
+        assert frames[name].dtypes.eq(dtype).all()
+
+
+def test_append_writes_only_new_rows(tmp_path, make_factors):
+    factors = make_factors(n_dates=30)
+    store_dir = tmp_path / "wide"
+    with feature_store.FeatureStoreWriter(factors["mom_120d"].index[:20], ["GLD", "SPY", "TLT"], FACTORS,
+                                          store_dir=str(store_dir), block_dates=8) as writer:
+        writer.write(head(factors, 20))
+    blocks = {p.relative_to(store_dir): p.stat().st_mtime_ns for p in store_dir.rglob("block-*.npy")}
+
+    feature_store.append_feature_store(tail(factors, 20), store_dir=str(store_dir))
+
+    # 20 行 = 块 0、1 写满 + 块 2 的 4 行；追加 10 行只写块 2 的空闲行和新块 3
+    for path, mtime in blocks.items():
+        changed = (store_dir / path).stat().st_mtime_ns != mtime
+        assert changed == path.name.endswith("block-00002.npy"), path
+    assert (store_dir / "mom_120d" / "block-00003.npy").exists()
+
+    store = feature_store.FeatureStore(str(store_dir))
+    assert store.n_dates == 30
+    assert store.calendar.equals(factors["mom_120d"].index)
+    for name, wide in store.frames(FACTORS, ["GLD", "SPY", "TLT"]).items():
+        np.testing.assert_array_equal(wide.to_numpy(), factors[name][["GLD", "SPY", "TLT"]].to_numpy())
+
+
+def test_append_rejects_overlapping_dates(tmp_path, make_factors):
+    factors = make_factors()
+    store_dir = str(tmp_path / "wide")
+    feature_store.write_feature_store(head(factors, 20), store_dir=store_dir)
+    with pytest.raises(ValueError):
+        feature_store.append_feature_store(tail(factors, 19), store_dir=store_dir)
+    assert feature_store.FeatureStore(store_dir).n_dates == 20
@@ -0,0 +1,38 @@
+"""float32 因子存储检查：只在舍入会改变阈值信号（或溢出）时拒绝"""
+
+import numpy as np
+import pytest
+
+from strategy_engine.core import datalake
+
+
+def test_typical_factors_pass(make_prices):
+    prices = make_prices(n_dates=500, n_tickers=4).to_numpy()
+    mom = prices[20:] / prices[:-20] - 1.0
+    for values in (mom, prices, np.array([np.nan, 0.0, 1e-12, -3.5])):
+        ok, max_abs, max_rel, n_crossed = datalake.float32_precision(values)
+        assert ok and n_crossed == 0
+        assert max_rel <= 2.0 ** -24
+    assert datalake.to_float32(mom, "mom_20d").dtype == np.float32
+
+
+def crossing_value(t):
+    """紧贴阈值 t、但舍入到 float32 后落在 t 另一侧的 float64 值"""
+    rounded = float(np.float32(t))
+    return t + 1e-12 if rounded < t else t - 1e-12
+
+
+@pytest.mark.parametrize("value", [crossing_value(t) for t in (0.01, 0.02, 0.05, 0.15)] + [1e-50, -1e-50])
+def test_threshold_crossing_fails(value):
+    """阈值附近的值舍入后越过阈值（或下溢到 0），信号会变，必须拒绝"""
+    ok, _, _, n_crossed = datalake.float32_precision(np.array([0.3, value]))
+    assert not ok and n_crossed == 1
+    with pytest.raises(ValueError, match="cross a signal threshold"):
+        datalake.to_float32(np.array([value]), "mom_20d")
+
+
+def test_custom_thresholds_and_overflow():
+    values = np.array([crossing_value(0.07)])
+    assert datalake.float32_precision(values)[0]
+    assert not datalake.float32_precision(values, thresholds=(0.07,))[0]
+    assert not datalake.float32_precision(np.array([1e300]))[0]
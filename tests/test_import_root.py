@@ -0,0 +1,30 @@
+"""core 模块只以 strategy_engine.core 一个名字加载；core 下带 __main__ 的模块可直接按文件运行"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def test_scripts_import_core_once():
+    """demo / sweep / 管道脚本都导入后，不应再出现顶层的 core.* 模块"""
+    code = (
+        "import sys\n"
+        "sys.path[:0] = ['strategy_engine', 'data_pipeline/scripts']\n"
+        "import parallel_sweep, build_features, run_pipeline\n"
+        "dup = sorted(m for m in sys.modules if m == 'core' or m.startswith('core.'))\n"
+        "assert not dup, dup\n"
+        "assert 'strategy_engine.core.kernels' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True)
+
+
+@pytest.mark.parametrize("module", ["loader", "signals", "backtest"])
+def test_core_module_runs_as_file(module, tmp_path):
+    path = os.path.join(ROOT_DIR, "strategy_engine", "core", f"{module}.py")
+    # 从无关目录运行，确认不依赖当前目录在 sys.path 上
+    result = subprocess.run([sys.executable, path], cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,114 @@
+"""kernels：滚动均值 / 标准差 / Sharpe、滚动最大回撤与 pandas 一致（预热期 NaN、缺失值、短窗口），numba / NumPy 分派"""
+
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core import kernels
+
+
+def returns_with_gaps(make_prices, n_dates=150, n_tickers=4):
+    """日收益：最后一列晚上市，第一列中间缺两天"""
+    returns = make_prices(n_dates=n_dates, n_tickers=n_tickers, late_start=25).pct_change()
+    returns.iloc[70:72, 0] = np.nan
+    return returns
+
+
+def pandas_max_drawdown(r):
+    equity = np.cumprod(1.0 + r)
+    return (equity / np.maximum.accumulate(equity) - 1.0).min()
+
+
+@pytest.fixture
+def fake_numba(monkeypatch):
+    """没有 numba 时，用 Python 解释执行 JIT 内核，覆盖分派与内核逻辑"""
+    compiled = []
+
+    def njit(**options):
+        def decorator(func):
+            compiled.append(func.__name__)
+            return func
+        return decorator
+
+    monkeypatch.setattr(kernels, "numba", types.SimpleNamespace(njit=njit, prange=range))
+    monkeypatch.setattr(kernels, "HAVE_NUMBA", True)
+    monkeypatch.setattr(kernels, "_compiled", {})
+    return compiled
+
+
+@pytest.mark.parametrize("use_jit", [False, True])
+def test_rolling_moments_match_pandas(make_prices, fake_numba, use_jit):
+    returns = returns_with_gaps(make_prices)
+    windows = [1, 2, 20, 63, 150, 200]
+    means, stds = kernels.rolling_moments(returns.to_numpy(), windows, use_jit=use_jit)
+    for w in windows:
+        np.testing.assert_allclose(means[w], returns.rolling(w).mean().to_numpy(), rtol=1e-9, atol=1e-15)
+        np.testing.assert_allclose(stds[w], returns.rolling(w).std().to_numpy(), rtol=1e-9, atol=1e-15)
+
+    # 价格水平上的均线（ma_200d 的用法）
+    prices = make_prices(n_dates=300, n_tickers=4, late_start=25) * 1000.0
+    ma = kernels.rolling_mean(prices.to_numpy(), 200, use_jit=use_jit)
+    np.testing.assert_allclose(ma, prices.rolling(200).mean().to_numpy(), rtol=1e-12)
+
+    sharpe = kernels.rolling_sharpe(returns.to_numpy(), 20, use_jit=use_jit)
+    expected = returns.rolling(20).mean() / returns.rolling(20).std() * np.sqrt(252)
+    np.testing.assert_allclose(sharpe, expected.to_numpy(), rtol=1e-7)
+    assert fake_numba == (["_rolling_moments_kernel"] if use_jit else [])
+
+
+def test_one_dimensional_input_keeps_shape(make_prices):
+    series = make_prices(n_dates=80, n_tickers=1).iloc[:, 0]
+    mean = kernels.rolling_mean(series.to_numpy(), 10)
+    assert mean.shape == (80,)
+    np.testing.assert_allclose(mean, series.rolling(10).mean().to_numpy(), rtol=1e-12)
+    assert np.isnan(kernels.rolling_std(series.to_numpy()[:5], 10)).all()
+
+
+def test_dispatch_uses_jit_above_min_work(make_prices, fake_numba, monkeypatch):
+    x = returns_with_gaps(make_prices).to_numpy()
+
+    kernels.rolling_moments(x, [20])
+    kernels.return_stats(x)
+    assert fake_numba == []
+
+    monkeypatch.setattr(kernels, "JIT_MIN_WORK", x.size)
+    kernels.rolling_moments(x, [20])
+    kernels.return_stats(x)
+    assert fake_numba == ["_rolling_moments_kernel", "_return_stats_kernel"]
+
+
+def test_jit_without_numba_raises(monkeypatch):
+    monkeypatch.setattr(kernels, "HAVE_NUMBA", False)
+    with pytest.raises(ImportError):
+        kernels.rolling_moments(np.zeros((10, 2)), [5], use_jit=True)
+    with pytest.raises(ImportError):
+        kernels.return_stats(np.zeros((10, 2)), use_jit=True)
+    # 默认分派退回 NumPy
+    means, _ = kernels.rolling_moments(np.ones((10, 2)), [5])
+    assert np.isnan(means[5][:4]).all() and (means[5][4:] == 1.0).all()
+
+
+@pytest.mark.parametrize("window", [1, 7, 20, 50, 149])
+def test_rolling_max_drawdown_matches_pandas(make_prices, window):
+    # 150 行：窗口与分块边界大多不对齐
+    returns = returns_with_gaps(make_prices, n_dates=150)
+    expected = returns.rolling(window).apply(pandas_max_drawdown, raw=True)
+
+    result = kernels.rolling_max_drawdown(returns.to_numpy(), window)
+
+    np.testing.assert_allclose(result, expected.to_numpy(), rtol=1e-9, atol=1e-12)
+    assert (result[~np.isnan(result)] <= 0).all()
+    # 预热期与含缺失值的窗口为 NaN
+    assert np.isnan(result[:window - 1]).all()
+    assert np.isnan(result[70:min(72 + window - 1, 150), 0]).all()
+
+
+def test_rolling_max_drawdown_short_series():
+    r = np.array([0.01, -0.02, 0.03])
+    assert np.isnan(kernels.rolling_max_drawdown(r, 5)).all()
+    assert np.isnan(kernels.rolling_max_drawdown(r, 0)).all()
+    full = kernels.rolling_max_drawdown(r, 3)
+    assert full.shape == (3,)
+    assert full[-1] == pytest.approx(pandas_max_drawdown(r))
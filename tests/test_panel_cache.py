@@ -0,0 +1,99 @@
+"""panel_cache：write_panel_cache 写入后 PanelCache 映射读回一致，源文件变化后不再新鲜"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core import panel_cache
+from strategy_engine.core.backtest import BacktestEngine
+
+
+def assert_same(result, expected):
+    # 缓存里日期固定存为纳秒，pandas 3 的输入可能是微秒精度
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(result, expected, check_freq=False, check_index_type=False)
+    else:
+        pd.testing.assert_series_equal(result, expected, check_freq=False, check_index_type=False)
+    assert (result.index == expected.index).all()
+
+
+@pytest.fixture
+def panel(make_prices):
+    prices = make_prices(n_dates=120, n_tickers=3, late_start=15)
+    returns = prices.pct_change()
+    rf = pd.Series(1e-4, index=prices.index[5:], name="rf_daily")
+    factors = {"mom_20d": prices / prices.shift(20) - 1.0}
+    return prices, returns, rf, factors
+
+
+def test_round_trip(tmp_path, panel):
+    prices, returns, rf, factors = panel
+    source = tmp_path / "prices.parquet"
+    prices.to_parquet(source)
+    cache_dir = str(tmp_path / "panel")
+
+    panel_cache.write_panel_cache(prices, returns, rf, factors, sources=[str(source)], cache_dir=cache_dir)
+
+    assert panel_cache.cache_exists(cache_dir)
+    assert not os.path.exists(f"{cache_dir}.tmp")
+    cache = panel_cache.PanelCache(cache_dir)
+    assert cache.is_fresh()
+    assert cache.tickers == list(prices.columns)
+    assert cache.factor_names == ["mom_20d"]
+    assert_same(cache.frame("prices"), prices)
+    assert_same(cache.frame("returns"), returns)
+    assert_same(cache.frame("mom_20d"), factors["mom_20d"])
+    assert isinstance(cache.array("prices"), np.memmap)
+
+    # 列子集（按请求顺序）与起始行
+    subset = list(prices.columns[::-1][:2])
+    assert_same(cache.frame("prices", subset, start=10), prices[subset].iloc[10:])
+    # rf 对齐到价格日期，缺失保持 NaN
+    assert_same(cache.series("rf"), rf.reindex(prices.index).rename("rf"))
+
+    with pytest.raises(KeyError):
+        cache.array("vol_20d")
+    with pytest.raises(KeyError):
+        cache.columns(["NOPE"])
+
+
+def test_stale_after_source_changes(tmp_path, panel):
+    prices, returns, rf, factors = panel
+    source = tmp_path / "prices.parquet"
+    prices.to_parquet(source)
+    cache_dir = str(tmp_path / "panel")
+    panel_cache.write_panel_cache(prices, returns, rf, factors, sources=[str(source)], cache_dir=cache_dir)
+
+    prices.iloc[:-1].to_parquet(source)
+    assert not panel_cache.PanelCache(cache_dir).is_fresh()
+
+    # 重建后覆盖旧缓存，又是新鲜的
+    panel_cache.write_panel_cache(prices.iloc[:-1], returns.iloc[:-1], rf, {}, sources=[str(source)],
+                                  cache_dir=cache_dir)
+    cache = panel_cache.PanelCache(cache_dir)
+    assert cache.is_fresh()
+    assert len(cache.dates) == len(prices) - 1 and cache.factor_names == []
+    assert not os.path.exists(os.path.join(cache_dir, "factors", "mom_20d.npy"))
+
+    source.unlink()
+    assert not cache.is_fresh()
+
+
+def test_missing_cache(tmp_path):
+    assert not panel_cache.cache_exists(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        panel_cache.PanelCache(str(tmp_path))
+
+
+def test_backtest_from_panel_cache(tmp_path, panel):
+    prices, returns, rf, factors = panel
+    cache_dir = str(tmp_path / "panel")
+    panel_cache.write_panel_cache(prices, returns, rf, factors, cache_dir=cache_dir)
+    signals = (factors["mom_20d"] > 0).astype(float).iloc[20:]
+
+    from_cache = BacktestEngine.from_panel_cache(signals, cache=panel_cache.PanelCache(cache_dir))
+    direct = BacktestEngine(prices, signals)
+
+    np.testing.assert_allclose(from_cache.run(), direct.run(), rtol=1e-12)
@@ -0,0 +1,62 @@
+"""parallel_sweep：多进程 + 共享内存的结果与单进程 evaluate_mom_trend_grid 一致"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import parallel_sweep
+from sweep_mom_trend import evaluate_mom_trend_grid, expand_param_grid, summarize_grid
+
+
+GRID = {
+    "mom_window": [20, 60],
+    "trend_window": [50, 100],
+    "mom_threshold": [0.0, 0.02],
+}
+
+
+@pytest.fixture
+def inputs(make_prices, monkeypatch):
+    """小面板替代 prepare_mom_trend_inputs（与其口径一致：共同起点后的收益，NaN 填 0）"""
+    prices_full = make_prices(n_dates=300, n_tickers=3, late_start=40)
+    prices = prices_full.iloc[40:]
+    returns_wide = prices.pct_change().fillna(0.0)
+    rf_daily = pd.Series(1e-4, index=returns_wide.index, name="rf_daily")
+    monkeypatch.setattr(parallel_sweep, "prepare_mom_trend_inputs",
+                        lambda risky_tickers=None: (prices_full, returns_wide, rf_daily))
+    return prices_full, returns_wide, rf_daily
+
+
+def test_matches_single_process(inputs):
+    prices_full, returns_wide, rf_daily = inputs
+    combos = expand_param_grid(GRID)
+    expected = summarize_grid(
+        combos,
+        evaluate_mom_trend_grid(combos, prices_full.to_numpy(), returns_wide.to_numpy(), rf_daily.to_numpy()),
+        rf_daily,
+    )
+
+    # 块大小不整除组合数，结果按完成顺序返回后重新排序
+    result = parallel_sweep.run_parallel_sweep(GRID, n_workers=2, chunk_size=3, verbose=False)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_shared_arrays_round_trip():
+    arrays = {
+        "panel": np.arange(12, dtype=np.float64).reshape(4, 3),
+        "dates": np.arange(4, dtype=np.int64),
+        "empty": np.empty((0, 3)),
+    }
+    segments, descriptors = parallel_sweep.publish_arrays(arrays)
+    try:
+        attached, views = parallel_sweep.attach_arrays(descriptors)
+        for name, arr in arrays.items():
+            np.testing.assert_array_equal(views[name], arr)
+            assert views[name].dtype == arr.dtype
+            assert not views[name].flags.writeable
+        del views
+        for shm in attached:
+            shm.close()
+    finally:
+        parallel_sweep.release_arrays(segments)
@@ -0,0 +1,96 @@
+"""rebalance：日 / 周 / 月调仓、不交易带、固定成本，闭式解与事件循环都与逐日参考实现一致"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core import rebalance
+
+
+def reference(rets, targets, schedule, initial_capital, cost_rate, fixed_cost, band):
+    """逐日循环的参考实现：持仓按收益漂移，调仓日把带外资产交易回目标权重"""
+    n_dates, n_assets = targets.shape
+    values, turnover, costs = np.zeros(n_dates), np.zeros(n_dates), np.zeros(n_dates)
+    weights = np.zeros((n_dates, n_assets))
+    held, cash = np.zeros(n_assets), initial_capital
+    for t in range(n_dates):
+        if t:
+            held = held * (1.0 + rets[t])
+        value = held.sum() + cash
+        values[t] = value
+        if schedule[t]:
+            drifted = held / value if value != 0 else np.zeros(n_assets)
+            diff = targets[t] - drifted
+            trade = np.abs(diff) > max(band, rebalance.TRADE_TOLERANCE)
+            turnover[t] = np.abs(diff[trade]).sum()
+            costs[t] = cost_rate * turnover[t] * value + fixed_cost * trade.sum()
+            post = value - costs[t]
+            held = np.where(trade, targets[t] * post, held)
+            cash = post - held.sum()
+        total = held.sum() + cash
+        if total != 0:
+            weights[t] = held / total
+    return values, weights, turnover, costs
+
+
+def make_inputs(prices, seed=0):
+    rng = np.random.default_rng(seed)
+    rets = rebalance.price_returns(prices.to_numpy())
+    targets = rng.uniform(0.0, 1.0, prices.shape)
+    targets /= targets.sum(axis=1, keepdims=True) * 1.25  # 留 20% 现金
+    return rets, targets
+
+
+def assert_matches_reference(result, expected):
+    values, weights, turnover, costs, _ = result
+    for got, want in zip((values, weights, turnover, costs), expected):
+        np.testing.assert_allclose(got, want, rtol=1e-10, atol=1e-12)
+
+
+@pytest.mark.parametrize("frequency", rebalance.REBALANCE_FREQUENCIES)
+@pytest.mark.parametrize("band", [0.0, 0.02])
+@pytest.mark.parametrize("cost_rate, fixed_cost", [(0.0, 0.0), (0.001, 0.0), (0.001, 0.0005)])
+def test_matches_reference(make_prices, frequency, band, cost_rate, fixed_cost):
+    prices = make_prices(n_dates=120, n_tickers=4)
+    rets, targets = make_inputs(prices)
+    schedule = rebalance.rebalance_schedule(prices.index, frequency)
+    result = rebalance.simulate_rebalancing(rets, targets, schedule, 1.0, cost_rate, fixed_cost, band)
+    expected = reference(rets, targets, schedule, 1.0, cost_rate, fixed_cost, band)
+    assert_matches_reference(result, expected)
+
+
+def test_schedule_marks_period_starts():
+    dates = pd.bdate_range("2021-01-01", "2021-03-31")
+    weekly = rebalance.rebalance_schedule(dates, "weekly")
+    monthly = rebalance.rebalance_schedule(dates, "monthly")
+    assert list(dates[monthly].strftime("%Y-%m-%d")) == ["2021-01-01", "2021-02-01", "2021-03-01"]
+    assert weekly[0] and (dates[weekly][1:].dayofweek == 0).all()
+    assert rebalance.rebalance_schedule(dates, "daily").all()
+    with pytest.raises(ValueError):
+        rebalance.rebalance_schedule(dates, "yearly")
+
+
+@pytest.mark.parametrize("cost_rate, fixed_cost", [(0.0, 0.0), (0.002, 0.0), (0.002, 0.001)])
+def test_closed_form_matches_event_loop(make_prices, cost_rate, fixed_cost):
+    prices = make_prices(n_dates=200, n_tickers=6, seed=3)
+    rets, targets = make_inputs(prices, seed=3)
+    cash_rets = np.full(len(prices), 0.0001)
+    closed = rebalance._simulate_daily(rets, targets, 1.0, cost_rate, fixed_cost, cash_rets)
+    events = rebalance._simulate_events(rets, targets, np.arange(len(prices)), 1.0,
+                                        cost_rate, fixed_cost, 0.0, cash_rets)
+    for got, want in zip(closed, events):
+        np.testing.assert_allclose(got, want, rtol=1e-10, atol=1e-12)
+
+
+def test_wipeout_with_fixed_cost_stays_finite(make_prices):
+    """满仓资产单日 -100%：闭式解不能再除以累计增长，应退回事件循环而不是产生 NaN"""
+    prices = make_prices(n_dates=30, n_tickers=1)
+    rets = rebalance.price_returns(prices.to_numpy())
+    rets[10, 0] = -1.0
+    targets = np.ones((30, 1))
+    result = rebalance.simulate_rebalancing(rets, targets, None, 1.0, 0.0, 0.01, 0.0)
+    values, _, _, costs, _ = result
+    assert np.isfinite(values).all() and np.isfinite(costs).all()
+    assert values[10] == 0.0
+    expected = reference(rets, targets, np.ones(30, dtype=bool), 1.0, 0.0, 0.01, 0.0)
+    assert_matches_reference(result, expected)
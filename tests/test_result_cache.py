@@ -0,0 +1,65 @@
+"""ResultCache：命中 / 未命中计数、按 LRU 限制大小、损坏的 pickle 被删除后重算"""
+
+import os
+
+import numpy as np
+
+from strategy_engine.core import result_cache
+
+
+def entry(seed):
+    return np.random.default_rng(seed).standard_normal(1000)
+
+
+def test_hit_and_miss(tmp_path):
+    cache = result_cache.ResultCache(cache_dir=str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"sharpe": 1.5, "values": entry(0)}
+
+    value, hit = cache.get_or_compute("k", compute)
+    assert not hit and len(calls) == 1
+    again, hit = cache.get_or_compute("k", compute)
+    assert hit and len(calls) == 1
+    np.testing.assert_array_equal(again["values"], value["values"])
+    assert cache.get("other", "default") == "default"
+    assert (cache.hits, cache.misses) == (1, 2)
+    # 写入是原子的：目录里不留临时文件
+    assert os.listdir(tmp_path) == ["k.pkl"]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    entry_bytes = entry(0).nbytes + 512
+    cache = result_cache.ResultCache(cache_dir=str(tmp_path), max_bytes=2 * entry_bytes)
+    for seed in range(4):
+        cache.put(f"k{seed}", entry(seed))
+        # 固定 mtime 顺序，避免文件系统时间精度导致的并列
+        os.utime(cache.path(f"k{seed}"), (seed, seed))
+        if seed == 1:
+            # 命中刷新最近使用时间：k0 变成最新
+            assert cache.get("k0") is not None
+            os.utime(cache.path("k0"), (seed + 0.5, seed + 0.5))
+        if seed == 2:
+            # 淘汰的是最久未使用的 k1，而不是最早写入的 k0
+            assert os.path.exists(cache.path("k0")) and not os.path.exists(cache.path("k1"))
+
+    assert cache.size() <= 2 * entry_bytes
+    assert [os.path.basename(path) for path, _, _ in cache.entries()] == ["k2.pkl", "k3.pkl"]
+    np.testing.assert_array_equal(cache.get("k3"), entry(3))
+
+
+def test_corrupt_entry_is_recomputed(tmp_path):
+    cache = result_cache.ResultCache(cache_dir=str(tmp_path))
+    cache.put("k", entry(0))
+    path = cache.path("k")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+
+    value, hit = cache.get_or_compute("k", lambda: entry(1))
+
+    assert not hit and cache.misses == 1
+    np.testing.assert_array_equal(value, entry(1))
+    # 损坏的文件被替换为新结果
+    np.testing.assert_array_equal(cache.get("k"), entry(1))
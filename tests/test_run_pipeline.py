@@ -0,0 +1,117 @@
+"""run_pipeline 调度：输入未变化时跳过、失败后从失败阶段续跑、--force / --skip / --dry-run（桩阶段脚本）"""
+
+import json
+
+import pytest
+
+import run_pipeline
+
+
+# 桩脚本：记录一次运行（含参数），有 <name>.fail 标记时失败，否则把输入拼接后写出 <name>.out
+STUB = """\
+import pathlib, sys
+here = pathlib.Path(__file__).parent
+name = pathlib.Path(__file__).stem
+with open(here / "runs.log", "a") as f:
+    f.write(" ".join([name] + sys.argv[1:]) + "\\n")
+if (here / f"{name}.fail").exists():
+    sys.exit(3)
+inputs = [here / f"{dep}.out" for dep in sys.argv[1:] if not dep.startswith("--")]
+(here / f"{name}.out").write_text(name + "(" + ",".join(p.read_text() for p in inputs) + ")")
+"""
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """fetch → panel → features ← side；返回 run(**kwargs) -> (results, 本次运行的阶段)"""
+    def stage(name, deps=()):
+        script = tmp_path / f"{name}.py"
+        script.write_text(STUB)
+        return run_pipeline.PipelineStage(
+            name, str(script), deps=deps,
+            inputs=[str(tmp_path / f"{dep}.out") for dep in deps],
+            outputs=[str(tmp_path / f"{name}.out")],
+            args=lambda options, resumed: list(deps) + (["--resume"] if resumed else []),
+        )
+
+    stages = [stage("fetch"), stage("side"), stage("panel", ["fetch"]), stage("features", ["panel", "side"])]
+    monkeypatch.setattr(run_pipeline, "STAGES", stages)
+    monkeypatch.setattr(run_pipeline, "STAGES_BY_NAME", {s.name: s for s in stages})
+    log = tmp_path / "runs.log"
+
+    def run(**kwargs):
+        before = log.read_text().splitlines() if log.exists() else []
+        results = run_pipeline.run_pipeline(state_path=str(tmp_path / "state.json"), **kwargs)
+        after = log.read_text().splitlines() if log.exists() else []
+        return results, after[len(before):]
+
+    run.dir = tmp_path
+    return run
+
+
+def ran(lines):
+    return sorted(line.split()[0] for line in lines)
+
+
+def test_skips_fresh_stages_and_reruns_downstream(pipeline):
+    results, lines = pipeline()
+    assert set(results.values()) == {"ok"}
+    assert ran(lines) == ["features", "fetch", "panel", "side"]
+    assert (pipeline.dir / "features.out").read_text() == "features(panel(fetch()),side())"
+
+    results, lines = pipeline()
+    assert set(results.values()) == {"fresh"} and lines == []
+
+    # 改动 panel 的脚本：panel 重跑，输出变化使 features 重跑，其余跳过
+    script = pipeline.dir / "panel.py"
+    script.write_text(script.read_text() + "# edited\n")
+    results, lines = pipeline()
+    assert results == {"fetch": "fresh", "side": "fresh", "panel": "ok", "features": "ok"}
+    assert ran(lines) == ["features", "panel"]
+
+    # 输出被删除：该阶段重跑
+    (pipeline.dir / "side.out").unlink()
+    results, lines = pipeline(targets=["side"])
+    assert results == {"side": "ok"}
+
+
+def test_resumes_from_failed_stage(pipeline):
+    (pipeline.dir / "panel.fail").touch()
+    results, _ = pipeline()
+    assert results == {"fetch": "ok", "side": "ok", "panel": "failed", "features": "blocked"}
+    state = json.loads((pipeline.dir / "state.json").read_text())["stages"]
+    assert state["panel"]["status"] == "failed" and state["panel"]["error"] == "exit code 3"
+    assert "features" not in state
+
+    (pipeline.dir / "panel.fail").unlink()
+    results, lines = pipeline()
+    assert results == {"fetch": "fresh", "side": "fresh", "panel": "ok", "features": "ok"}
+    # 上次失败的阶段带 --resume 重跑
+    assert sorted(lines) == ["features panel side", "panel fetch --resume"]
+
+
+def test_force_skip_and_dry_run(pipeline):
+    pipeline()
+
+    results, lines = pipeline(force=["side"])
+    assert results == {"fetch": "fresh", "side": "ok", "panel": "fresh", "features": "ok"}
+    assert ran(lines) == ["features", "side"]
+
+    script = pipeline.dir / "fetch.py"
+    script.write_text(script.read_text() + "# edited\n")
+    results, lines = pipeline(dry_run=True)
+    assert results == {"fetch": "would run", "side": "fresh", "panel": "would run", "features": "would run"}
+    assert lines == []
+
+    # --skip 的阶段视为已完成，下游按自己的指纹判断
+    results, lines = pipeline(skip=["fetch"])
+    assert results == {"fetch": "skipped", "side": "fresh", "panel": "fresh", "features": "fresh"}
+    assert lines == []
+
+    results, lines = pipeline(targets=["panel"])
+    assert results == {"fetch": "ok", "panel": "ok"}
+
+
+def test_unknown_target(pipeline):
+    with pytest.raises(ValueError):
+        pipeline(targets=["nope"])
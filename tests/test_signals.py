@@ -0,0 +1,83 @@
+"""SignalGenerator：预热期 NaN、Series / DataFrame 输入与 pandas 参考一致，combine_signals 按标签对齐"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy_engine.core.signals import SignalGenerator
+
+
+def sign(condition, valid):
+    return pd.DataFrame(np.where(condition, 1.0, -1.0), index=condition.index,
+                        columns=condition.columns).where(valid)
+
+
+def test_signals_match_pandas_reference(make_prices):
+    prices = make_prices(n_dates=200, n_tickers=4, late_start=30)
+    returns = prices.pct_change()
+
+    fast, slow = prices.rolling(20).mean(), prices.rolling(63).mean()
+    expected_trend = sign(fast > slow, fast.notna() & slow.notna())
+    momentum = prices / prices.shift(20) - 1.0
+    expected_momentum = sign(momentum > 0, momentum.notna())
+    vol = returns.rolling(20).std()
+    expected_vol = sign(vol < 0.15, vol.notna())
+
+    pd.testing.assert_frame_equal(SignalGenerator.trend_signal(prices, 20, 63), expected_trend)
+    pd.testing.assert_frame_equal(SignalGenerator.momentum_signal(prices, 20), expected_momentum)
+    pd.testing.assert_frame_equal(SignalGenerator.volatility_signal(returns, 20, 0.15), expected_vol)
+
+    # 预热期：前 62 行全 NaN，晚上市资产再晚 30 行
+    trend = SignalGenerator.trend_signal(prices, 20, 63)
+    assert trend.iloc[:62].isna().all().all() and trend.iloc[62, :-1].notna().all()
+    assert trend.iloc[:92, -1].isna().all() and trend.iloc[92:, -1].notna().all()
+
+
+def test_series_input_matches_dataframe_column(make_prices):
+    prices = make_prices(n_dates=120, n_tickers=3)
+    series = SignalGenerator.momentum_signal(prices["T1"], 10)
+    assert isinstance(series, pd.Series) and series.name == "T1"
+    pd.testing.assert_series_equal(series, SignalGenerator.momentum_signal(prices, 10)["T1"])
+
+
+def test_combine_propagates_warm_up_nan(make_prices):
+    prices = make_prices(n_dates=120, n_tickers=3)
+    signals = {
+        "trend": SignalGenerator.trend_signal(prices, 10, 40),
+        "momentum": SignalGenerator.momentum_signal(prices, 5),
+    }
+    combined = SignalGenerator.combine_signals(signals, {"trend": 0.25, "momentum": 0.75})
+    expected = 0.25 * signals["trend"] + 0.75 * signals["momentum"]
+    pd.testing.assert_frame_equal(combined, expected)
+    assert combined.iloc[:39].isna().all().all() and combined.iloc[39:].notna().all().all()
+
+
+def test_combine_aligns_by_label(make_prices):
+    prices = make_prices(n_dates=60, n_tickers=3)
+    first = SignalGenerator.momentum_signal(prices, 5)
+    # 列顺序颠倒、少最后 10 个日期
+    second = SignalGenerator.momentum_signal(prices, 10)[["T2", "T0", "T1"]].iloc[:-10]
+    combined = SignalGenerator.combine_signals({"a": first, "b": second})
+
+    assert combined.index.equals(first.index) and combined.columns.equals(first.columns)
+    expected = 0.5 * first + 0.5 * second.reindex_like(first)
+    pd.testing.assert_frame_equal(combined, expected)
+    assert combined.iloc[-10:].isna().all().all()
+
+    series = SignalGenerator.combine_signals({"a": first["T0"], "b": second["T0"].iloc[::-1]})
+    pd.testing.assert_series_equal(series, expected["T0"])
+
+
+def test_combine_rejects_mismatched_shapes(make_prices):
+    prices = make_prices(n_dates=30, n_tickers=2)
+    with pytest.raises(ValueError):
+        SignalGenerator.combine_signals({"a": prices, "b": prices.to_numpy()[:-1]})
+    with pytest.raises(ValueError):
+        SignalGenerator.combine_signals({"a": prices, "b": prices["T0"]})
+
+
+def test_combine_all_zero_weights_returns_zero_signal(make_prices):
+    prices = make_prices(n_dates=30, n_tickers=2)
+    combined = SignalGenerator.combine_signals({"a": prices, "b": prices}, {"a": 0.0})
+    pd.testing.assert_frame_equal(combined, prices * 0.0)
+    assert SignalGenerator.combine_signals({"a": prices.to_numpy()}, {}).shape == prices.shape